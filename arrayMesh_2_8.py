@@ -0,0 +1,522 @@
+import numpy as np
+
+# Import submodules.
+import hardsurface_2_8
+
+# Planning of the recursion.
+import recursionPlan_2_8
+hardsurface_2_8.reloadModule(recursionPlan_2_8)
+from seeds_2_8 import *
+
+# Analytic cut geometry.
+import cutGeometry_2_8
+hardsurface_2_8.reloadModule(cutGeometry_2_8)
+
+
+# Face-vertex mesh backed by numpy arrays, and the operations of the generation on it, without Blender.
+# The recursion is planned by recursionPlan_2_8 and executed here end to end, the result is converted to a Blender mesh, or streamed
+# to a file with streamExport_2_8, only at the end.
+# Faces are never reindexed: an operation removes the faces it replaces and appends the resulting ones, so a face index is its identity.
+
+bevelOffset = 0.001 # Width and depth of the creases, as bevelOffset in cut_surface0_2_8.
+insetDepth = 0.01 # Depth of the insets, as insetDepth in inset_surface_2_8.
+
+
+# Numpy array growing by doubling its capacity.
+class GrowableArray:
+
+    def __init__(self, columns=None, dtype=np.float64):
+        shape = (16,) if columns == None else (16, columns)
+        self.data = np.zeros(shape, dtype=dtype)
+        self.size = 0
+
+    # Append rows, returns the index of the first one.
+    def extend(self, rows):
+        rows = np.asarray(rows, dtype=self.data.dtype)
+        neededSize = self.size + len(rows)
+        if neededSize > len(self.data):
+            grownData = np.zeros((max(neededSize, len(self.data) * 2),) + self.data.shape[1:], dtype=self.data.dtype)
+            grownData[:self.size] = self.data[:self.size]
+            self.data = grownData
+
+        firstIndex = self.size
+        self.data[firstIndex:neededSize] = rows
+        self.size = neededSize
+        return firstIndex
+
+    def view(self):
+        return self.data[:self.size]
+
+
+class ArrayMesh:
+
+    def __init__(self):
+        self.vertices = GrowableArray(3, np.float64)
+        self.loops = GrowableArray(None, np.int64)
+        self.faceStarts = GrowableArray(None, np.int64)
+        self.faceSizes = GrowableArray(None, np.int64)
+        self.faceAlive = GrowableArray(None, bool)
+        self.faceMaterials = GrowableArray(None, np.int64)
+        # Faces using each edge, by sorted pair of vertex indices, to insert the vertices splitting an edge in every face using it.
+        self.edgeFaces = {}
+        # Sharp edges, as sorted pairs of vertex indices.
+        self.sharpEdges = set()
+
+    # Returns the indices of the new vertices.
+    def addVertices(self, coordinates):
+        coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 3)
+        firstIndex = self.vertices.extend(coordinates)
+        return np.arange(firstIndex, firstIndex + len(coordinates))
+
+    def faceEdges(self, faceIndex):
+        vertexIndices = self.faceVertices(faceIndex).tolist()
+        return [(min(currentIndex, nextIndex), max(currentIndex, nextIndex)) for currentIndex, nextIndex in zip(vertexIndices, vertexIndices[1:] + vertexIndices[:1])]
+
+    # Returns the index of the new face.
+    def addFace(self, vertexIndices, material=0):
+        self.faceStarts.extend([self.loops.size])
+        self.faceSizes.extend([len(vertexIndices)])
+        self.faceAlive.extend([True])
+        self.faceMaterials.extend([material])
+        self.loops.extend(vertexIndices)
+
+        faceIndex = self.faceAlive.size - 1
+        for currentEdge in self.faceEdges(faceIndex):
+            self.edgeFaces.setdefault(currentEdge, set()).add(faceIndex)
+        return faceIndex
+
+    def removeFace(self, faceIndex):
+        self.faceAlive.data[faceIndex] = False
+        for currentEdge in self.faceEdges(faceIndex):
+            self.edgeFaces[currentEdge].discard(faceIndex)
+
+    # Change the vertices of a face, keeping its index.
+    # The new loop is appended, the old one is left unused.
+    def setFaceVertices(self, faceIndex, vertexIndices):
+        for currentEdge in self.faceEdges(faceIndex):
+            self.edgeFaces[currentEdge].discard(faceIndex)
+
+        self.faceStarts.data[faceIndex] = self.loops.extend(vertexIndices)
+        self.faceSizes.data[faceIndex] = len(vertexIndices)
+
+        for currentEdge in self.faceEdges(faceIndex):
+            self.edgeFaces.setdefault(currentEdge, set()).add(faceIndex)
+
+    # Split the edge between 2 vertices at a position, in every face using it, so that no face is left with a T-junction.
+    # Returns the new vertex.
+    def splitEdge(self, aVertex, bVertex, position):
+        newVertex = int(self.addVertices([position])[0])
+        for currentFace in sorted(self.edgeFaces.get((min(aVertex, bVertex), max(aVertex, bVertex)), set())):
+            vertexIndices = self.faceVertices(currentFace).tolist()
+            for currentPosition in range(0, len(vertexIndices)):
+                nextPosition = (currentPosition + 1) % len(vertexIndices)
+                if set((vertexIndices[currentPosition], vertexIndices[nextPosition])) == set((aVertex, bVertex)):
+                    # Inserted at the end of the loop when the edge closes it, so that the first edge of the face doesn't change.
+                    vertexIndices.insert(currentPosition + 1, newVertex)
+                    break
+            self.setFaceVertices(currentFace, vertexIndices)
+        return newVertex
+
+    def faceVertices(self, faceIndex):
+        faceStart = self.faceStarts.data[faceIndex]
+        return self.loops.data[faceStart:faceStart + self.faceSizes.data[faceIndex]].copy()
+
+    def facePositions(self, faceIndex):
+        return self.vertices.data[self.faceVertices(faceIndex)]
+
+    # Mark the edges of a closed loop of vertices as sharp.
+    def markSharpLoop(self, vertexIndices):
+        vertexIndices = [int(currentIndex) for currentIndex in vertexIndices]
+        for currentIndex, nextIndex in zip(vertexIndices, vertexIndices[1:] + vertexIndices[:1]):
+            self.sharpEdges.add((min(currentIndex, nextIndex), max(currentIndex, nextIndex)))
+
+    def facesCount(self):
+        return int(self.faceAlive.view().sum())
+
+    # The mesh without its removed faces and unused vertices, as the arrays of streamExport_2_8:
+    # vertices (n, 3), the number of vertices of each face, and the vertex indices of all the faces one after the other.
+    # Also returns the sharp edges as an (m, 2) array of indices in the compacted vertices, and the material of each face.
+    def arrays(self):
+        aliveFaces = np.flatnonzero(self.faceAlive.view())
+        faceSizes = self.faceSizes.data[aliveFaces]
+        faceOffsets = np.concatenate(([0], np.cumsum(faceSizes)[:-1])).astype(np.int64)
+        loopIndices = np.repeat(self.faceStarts.data[aliveFaces], faceSizes) + np.arange(int(faceSizes.sum())) - np.repeat(faceOffsets, faceSizes)
+        faceIndices = self.loops.data[loopIndices]
+
+        faceMaterials = self.faceMaterials.data[aliveFaces]
+
+        usedVertices, faceIndices = np.unique(faceIndices, return_inverse=True)
+        vertexMap = {int(currentVertex): currentIndex for currentIndex, currentVertex in enumerate(usedVertices.tolist())}
+        sharpEdges = [(vertexMap[currentEdge[0]], vertexMap[currentEdge[1]]) for currentEdge in self.sharpEdges if currentEdge[0] in vertexMap and currentEdge[1] in vertexMap]
+
+        return self.vertices.data[usedVertices], faceSizes, faceIndices.astype(np.int64), np.array(sharpEdges, dtype=np.int64).reshape(-1, 2), faceMaterials
+
+
+### Geometry. ###
+
+def normalized(vector):
+    length = np.linalg.norm(vector)
+    if length == 0:
+        return vector
+    return vector / length
+
+
+# Normal of a polygon, with Newell's method.
+def faceNormal(positions):
+    nextPositions = np.roll(positions, -1, axis=0)
+    return normalized(np.array([np.sum((positions[:, 1] - nextPositions[:, 1]) * (positions[:, 2] + nextPositions[:, 2])),
+                                np.sum((positions[:, 2] - nextPositions[:, 2]) * (positions[:, 0] + nextPositions[:, 0])),
+                                np.sum((positions[:, 0] - nextPositions[:, 0]) * (positions[:, 1] + nextPositions[:, 1]))]))
+
+
+# Same frame as computeFaceFrames: the TBN matrix as rows, the borders and the center of a face.
+# The tangent is the first edge of the face from its highest to its lowest vertex index, unless a tangent is given.
+def faceFrame(arrayMesh, faceIndex, tangent=None):
+    vertexIndices = arrayMesh.faceVertices(faceIndex)
+    positions = arrayMesh.vertices.data[vertexIndices]
+    normal = faceNormal(positions)
+
+    if tangent is None:
+        tangent = arrayMesh.vertices.data[min(vertexIndices[0], vertexIndices[1])] - arrayMesh.vertices.data[max(vertexIndices[0], vertexIndices[1])]
+    tangent = np.asarray(tangent, dtype=np.float64)
+    tangent = normalized(tangent - normal * np.dot(tangent, normal))
+    tbnMatrix = np.stack((tangent, np.cross(normal, tangent), normal))
+
+    tangentCoordinates = positions @ tbnMatrix.T
+    minimums = tangentCoordinates.min(axis=0)
+    maximums = tangentCoordinates.max(axis=0)
+
+    return {"tbn": tbnMatrix, "borders": (minimums[0], maximums[0], minimums[1], maximums[1]), "center": positions.mean(axis=0)}
+
+
+# Sine of the angle under which the outline of a face is considered straight at a vertex, as cornerTolerance in utils_2_8.
+cornerTolerance = 0.0001
+# Distance under which a vertex already on a side is reused rather than splitting the side next to it.
+splitTolerance = 0.00001
+
+# Positions, in the vertices of a face, of its corners: the vertices its outline turns at, as faceCornerPositions in utils_2_8.
+# The first corner starts the side the first edge of the face lies on.
+def faceCornerPositions(positions):
+    previousDirections = np.array([normalized(currentDirection) for currentDirection in positions - np.roll(positions, 1, axis=0)])
+    nextDirections = np.roll(previousDirections, -1, axis=0)
+    cornerPositions = np.flatnonzero(np.linalg.norm(np.cross(previousDirections, nextDirections), axis=1) > cornerTolerance).tolist()
+
+    if len(cornerPositions) > 0 and cornerPositions[0] != 0:
+        cornerPositions = cornerPositions[-1:] + cornerPositions[:-1]
+    return cornerPositions
+
+
+# Vertices of a face going forward from one of its vertices to another, both included.
+def loopRun(vertexIndices, startVertex, endVertex):
+    startPosition = vertexIndices.index(startVertex)
+    runLength = (vertexIndices.index(endVertex) - startPosition) % len(vertexIndices)
+    return [vertexIndices[(startPosition + currentStep) % len(vertexIndices)] for currentStep in range(0, runLength + 1)]
+
+
+# Positions of a polygon offset inward by thickness in its plane, with mitered corners as an even offset inset.
+def offsetPolygon(positions, normal, thickness):
+    previousDirections = np.array([normalized(currentDirection) for currentDirection in positions - np.roll(positions, 1, axis=0)])
+    nextDirections = np.roll(previousDirections, -1, axis=0)
+    previousNormals = np.cross(normal, previousDirections)
+    nextNormals = np.cross(normal, nextDirections)
+
+    # Sharp corners are clamped, the miter would go far away.
+    miterScales = np.maximum(1.0 + np.sum(previousNormals * nextNormals, axis=1), 0.1)
+    return positions + (previousNormals + nextNormals) * (thickness / miterScales)[:, np.newaxis]
+
+
+### Operations. ###
+
+# Return the vertex at ratio along the side of a face going from startVertex to endVertex, splitting the edge it falls on,
+# in the face and its neighbour, if there is no vertex there yet.
+def splitSideAt(arrayMesh, faceIndex, startVertex, endVertex, ratio):
+    side = loopRun(arrayMesh.faceVertices(faceIndex).tolist(), startVertex, endVertex)
+    start = arrayMesh.vertices.data[startVertex].copy()
+    direction = arrayMesh.vertices.data[endVertex] - start
+    sideLength = np.linalg.norm(direction)
+    direction = direction / sideLength
+    targetDistance = ratio * sideLength
+
+    for aVertex, bVertex in zip(side[:-1], side[1:]):
+        aDistance = np.dot(arrayMesh.vertices.data[aVertex] - start, direction)
+        bDistance = np.dot(arrayMesh.vertices.data[bVertex] - start, direction)
+
+        # A neighbour already inserted a vertex there.
+        if abs(bDistance - targetDistance) <= splitTolerance:
+            return bVertex
+
+        if aDistance < targetDistance < bDistance:
+            return arrayMesh.splitEdge(aVertex, bVertex, start + direction * targetDistance)
+
+
+# Split a quad in numberOfCuts + 1 quads, cutting its first and third sides when vertical, its second and fourth ones otherwise.
+# Faces are quads by their corners, their sides may hold vertices inserted by their neighbours, and the vertices inserted on the
+# sides go in the neighbours too.
+# Returns the new faces, in order along the cut sides.
+def quadSplit(arrayMesh, faceIndex, verticalSubdivision, numberOfCuts):
+    vertexIndices = arrayMesh.faceVertices(faceIndex).tolist()
+    cornerPositions = faceCornerPositions(arrayMesh.vertices.data[vertexIndices])
+    if len(cornerPositions) != 4:
+        print("Face does not have 4 corners.")
+        return []
+
+    corners = [vertexIndices[currentPosition] for currentPosition in cornerPositions]
+    if not verticalSubdivision:
+        corners = corners[1:] + corners[:1]
+
+    # Vertices at the same ratio on the first side, and on the third side, which runs the other way.
+    firstSide = [corners[0]]
+    thirdSide = [corners[3]]
+    for currentCut in range(1, numberOfCuts + 1):
+        ratio = currentCut / (numberOfCuts + 1)
+        firstSide.append(splitSideAt(arrayMesh, faceIndex, corners[0], corners[1], ratio))
+        thirdSide.append(splitSideAt(arrayMesh, faceIndex, corners[2], corners[3], 1.0 - ratio))
+    firstSide.append(corners[1])
+    thirdSide.append(corners[2])
+
+    # Every piece goes along the first side, across, back along the third side, and across again.
+    # The first and last pieces also keep the vertices of the fourth and second sides.
+    vertexIndices = arrayMesh.faceVertices(faceIndex).tolist()
+    material = arrayMesh.faceMaterials.data[faceIndex]
+    arrayMesh.removeFace(faceIndex)
+    pieces = []
+    for currentPiece in range(0, numberOfCuts + 1):
+        pieceVertices = loopRun(vertexIndices, firstSide[currentPiece], firstSide[currentPiece + 1])
+        if currentPiece == numberOfCuts:
+            pieceVertices = pieceVertices + loopRun(vertexIndices, corners[1], corners[2])[1:-1]
+        pieceVertices = pieceVertices + loopRun(vertexIndices, thirdSide[currentPiece + 1], thirdSide[currentPiece])
+        if currentPiece == 0:
+            pieceVertices = pieceVertices + loopRun(vertexIndices, corners[3], corners[0])[1:-1]
+        pieces.append(arrayMesh.addFace(pieceVertices, material))
+    return pieces
+
+
+# Inset a face by thickness, moving the inner face along the normal by depth.
+# Returns the inner face, or the face itself when the inset would fold it, around short edges left by the splits.
+def inset(arrayMesh, faceIndex, thickness, depth):
+    vertexIndices = arrayMesh.faceVertices(faceIndex)
+    positions = arrayMesh.vertices.data[vertexIndices]
+    normal = faceNormal(positions)
+
+    tbnMatrix = faceFrame(arrayMesh, faceIndex)["tbn"]
+    if cutGeometry_2_8.offsetFolds([(currentPoint[0], currentPoint[1]) for currentPoint in (positions @ tbnMatrix.T).tolist()], thickness):
+        return faceIndex
+
+    innerVertices = arrayMesh.addVertices(offsetPolygon(positions, normal, thickness) + normal * depth)
+
+    material = arrayMesh.faceMaterials.data[faceIndex]
+    arrayMesh.removeFace(faceIndex)
+    verticesCount = len(vertexIndices)
+    for currentIndex in range(0, verticesCount):
+        nextIndex = (currentIndex + 1) % verticesCount
+        arrayMesh.addFace([vertexIndices[currentIndex], vertexIndices[nextIndex], innerVertices[nextIndex], innerVertices[currentIndex]], material)
+    return arrayMesh.addFace(innerVertices, material)
+
+
+# Cut an outline, given as 2D points in the TBN space of the face centered on position, as analyticCut does.
+# The clipping needs a convex face, an outline known to be inside the face, like the clean face inside a plate, is cut without clipping.
+# With a margin, the inner face leaves room for a crease of that offset, see cutGeometry_2_8.cutFace.
+# Returns the inner face, None when the outline doesn't overlap the face, doesn't fit in it without clipping, or leaves no room for the crease.
+def polygonCut(arrayMesh, faceIndex, outlinePoints, position, tbnMatrix, clip=True, margin=0.0):
+    vertexIndices = arrayMesh.faceVertices(faceIndex)
+    outerPoints = [(currentPoint[0], currentPoint[1]) for currentPoint in ((arrayMesh.vertices.data[vertexIndices] - position) @ tbnMatrix.T).tolist()]
+
+    cutResult = cutGeometry_2_8.cutFace(outerPoints, outlinePoints, clip, margin)
+    if cutResult == None:
+        print("polygon cut outline does not fit in the face " + str(faceIndex))
+        return None
+    innerPoints, plateLoops, innerLoop = cutResult
+
+    innerCoordinates = np.array(innerPoints, dtype=np.float64)
+    allVertices = vertexIndices.tolist() + arrayMesh.addVertices(position + innerCoordinates @ tbnMatrix[:2]).tolist()
+
+    material = arrayMesh.faceMaterials.data[faceIndex]
+    arrayMesh.removeFace(faceIndex)
+    for currentLoop in plateLoops:
+        arrayMesh.addFace([allVertices[currentIndex] for currentIndex in currentLoop], material)
+    return arrayMesh.addFace([allVertices[currentIndex] for currentIndex in innerLoop], material)
+
+
+# Crease the outline of a face as addCutCrease does: a bevel of 2 segments whose middle loop is lowered by offset.
+# The outline moves outward by offset, the face shrinks inward by offset, and the 3 loops are sharp.
+# Returns the face inside the crease.
+def crease(arrayMesh, faceIndex, offset):
+    vertexIndices = arrayMesh.faceVertices(faceIndex)
+    positions = arrayMesh.vertices.data[vertexIndices]
+    normal = faceNormal(positions)
+
+    middleVertices = arrayMesh.addVertices(positions - normal * offset)
+    innerVertices = arrayMesh.addVertices(offsetPolygon(positions, normal, offset))
+    # The outline is shared with the plate around, moving it widens the crease on the plate side.
+    arrayMesh.vertices.data[vertexIndices] = offsetPolygon(positions, normal, -offset)
+
+    material = arrayMesh.faceMaterials.data[faceIndex]
+    arrayMesh.removeFace(faceIndex)
+    verticesCount = len(vertexIndices)
+    for currentIndex in range(0, verticesCount):
+        nextIndex = (currentIndex + 1) % verticesCount
+        arrayMesh.addFace([vertexIndices[currentIndex], vertexIndices[nextIndex], middleVertices[nextIndex], middleVertices[currentIndex]], material)
+        arrayMesh.addFace([middleVertices[currentIndex], middleVertices[nextIndex], innerVertices[nextIndex], innerVertices[currentIndex]], material)
+
+    for currentLoop in (vertexIndices, middleVertices, innerVertices):
+        arrayMesh.markSharpLoop(currentLoop)
+
+    return arrayMesh.addFace(innerVertices, material)
+
+
+# Cut a plate in a face, crease it, and cut the clean face inside it, as genericCutPlate does.
+# Returns the clean face, None when the cut failed.
+def cutPlate(arrayMesh, faceIndex, shapeSeed, tangent, settings, shapeProvider):
+    frame = faceFrame(arrayMesh, faceIndex, tangent)
+    borders = frame["borders"]
+    faceWidth = borders[1] - borders[0]
+    faceHeight = borders[3] - borders[2]
+    if faceWidth <= 0 or faceHeight <= 0:
+        return None
+
+    shapeOutline, edgesDepth = shapeProvider(shapeSeed, (faceWidth * 0.5, faceHeight * 0.5), 0)
+    placedOutline, cleanFaceOutline = cutGeometry_2_8.plateLayout(faceWidth, faceHeight, shapeOutline, edgesDepth, settings["cuttingShapeMargin"], settings["cleanFaceMargin"])
+
+    # The plate is creased right after, it is kept far enough from the outline of the face and has to be wide enough for the crease.
+    plateFace = polygonCut(arrayMesh, faceIndex, placedOutline, frame["center"], frame["tbn"], margin=bevelOffset)
+    if plateFace == None:
+        return None
+    plateFace = crease(arrayMesh, plateFace, bevelOffset)
+
+    # The plate is concave where the shape has notches, the clean face is inside it by construction, see plateLayout.
+    return polygonCut(arrayMesh, plateFace, cleanFaceOutline, frame["center"], frame["tbn"], False)
+
+
+### Plans. ###
+
+# Replay a plan of recursionPlan_2_8 on faces of an array mesh, as executePlan does on a Blender object.
+# Returns the faces resulting from the last level.
+def executeArrayPlan(arrayMesh, plan, rootFaces, shapeProvider=None):
+    if shapeProvider == None:
+        shapeProvider = recursionPlan_2_8.polylineShapeProvider
+    settings = plan["settings"]
+
+    currentLevel = [(currentNode, currentFace, np.array(currentNode["tangent"], dtype=np.float64)) for currentNode, currentFace in zip(plan["roots"], rootFaces)]
+    frontierFaces = []
+
+    while len(currentLevel) > 0:
+        nextLevel = []
+        for currentNode, currentFace, currentTangent in currentLevel:
+            operation = currentNode["operation"]
+            if operation == None:
+                if currentNode["depth"] < 0:
+                    frontierFaces.append(currentFace)
+                continue
+
+            if operation["type"] == "subdivide":
+                frame = faceFrame(arrayMesh, currentFace)
+                cutDirection = currentTangent
+                if operation["axis"] == 1:
+                    cutDirection = np.cross(frame["tbn"][2], currentTangent)
+
+                # The first edge of a quad is its tangent.
+                verticalSubdivision = abs(np.dot(frame["tbn"][0], cutDirection)) >= abs(np.dot(frame["tbn"][1], cutDirection))
+                childrenFaces = quadSplit(arrayMesh, currentFace, verticalSubdivision, operation["cuts"])
+                childrenFaces = sorted(childrenFaces, key=lambda childFace: np.dot(arrayMesh.facePositions(childFace).mean(axis=0), cutDirection))
+
+                for childNode, childFace in zip(currentNode["children"], childrenFaces):
+                    if childNode["inset"] != 0:
+                        thickness = settings["insetThickness"]
+                        if settings["insetRelativeOffset"]:
+                            childBorders = faceFrame(arrayMesh, childFace)["borders"]
+                            thickness = thickness * min(childBorders[1] - childBorders[0], childBorders[3] - childBorders[2])
+                        childFace = inset(arrayMesh, childFace, thickness, insetDepth * childNode["inset"])
+                    nextLevel.append((childNode, childFace, currentTangent))
+            else:
+                cleanFace = cutPlate(arrayMesh, currentFace, operation["shapeSeed"], currentTangent, settings, shapeProvider)
+                if cleanFace != None and len(currentNode["children"]) > 0:
+                    nextLevel.append((currentNode["children"][0], cleanFace, currentTangent))
+
+        currentLevel = nextLevel
+
+    return frontierFaces
+
+
+# Generate a detailed rectangle of dimension, centered on the origin in the XY plane, without Blender.
+# The plan is the one recursiveGeneration would make for a face of the same dimension with the same seed and settings.
+def generateArrayMesh(seed, dimension, recursiveDepth, settings=None, shapeProvider=None, budget=None, budgetMode='OBJECT'):
+    arrayMesh = ArrayMesh()
+    halfWidth = dimension[0] * 0.5
+    halfHeight = dimension[1] * 0.5
+    rootFace = arrayMesh.addFace(arrayMesh.addVertices([(-halfWidth, -halfHeight, 0), (halfWidth, -halfHeight, 0), (halfWidth, halfHeight, 0), (-halfWidth, halfHeight, 0)]))
+
+    frame = faceFrame(arrayMesh, rootFace)
+    roots = [{"seed": deriveSeed(seed, 0), "rect": list(frame["borders"]), "tangent": frame["tbn"][0].tolist()}]
+    plan = recursionPlan_2_8.planRecursion(roots, recursiveDepth, settings, shapeProvider, budget, budgetMode)
+
+    executeArrayPlan(arrayMesh, plan, [rootFace], shapeProvider)
+
+    return arrayMesh
+
+
+# Array mesh of the geometry of a Blender object in world space, the space plans are made in, read in bulk with foreach_get.
+# Face indices are the ones of the polygons of the object.
+def fromBlenderObject(objectToRead):
+    mesh = objectToRead.data
+
+    vertices = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+    mesh.vertices.foreach_get("co", vertices)
+    matrixWorld = np.array(objectToRead.matrix_world, dtype=np.float64)
+    vertices = vertices.reshape(-1, 3) @ matrixWorld[:3, :3].T + matrixWorld[:3, 3]
+
+    loopStarts = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_start", loopStarts)
+    loopTotals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", loopTotals)
+    materialIndices = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("material_index", materialIndices)
+    loopVertices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loopVertices)
+
+    arrayMesh = ArrayMesh()
+    arrayMesh.addVertices(vertices)
+    for loopStart, loopTotal, materialIndex in zip(loopStarts.tolist(), loopTotals.tolist(), materialIndices.tolist()):
+        arrayMesh.addFace(loopVertices[loopStart:loopStart + loopTotal].tolist(), materialIndex)
+
+    # Sharp edges of the object are kept.
+    edgeVertices = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get("vertices", edgeVertices)
+    useEdgeSharp = np.zeros(len(mesh.edges), dtype=bool)
+    mesh.edges.foreach_get("use_edge_sharp", useEdgeSharp)
+    for currentEdge in edgeVertices.reshape(-1, 2)[useEdgeSharp].tolist():
+        arrayMesh.sharpEdges.add((min(currentEdge), max(currentEdge)))
+
+    return arrayMesh
+
+
+# Convert an array mesh to a Blender mesh, in bulk with foreach_set.
+# With the world matrix of the object the mesh is for, the vertices are brought back from world space to the object's space.
+def toBlenderMesh(arrayMesh, name, matrixWorld=None):
+    import bpy
+
+    vertices, faceSizes, faceIndices, sharpEdges, faceMaterials = arrayMesh.arrays()
+    if matrixWorld != None:
+        inverseMatrixWorld = np.linalg.inv(np.array(matrixWorld, dtype=np.float64))
+        vertices = vertices @ inverseMatrixWorld[:3, :3].T + inverseMatrixWorld[:3, 3]
+
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(vertices))
+    mesh.vertices.foreach_set("co", vertices.astype(np.float32).ravel())
+    mesh.loops.add(len(faceIndices))
+    mesh.loops.foreach_set("vertex_index", faceIndices.astype(np.int32))
+    mesh.polygons.add(len(faceSizes))
+    mesh.polygons.foreach_set("loop_start", np.concatenate(([0], np.cumsum(faceSizes)[:-1])).astype(np.int32))
+    mesh.polygons.foreach_set("loop_total", faceSizes.astype(np.int32))
+    mesh.polygons.foreach_set("material_index", faceMaterials.astype(np.int32))
+    mesh.update(calc_edges=True)
+    mesh.validate()
+
+    # Sharp edges, found by their vertices once Blender has built the edges.
+    edgeVertices = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get("vertices", edgeVertices)
+    edgeVertices = np.sort(edgeVertices.reshape(-1, 2), axis=1)
+    sharpKeys = set([(int(currentEdge[0]), int(currentEdge[1])) for currentEdge in np.sort(sharpEdges, axis=1).tolist()])
+    useEdgeSharp = np.array([(currentEdge[0], currentEdge[1]) in sharpKeys for currentEdge in edgeVertices.tolist()], dtype=bool)
+    mesh.edges.foreach_set("use_edge_sharp", useEdgeSharp)
+
+    return mesh
@@ -0,0 +1,85 @@
+import sys
+import os
+import argparse
+import subprocess
+import tempfile
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+# Shares the tiles of a batch between several background Blender processes, then merges their outputs into one batch.
+# This script runs with a plain Python interpreter:
+# python batchCoordinator_2_8.py --blender /path/to/blender --seed 0 --grid 20 --depth 3 --workers 32 --output /path/to/output
+# Every tile is seeded independently of the others, the merged batch is the same as a serial run with the same seed.
+
+scriptDirectory = os.path.dirname(os.path.abspath(__file__))
+headlessScript = os.path.join(scriptDirectory, "headlessBatch_2_8.py")
+
+
+def parseArguments(argv):
+    parser = argparse.ArgumentParser(description="Generate a batch of procedural hard surface tiles with several Blender processes.")
+    parser.add_argument("--blender", default="blender", help="Path to the Blender executable.")
+    parser.add_argument("--seed", type=int, default=0, help="Batch seed.")
+    parser.add_argument("--grid", type=int, default=5, help="Number of tiles on each side of the batch.")
+    parser.add_argument("--depth", type=int, default=3, help="Recursion depth of the generation.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of Blender processes, one per core by default.")
+    parser.add_argument("--output", required=True, help="Directory the merged batch is written to.")
+    parser.add_argument("--format", choices=["blend", "obj", "both"], default="blend", help="Output file format of the merged batch.")
+
+    return parser.parse_args(argv)
+
+
+# Split the tiles between the shards.
+# Tiles are dealt in turn rather than in contiguous blocks, so that every shard gets a similar mix of tiles.
+def shardTiles(tilesCount, shardsCount):
+    shards = [list(range(currentShard, tilesCount, shardsCount)) for currentShard in range(0, shardsCount)]
+    return [currentShard for currentShard in shards if len(currentShard) > 0]
+
+
+def blenderCommand(blenderPath, scriptArguments):
+    return [blenderPath, "-b", "--factory-startup", "--python", headlessScript, "--"] + scriptArguments
+
+
+def runBlender(command):
+    completedProcess = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    if completedProcess.returncode != 0:
+        print(completedProcess.stdout.decode(errors="replace"))
+        raise RuntimeError("Blender process failed: " + " ".join(command))
+
+
+def generateShardedBatch(blenderPath, seed, squareSize, recursiveDepth, workersCount, outputDirectory, outputFormat="blend"):
+    shards = shardTiles(squareSize * squareSize, max(1, workersCount))
+    shardsDirectory = tempfile.mkdtemp(prefix="hardsurface_shards_")
+
+    try:
+        # Generate the shards in parallel, each Blender process generates the batch restricted to its tiles.
+        commands = []
+        shardFiles = []
+        for currentIndex, currentShard in enumerate(shards):
+            currentDirectory = os.path.join(shardsDirectory, "shard_" + str(currentIndex))
+            commands.append(blenderCommand(blenderPath, [
+                "--seed-start", str(seed),
+                "--seed-end", str(seed + 1),
+                "--grid", str(squareSize),
+                "--depth", str(recursiveDepth),
+                "--tiles", ",".join([str(currentTile) for currentTile in currentShard]),
+                "--output", currentDirectory,
+                "--format", "blend"]))
+            shardFiles.append(os.path.join(currentDirectory, "batch_" + str(seed) + ".blend"))
+
+        with ThreadPoolExecutor(max_workers=len(commands)) as executor:
+            # Consume the results so that a failing shard raises here.
+            list(executor.map(runBlender, commands))
+
+        # Merge every shard into a single batch.
+        runBlender(blenderCommand(blenderPath, [
+            "--seed-start", str(seed),
+            "--output", outputDirectory,
+            "--format", outputFormat,
+            "--merge"] + shardFiles))
+    finally:
+        shutil.rmtree(shardsDirectory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    arguments = parseArguments(sys.argv[1:])
+    generateShardedBatch(arguments.blender, arguments.seed, arguments.grid, arguments.depth, arguments.workers, arguments.output, arguments.format)
@@ -0,0 +1,277 @@
+import bpy
+
+# Import submodules.
+import sys
+import os
+import json
+import time
+import argparse
+import itertools
+import tracemalloc
+
+# Scaling benchmark of the generation, run in background mode:
+# blender -b --factory-startup --python benchmark_2_8.py -- --depths 1,2,3 --faces 1,10,100 --output results.json --baseline baseline.json
+# Every case runs with fixed seeds on a fresh grid of quads, and reports its time per input face and per output polygon,
+# its peak memory and its output size. With a baseline, cases slower than the baseline by more than the threshold are reported
+# as regressions and the script exits with an error code.
+
+# There is no .blend file to locate the scripts from in background mode, use the location of this script instead.
+scriptDirectory = os.path.dirname(os.path.abspath(__file__))
+if scriptDirectory not in sys.path:
+   sys.path.append(scriptDirectory)
+
+import recursivityManager_2_8
+import cut_surface0_2_8
+import generate_cuttingShape0_2_8
+import polylineShape_2_8
+import utils_2_8
+
+try:
+    # Only available on Unix.
+    import resource
+except ImportError:
+    resource = None
+
+
+def parseList(value, converter):
+    return [converter(currentValue) for currentValue in value.split(",") if currentValue != ""]
+
+
+def parseArguments(argv):
+    # Blender's own arguments come first, ours are the ones after "--".
+    if "--" in argv:
+        argv = argv[argv.index("--") + 1:]
+    else:
+        argv = []
+
+    parser = argparse.ArgumentParser(description="Benchmark the procedural hard surface generation.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of every case.")
+    parser.add_argument("--depths", default="1,2,3", help="Comma separated recursion depths.")
+    parser.add_argument("--faces", default="1,10,100", help="Comma separated numbers of base quads, up to 10000.")
+    parser.add_argument("--subdivision-over-cut", default=str(recursivityManager_2_8.subdivisionOverCutProbability), help="Comma separated subdivision over cut probabilities.")
+    parser.add_argument("--inset", default=str(recursivityManager_2_8.insetProbability), help="Comma separated inset probabilities.")
+    parser.add_argument("--entry-points", default="recursiveGeneration,applyToSelectedFaces", help="Comma separated entry points to run on every case.")
+    parser.add_argument("--shapes-radii", default="2,5", help="Comma separated radii of generateCuttingShapesArray, empty to skip the shapes cases.")
+    parser.add_argument("--output", default=None, help="File the results are written to, as JSON.")
+    parser.add_argument("--baseline", default=None, help="Results of a previous run to compare with.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown over the baseline reported as a regression.")
+
+    return parser.parse_args(argv)
+
+
+# Remove every object, mesh and collection so that each case starts from an empty scene.
+def clearScene():
+    if bpy.context.object != None and bpy.context.object.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode = 'OBJECT')
+
+    for currentObject in list(bpy.data.objects):
+        bpy.data.objects.remove(currentObject)
+    for currentMesh in list(bpy.data.meshes):
+        bpy.data.meshes.remove(currentMesh)
+    for currentCollection in list(bpy.data.collections):
+        bpy.data.collections.remove(currentCollection)
+
+
+# Create an object made of facesCount unit quads, laid out on a square grid.
+def createQuadsGrid(facesCount):
+    columns = 1
+    while columns * columns < facesCount:
+        columns = columns + 1
+
+    vertices = []
+    faces = []
+    for currentFace in range(0, facesCount):
+        x = currentFace % columns
+        y = currentFace // columns
+        firstVertex = len(vertices)
+        vertices.extend([(x, y, 0), (x + 0.95, y, 0), (x + 0.95, y + 0.95, 0), (x, y + 0.95, 0)])
+        faces.append((firstVertex, firstVertex + 1, firstVertex + 2, firstVertex + 3))
+
+    gridMesh = bpy.data.meshes.new("benchmark_grid")
+    gridMesh.from_pydata(vertices, [], faces)
+    gridMesh.update()
+
+    gridObject = bpy.data.objects.new("benchmark_grid", gridMesh)
+    bpy.context.scene.collection.objects.link(gridObject)
+    bpy.context.view_layer.objects.active = gridObject
+    gridObject.select_set(True)
+
+    return gridObject
+
+
+def runRecursiveGeneration(seed, gridObject, recursiveDepth):
+    for currentFaceIndex, currentFaceTuple in enumerate(utils_2_8.buildNewFaceTuples(gridObject, list(range(0, len(gridObject.data.polygons))))):
+        recursivityManager_2_8.recursiveGeneration(utils_2_8.deriveSeed(seed, currentFaceIndex), gridObject, [currentFaceTuple], recursiveDepth)
+
+
+def runApplyToSelectedFaces(seed, gridObject, recursiveDepth):
+    for currentPolygon in gridObject.data.polygons:
+        currentPolygon.select = True
+    recursivityManager_2_8.applyToSelectedFaces(gridObject, seed)
+    bpy.ops.object.mode_set(mode = 'OBJECT')
+
+
+# Run a function twice, each time on the arguments returned by setup: once with tracemalloc to measure the peak of the memory
+# allocated by Python, then once without it to measure its duration, since tracing the allocations slows it down.
+# Returns the duration, the peak memory, and the arguments of the timed run.
+def measure(setup, function):
+    tracedArguments = setup()
+    tracemalloc.start()
+    function(*tracedArguments)
+    peakMemory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    timedArguments = setup()
+    startTime = time.perf_counter()
+    function(*timedArguments)
+    duration = time.perf_counter() - startTime
+
+    return duration, peakMemory, timedArguments
+
+
+# Peak resident memory of the whole process so far, in bytes, for the whole run rather than for a case.
+def processPeakMemory():
+    if resource == None:
+        return None
+    peakMemory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    if sys.platform != "darwin":
+        peakMemory = peakMemory * 1024
+    return peakMemory
+
+
+def runGenerationCase(entryPoint, seed, recursiveDepth, facesCount, subdivisionOverCutProbability, insetProbability):
+    recursivityManager_2_8.recursiveDepth = recursiveDepth
+    recursivityManager_2_8.subdivisionOverCutProbability = subdivisionOverCutProbability
+    recursivityManager_2_8.insetProbability = insetProbability
+
+    def setup():
+        clearScene()
+        return (seed, createQuadsGrid(facesCount), recursiveDepth)
+
+    if entryPoint == "recursiveGeneration":
+        duration, peakMemory, timedArguments = measure(setup, runRecursiveGeneration)
+    else:
+        duration, peakMemory, timedArguments = measure(setup, runApplyToSelectedFaces)
+    gridObject = timedArguments[1]
+
+    outputPolygons = len(gridObject.data.polygons)
+
+    return {"name": entryPoint + "_depth" + str(recursiveDepth) + "_faces" + str(facesCount) + "_subdivisionOverCut" + str(subdivisionOverCutProbability) + "_inset" + str(insetProbability),
+            "entryPoint": entryPoint,
+            "depth": recursiveDepth,
+            "inputFaces": facesCount,
+            "subdivisionOverCutProbability": subdivisionOverCutProbability,
+            "insetProbability": insetProbability,
+            "time": duration,
+            "timePerInputFace": duration / facesCount,
+            "timePerOutputPolygon": duration / max(1, outputPolygons),
+            "peakPythonMemory": peakMemory,
+            "outputPolygons": outputPolygons,
+            "outputVertices": len(gridObject.data.vertices)}
+
+
+def runShapesCase(seed, squareRadius):
+    generate_cuttingShape0_2_8.randomSeed = seed
+    shapesCount = (squareRadius * 2) * (squareRadius * 2)
+
+    def setup():
+        clearScene()
+        return (squareRadius,)
+
+    meshDuration, meshPeakMemory, timedArguments = measure(setup, generate_cuttingShape0_2_8.generateCuttingShapesArray)
+    outputVertices = sum([len(currentMesh.vertices) for currentMesh in bpy.data.meshes])
+
+    # The same number of shapes, generated as polylines.
+    polylineDuration, polylinePeakMemory, timedArguments = measure(lambda: (list(range(0, shapesCount)), [(1.0, 1.0)] * shapesCount, 1), polylineShape_2_8.generateRectangleOutlines)
+
+    return {"name": "generateCuttingShapesArray_radius" + str(squareRadius),
+            "entryPoint": "generateCuttingShapesArray",
+            "inputFaces": shapesCount,
+            "time": meshDuration,
+            "timePerInputFace": meshDuration / shapesCount,
+            "timePerOutputPolygon": None,
+            "peakPythonMemory": meshPeakMemory,
+            "outputPolygons": 0,
+            "outputVertices": outputVertices,
+            "polylineTime": polylineDuration,
+            "polylinePeakPythonMemory": polylinePeakMemory}
+
+
+# Compare results with a baseline, on the time per input face.
+# Returns the names of the cases slower than the baseline by more than the threshold.
+def findRegressions(results, baselineResults, threshold):
+    baselineByName = {currentResult["name"]: currentResult for currentResult in baselineResults}
+
+    regressions = []
+    for currentResult in results:
+        baselineResult = baselineByName.get(currentResult["name"])
+        if baselineResult == None:
+            continue
+
+        ratio = currentResult["timePerInputFace"] / max(baselineResult["timePerInputFace"], 1e-12)
+        currentResult["baselineRatio"] = ratio
+        if ratio > 1.0 + threshold:
+            regressions.append(currentResult["name"])
+
+    return regressions
+
+
+def printResult(result):
+    line = result["name"] + ": " + "%.3fs" % result["time"] + ", " + "%.6fs" % result["timePerInputFace"] + " per input face"
+    if result["timePerOutputPolygon"] != None:
+        line = line + ", " + "%.6fs" % result["timePerOutputPolygon"] + " per output polygon"
+    line = line + ", " + str(result["outputPolygons"]) + " polygons, " + "%.1f" % (result["peakPythonMemory"] / 1048576.0) + "MB peak"
+    if result.get("baselineRatio") != None:
+        line = line + ", x" + "%.2f" % result["baselineRatio"] + " baseline"
+    print(line)
+
+
+def main():
+    arguments = parseArguments(sys.argv)
+
+    # The knife projection needs a 3D view, cut analytically instead.
+    cut_surface0_2_8.cutBackend = 'ANALYTIC'
+
+    # Settings modified by the cases, restored at the end.
+    originalSettings = (recursivityManager_2_8.recursiveDepth, recursivityManager_2_8.subdivisionOverCutProbability, recursivityManager_2_8.insetProbability)
+
+    results = []
+    for entryPoint, recursiveDepth, facesCount, subdivisionOverCutProbability, insetProbability in itertools.product(
+            parseList(arguments.entry_points, str),
+            parseList(arguments.depths, int),
+            parseList(arguments.faces, int),
+            parseList(arguments.subdivision_over_cut, float),
+            parseList(arguments.inset, float)):
+        results.append(runGenerationCase(entryPoint, arguments.seed, recursiveDepth, facesCount, subdivisionOverCutProbability, insetProbability))
+
+    for squareRadius in parseList(arguments.shapes_radii, int):
+        results.append(runShapesCase(arguments.seed, squareRadius))
+
+    recursivityManager_2_8.recursiveDepth, recursivityManager_2_8.subdivisionOverCutProbability, recursivityManager_2_8.insetProbability = originalSettings
+    clearScene()
+
+    regressions = []
+    if arguments.baseline != None and os.path.isfile(arguments.baseline):
+        with open(arguments.baseline, "r") as baselineFile:
+            regressions = findRegressions(results, json.load(baselineFile), arguments.threshold)
+
+    for currentResult in results:
+        printResult(currentResult)
+    peakProcessMemory = processPeakMemory()
+    if peakProcessMemory != None:
+        print("Peak process memory of the whole run: " + "%.1f" % (peakProcessMemory / 1048576.0) + "MB")
+
+    if arguments.output != None:
+        with open(arguments.output, "w") as outputFile:
+            json.dump(results, outputFile, indent=4)
+
+    if len(regressions) > 0:
+        print(str(len(regressions)) + " regressions over the baseline:")
+        for currentRegression in regressions:
+            print("    " + currentRegression)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import bpy
+
+import math
+import mathutils
+from mathutils.bvhtree import BVHTree
+from bpy_extras.object_utils import world_to_camera_view
+
+# Import submodules.
+import hardsurface_2_8
+
+# Utils.
+import utils_2_8
+hardsurface_2_8.reloadModule(utils_2_8)
+
+
+# Camera aware detail density, see applyToSelectedFaces.
+# Faces are detailed according to the size they are seen at from one or more cameras: a face spanning referenceScreenSize of the frame
+# gets the whole recursion depth, and each halving of its size removes one level, since each level roughly halves the size of the faces.
+# Faces that no camera sees, because they are out of the frame, back facing or hidden behind other geometry, are not detailed at all.
+
+referenceScreenSize = 0.25 # Fraction of the frame, along each side, a face spans to get the whole recursion depth.
+minimumProbabilityScale = 0.25 # Subdivision and inset probabilities are scaled by the screen size, down to this.
+cullBackFaces = True
+cullOccludedFaces = True
+occlusionTolerance = 0.001 # Relative distance under which a hit is the face itself rather than an occluder.
+samplesInset = 0.1 # The occlusion samples are the center and the corners moved this proportion toward the center.
+
+
+def findCameras(cameras):
+    foundCameras = []
+    for currentCamera in cameras:
+        if isinstance(currentCamera, str):
+            currentCamera = bpy.data.objects.get(currentCamera)
+        if currentCamera == None or currentCamera.type != 'CAMERA':
+            print("Detail camera not found: " + str(currentCamera))
+            continue
+        foundCameras.append(currentCamera)
+    return foundCameras
+
+
+# BVH tree of every visible mesh of the scene, in world space, for the occlusion tests.
+# Should be called in object mode.
+def sceneBVHTree(scene, depsgraph):
+    vertices = []
+    polygons = []
+    for currentObject in scene.objects:
+        if currentObject.type != 'MESH' or not currentObject.visible_get():
+            continue
+
+        evaluatedObject = currentObject.evaluated_get(depsgraph)
+        evaluatedMesh = evaluatedObject.to_mesh()
+        firstVertex = len(vertices)
+        vertices.extend([currentObject.matrix_world @ currentVertex.co for currentVertex in evaluatedMesh.vertices])
+        polygons.extend([[firstVertex + currentVertexIndex for currentVertexIndex in currentPolygon.vertices] for currentPolygon in evaluatedMesh.polygons])
+        evaluatedObject.to_mesh_clear()
+
+    return BVHTree.FromPolygons(vertices, polygons)
+
+
+# Size of a face seen from a camera, as a fraction of the frame along each side.
+# Returns 0 when the face is out of the frame.
+def projectedSize(scene, camera, worldVertices):
+    projectedVertices = [world_to_camera_view(scene, camera, currentVertex) for currentVertex in worldVertices]
+
+    inFront = [currentVertex for currentVertex in projectedVertices if currentVertex.z > 0]
+    if len(inFront) == 0:
+        return 0.0
+    # The face goes behind the camera, it is as close as can be.
+    if len(inFront) < len(projectedVertices):
+        return 1.0
+
+    minX = max(0.0, min([currentVertex.x for currentVertex in projectedVertices]))
+    maxX = min(1.0, max([currentVertex.x for currentVertex in projectedVertices]))
+    minY = max(0.0, min([currentVertex.y for currentVertex in projectedVertices]))
+    maxY = min(1.0, max([currentVertex.y for currentVertex in projectedVertices]))
+    if maxX <= minX or maxY <= minY:
+        return 0.0
+
+    return math.sqrt((maxX - minX) * (maxY - minY))
+
+
+# Direction the camera looks at a point along.
+def viewDirection(camera, worldPoint):
+    if camera.data.type == 'ORTHO':
+        return (camera.matrix_world.to_3x3() @ mathutils.Vector((0, 0, -1))).normalized()
+    return (worldPoint - camera.matrix_world.translation).normalized()
+
+
+def isBackFacing(camera, worldCenter, worldNormal):
+    return viewDirection(camera, worldCenter).dot(worldNormal) >= 0
+
+
+# A face is visible when a ray from the camera reaches one of its samples without hitting anything else first.
+def isOccluded(bvhTree, camera, worldSamples):
+    for currentSample in worldSamples:
+        direction = viewDirection(camera, currentSample)
+        if camera.data.type == 'ORTHO':
+            origin = currentSample - direction * camera.data.clip_end
+        else:
+            origin = camera.matrix_world.translation
+        sampleDistance = (currentSample - origin).length
+
+        hitLocation, hitNormal, hitIndex, hitDistance = bvhTree.ray_cast(origin, direction, sampleDistance * (1.0 + occlusionTolerance))
+        if hitLocation == None or hitDistance >= sampleDistance * (1.0 - occlusionTolerance):
+            return False
+
+    return True
+
+
+# Recursion depth and probabilities scale of each face, according to the size it is seen at from the cameras.
+# cameras are camera objects or their names.
+# Returns a (depth, probabilityScale) tuple per face, with a None depth for the faces no camera sees.
+# Should be called in object mode.
+def faceDetails(objectToBrowse, facesTuples, cameras, recursiveDepth):
+    cameras = findCameras(cameras)
+    if len(cameras) == 0:
+        return [(recursiveDepth, 1.0)] * len(facesTuples)
+
+    scene = bpy.context.scene
+    bvhTree = None
+    if cullOccludedFaces:
+        bvhTree = sceneBVHTree(scene, bpy.context.evaluated_depsgraph_get())
+
+    matrixWorld = objectToBrowse.matrix_world
+    normalMatrix = matrixWorld.to_3x3().inverted().transposed()
+
+    details = []
+    for currentFaceTuple in facesTuples:
+        faceIndex = utils_2_8.resolveFaceIndex(objectToBrowse, currentFaceTuple)
+        if faceIndex == None:
+            details.append((None, 1.0))
+            continue
+
+        worldVertices = [matrixWorld @ mathutils.Vector(currentVertex) for currentVertex in currentFaceTuple[1]]
+        worldCenter = sum(worldVertices, mathutils.Vector((0, 0, 0))) / len(worldVertices)
+        worldNormal = (normalMatrix @ objectToBrowse.data.polygons[faceIndex].normal).normalized()
+        worldSamples = [worldCenter] + [currentVertex.lerp(worldCenter, samplesInset) for currentVertex in worldVertices]
+
+        # The face gets the detail of the camera it is seen the largest from.
+        screenSize = 0.0
+        for currentCamera in cameras:
+            currentSize = projectedSize(scene, currentCamera, worldVertices)
+            if currentSize <= screenSize:
+                continue
+            if cullBackFaces and isBackFacing(currentCamera, worldCenter, worldNormal):
+                continue
+            if bvhTree != None and isOccluded(bvhTree, currentCamera, worldSamples):
+                continue
+            screenSize = currentSize
+
+        if screenSize <= 0:
+            details.append((None, 1.0))
+            continue
+
+        scale = min(1.0, screenSize / referenceScreenSize)
+        depth = recursiveDepth + int(math.floor(math.log2(scale)))
+        if depth < 0:
+            details.append((None, 1.0))
+        else:
+            details.append((depth, max(minimumProbabilityScale, scale)))
+
+    return details
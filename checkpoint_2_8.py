@@ -0,0 +1,95 @@
+import bpy
+
+import os
+import json
+import hardsurface_2_8
+
+# Utils.
+import utils_2_8
+hardsurface_2_8.reloadModule(utils_2_8)
+
+
+# Checkpoints of long generations, see applyToSelectedFaces.
+# A checkpoint is a state file along with a .blend file holding the partially detailed mesh.
+# The state refers to the mesh file it was written with, and is replaced atomically after it, so a crash while checkpointing leaves the
+# previous checkpoint usable.
+
+stateFileName = "checkpoint.json"
+
+
+def statePath(checkpointDirectory):
+    return os.path.join(checkpointDirectory, stateFileName)
+
+
+# Write a checkpoint of an object.
+# state is a JSON compatible dictionary, completed with the mesh file and the next face identity of the object.
+# Should be called in object mode.
+def writeCheckpoint(checkpointDirectory, objectToSave, state):
+    if not os.path.isdir(checkpointDirectory):
+        os.makedirs(checkpointDirectory)
+
+    previousMeshFile = None
+    previousState = readState(checkpointDirectory)
+    if previousState != None:
+        previousMeshFile = previousState.get("meshFile")
+
+    # Alternate between 2 mesh files, the previous one stays valid until the new state is written.
+    state["checkpointNumber"] = 0 if previousState == None else previousState.get("checkpointNumber", 0) + 1
+    state["meshFile"] = "checkpoint_mesh_" + str(state["checkpointNumber"] % 2) + ".blend"
+    state["meshName"] = objectToSave.data.name
+    state["nextFaceId"] = objectToSave.get(utils_2_8.nextFaceIdPropertyName, 1)
+
+    bpy.data.libraries.write(os.path.join(checkpointDirectory, state["meshFile"]), {objectToSave.data})
+
+    temporaryPath = statePath(checkpointDirectory) + ".tmp"
+    with open(temporaryPath, "w") as stateFile:
+        json.dump(state, stateFile)
+    os.replace(temporaryPath, statePath(checkpointDirectory))
+
+    if previousMeshFile != None and previousMeshFile != state["meshFile"]:
+        previousMeshPath = os.path.join(checkpointDirectory, previousMeshFile)
+        if os.path.isfile(previousMeshPath):
+            os.remove(previousMeshPath)
+
+
+def readState(checkpointDirectory):
+    if checkpointDirectory == None or not os.path.isfile(statePath(checkpointDirectory)):
+        return None
+
+    with open(statePath(checkpointDirectory), "r") as stateFile:
+        return json.load(stateFile)
+
+
+# Give an object the mesh of the last checkpoint.
+# Returns the state of the checkpoint, None when there is no checkpoint.
+# Should be called in object mode.
+def restoreCheckpoint(checkpointDirectory, objectToRestore):
+    state = readState(checkpointDirectory)
+    if state == None:
+        return None
+
+    with bpy.data.libraries.load(os.path.join(checkpointDirectory, state["meshFile"]), link=False) as (dataFrom, dataTo):
+        dataTo.meshes = [state["meshName"]]
+    restoredMesh = dataTo.meshes[0]
+
+    previousMesh = objectToRestore.data
+    objectToRestore.data = restoredMesh
+    if previousMesh.users == 0:
+        bpy.data.meshes.remove(previousMesh)
+    restoredMesh.name = state["meshName"]
+
+    # Identities given after the restart must not collide with the ones of the restored mesh.
+    objectToRestore[utils_2_8.nextFaceIdPropertyName] = state["nextFaceId"]
+
+    return state
+
+
+def clearCheckpoint(checkpointDirectory):
+    state = readState(checkpointDirectory)
+    if state == None:
+        return
+
+    meshPath = os.path.join(checkpointDirectory, state["meshFile"])
+    if os.path.isfile(meshPath):
+        os.remove(meshPath)
+    os.remove(statePath(checkpointDirectory))
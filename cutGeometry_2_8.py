@@ -0,0 +1,388 @@
+import math
+
+
+# Pure 2D geometry used by the analytic cut backend.
+# Nothing in here depends on Blender, points are plain (x, y) tuples expressed in a face's TBN space.
+
+
+# Tolerance used to keep the clipped cutting shape strictly inside the face to cut.
+clipMargin = 0.0001
+
+
+# Rebuild the loop order of a closed outline from its edges.
+# Returns the vertices indices in the order they are encountered when walking the loop, or None if the edges do not form a single loop.
+def orderedOutline(vertexCount, edgeKeys):
+    neighbours = [[] for currentIndex in range(0, vertexCount)]
+    for currentEdgeKey in edgeKeys:
+        neighbours[currentEdgeKey[0]].append(currentEdgeKey[1])
+        neighbours[currentEdgeKey[1]].append(currentEdgeKey[0])
+
+    # Start from the first vertex that is actually used by an edge.
+    startIndex = None
+    for currentIndex in range(0, vertexCount):
+        if len(neighbours[currentIndex]) > 0:
+            startIndex = currentIndex
+            break
+
+    if startIndex == None:
+        return None
+
+    loop = [startIndex]
+    previousIndex = None
+    currentIndex = startIndex
+    while True:
+        # Every vertex of a closed loop has exactly 2 neighbours.
+        if len(neighbours[currentIndex]) != 2:
+            return None
+
+        nextIndex = neighbours[currentIndex][0]
+        if nextIndex == previousIndex:
+            nextIndex = neighbours[currentIndex][1]
+
+        if nextIndex == startIndex:
+            break
+
+        loop.append(nextIndex)
+        previousIndex = currentIndex
+        currentIndex = nextIndex
+
+        # Guard against malformed outlines.
+        if len(loop) > vertexCount:
+            return None
+
+    return loop
+
+
+# Signed area of a polygon, positive when the polygon is counter clockwise.
+def signedArea(points):
+    area = 0.0
+    for currentIndex in range(0, len(points)):
+        a = points[currentIndex]
+        b = points[(currentIndex + 1) % len(points)]
+        area = area + a[0] * b[1] - b[0] * a[1]
+    return area * 0.5
+
+
+def polygonCentroid(points):
+    x = sum([currentPoint[0] for currentPoint in points]) / len(points)
+    y = sum([currentPoint[1] for currentPoint in points]) / len(points)
+    return (x, y)
+
+
+# Scale a polygon around its centroid.
+def scalePolygon(points, factor):
+    center = polygonCentroid(points)
+    return [(center[0] + (currentPoint[0] - center[0]) * factor, center[1] + (currentPoint[1] - center[1]) * factor) for currentPoint in points]
+
+
+# Move every edge of a counter clockwise polygon inward by distance, outward when distance is negative, as the crease of a cut does.
+# Sharp corners are clamped, the miter would go far away.
+def offsetOutline(points, distance):
+    offsetPoints = []
+    for currentIndex in range(0, len(points)):
+        normals = []
+        for a, b in ((points[currentIndex - 1], points[currentIndex]), (points[currentIndex], points[(currentIndex + 1) % len(points)])):
+            length = math.hypot(b[0] - a[0], b[1] - a[1])
+            if length == 0:
+                normals.append((0.0, 0.0))
+            else:
+                normals.append(((a[1] - b[1]) / length, (b[0] - a[0]) / length))
+        miterScale = max(1.0 + normals[0][0] * normals[1][0] + normals[0][1] * normals[1][1], 0.1)
+        point = points[currentIndex]
+        offsetPoints.append((point[0] + (normals[0][0] + normals[1][0]) * distance / miterScale, point[1] + (normals[0][1] + normals[1][1]) * distance / miterScale))
+    return offsetPoints
+
+
+# Returns True if the point is on the left side of the oriented segment (a, b).
+def isLeftOf(point, a, b):
+    return (b[0] - a[0]) * (point[1] - a[1]) - (b[1] - a[1]) * (point[0] - a[0]) >= 0
+
+
+def lineIntersection(p0, p1, a, b):
+    dx = p1[0] - p0[0]
+    dy = p1[1] - p0[1]
+    ex = b[0] - a[0]
+    ey = b[1] - a[1]
+    denominator = dx * ey - dy * ex
+    if denominator == 0:
+        return p1
+    t = ((a[0] - p0[0]) * ey - (a[1] - p0[1]) * ex) / denominator
+    return (p0[0] + t * dx, p0[1] + t * dy)
+
+
+# Sutherland-Hodgman clipping of any polygon against a convex counter clockwise polygon.
+def clipPolygon(subjectPoints, convexPoints):
+    resultPoints = list(subjectPoints)
+
+    for currentIndex in range(0, len(convexPoints)):
+        if len(resultPoints) == 0:
+            break
+
+        a = convexPoints[currentIndex]
+        b = convexPoints[(currentIndex + 1) % len(convexPoints)]
+
+        inputPoints = resultPoints
+        resultPoints = []
+        previousPoint = inputPoints[-1]
+        for currentPoint in inputPoints:
+            if isLeftOf(currentPoint, a, b):
+                if not isLeftOf(previousPoint, a, b):
+                    resultPoints.append(lineIntersection(previousPoint, currentPoint, a, b))
+                resultPoints.append(currentPoint)
+            elif isLeftOf(previousPoint, a, b):
+                resultPoints.append(lineIntersection(previousPoint, currentPoint, a, b))
+            previousPoint = currentPoint
+
+    # Clipping can leave consecutive duplicates where the subject touched the clipping polygon.
+    cleanPoints = []
+    for currentPoint in resultPoints:
+        if len(cleanPoints) == 0 or math.hypot(currentPoint[0] - cleanPoints[-1][0], currentPoint[1] - cleanPoints[-1][1]) > 1e-9:
+            cleanPoints.append(currentPoint)
+    if len(cleanPoints) > 1 and math.hypot(cleanPoints[0][0] - cleanPoints[-1][0], cleanPoints[0][1] - cleanPoints[-1][1]) <= 1e-9:
+        cleanPoints.pop()
+
+    return cleanPoints
+
+
+# Ray casting point in polygon test.
+def pointInPolygon(point, points):
+    inside = False
+    j = len(points) - 1
+    for i in range(0, len(points)):
+        a = points[i]
+        b = points[j]
+        if (a[1] > point[1]) != (b[1] > point[1]):
+            crossingX = (b[0] - a[0]) * (point[1] - a[1]) / (b[1] - a[1]) + a[0]
+            if point[0] < crossingX:
+                inside = not inside
+        j = i
+    return inside
+
+
+def segmentsIntersect(p0, p1, q0, q1):
+    def orientation(a, b, c):
+        value = (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+        if abs(value) < 1e-12:
+            return 0
+        return 1 if value > 0 else -1
+
+    return orientation(p0, p1, q0) * orientation(p0, p1, q1) < 0 and orientation(q0, q1, p0) * orientation(q0, q1, p1) < 0
+
+
+# Returns True when the segment (a, b) crosses an edge of the closed outline, other than the edges touching its vertex at skippedIndex.
+def crossesOutline(a, b, points, skippedIndex=None):
+    for currentIndex in range(0, len(points)):
+        nextIndex = (currentIndex + 1) % len(points)
+        if currentIndex == skippedIndex or nextIndex == skippedIndex:
+            continue
+        if segmentsIntersect(a, b, points[currentIndex], points[nextIndex]):
+            return True
+    return False
+
+
+# Find a bridge between the outer and the inner outlines, that crosses neither of them nor the forbidden segment, and runs between them.
+# Outer vertices are tried in the order of outerCandidates, and for each of them the nearest inner vertices first.
+# Returns the bridge as an (outer index, inner index) pair.
+def findBridge(outerPoints, innerPoints, outerCandidates, forbiddenSegment=None, excludedIndex=None):
+    for currentOuterIndex in outerCandidates:
+        outerPoint = outerPoints[currentOuterIndex]
+        candidates = sorted(range(0, len(innerPoints)), key=lambda currentIndex: math.hypot(innerPoints[currentIndex][0] - outerPoint[0], innerPoints[currentIndex][1] - outerPoint[1]))
+
+        for currentCandidate in candidates:
+            if currentCandidate == excludedIndex:
+                continue
+
+            candidatePoint = innerPoints[currentCandidate]
+            if crossesOutline(outerPoint, candidatePoint, innerPoints, currentCandidate) or crossesOutline(outerPoint, candidatePoint, outerPoints, currentOuterIndex):
+                continue
+            if forbiddenSegment != None and segmentsIntersect(outerPoint, candidatePoint, forbiddenSegment[0], forbiddenSegment[1]):
+                continue
+
+            # Without crossing, the bridge is either between the outlines or outside of them, at a concave vertex.
+            middlePoint = ((outerPoint[0] + candidatePoint[0]) * 0.5, (outerPoint[1] + candidatePoint[1]) * 0.5)
+            if pointInPolygon(middlePoint, outerPoints) and not pointInPolygon(middlePoint, innerPoints):
+                return currentOuterIndex, currentCandidate
+
+    # No clear bridge, fall back on the first outer vertex and its nearest inner vertex.
+    outerPoint = outerPoints[outerCandidates[0]]
+    candidates = sorted(range(0, len(innerPoints)), key=lambda currentIndex: math.hypot(innerPoints[currentIndex][0] - outerPoint[0], innerPoints[currentIndex][1] - outerPoint[1]))
+    for currentCandidate in candidates:
+        if currentCandidate != excludedIndex:
+            return outerCandidates[0], currentCandidate
+
+
+# Compute the faces resulting from cutting a counter clockwise face with an inner counter clockwise outline.
+# Mirrors the topology of the knife projection: the outer plate is split in 2 faces by 2 bridges, plus the inner face.
+# The face may be concave, the bridges are taken where they cross neither outline, from vertices of the face as far apart as possible.
+# Faces are returned as lists of indices in the concatenation of outerPoints and innerPoints.
+def cutFaceLoops(outerPoints, innerPoints):
+    outerCount = len(outerPoints)
+    innerCount = len(innerPoints)
+
+    aOuter, aBridge = findBridge(outerPoints, innerPoints, list(range(0, outerCount)))
+    # The second bridge starts from the opposite vertex of the face, or the nearest one to it.
+    halfIndex = aOuter + outerCount // 2
+    bOuterCandidates = []
+    for currentOffset in range(0, outerCount):
+        for currentIndex in (halfIndex + currentOffset, halfIndex - currentOffset):
+            if currentIndex % outerCount != aOuter and currentIndex % outerCount not in bOuterCandidates:
+                bOuterCandidates.append(currentIndex % outerCount)
+    bOuter, bBridge = findBridge(outerPoints, innerPoints, bOuterCandidates, forbiddenSegment=(outerPoints[aOuter], innerPoints[aBridge]), excludedIndex=aBridge)
+
+    # First plate face: outer vertices from aOuter to bOuter, then the inner outline backward from bBridge to aBridge.
+    aFace = [(aOuter + currentOffset) % outerCount for currentOffset in range(0, (bOuter - aOuter) % outerCount + 1)]
+    currentIndex = bBridge
+    while True:
+        aFace.append(outerCount + currentIndex)
+        if currentIndex == aBridge:
+            break
+        currentIndex = (currentIndex - 1) % innerCount
+
+    # Second plate face: outer vertices from bOuter to aOuter, then the inner outline backward from aBridge to bBridge.
+    bFace = [(bOuter + currentOffset) % outerCount for currentOffset in range(0, (aOuter - bOuter) % outerCount + 1)]
+    currentIndex = aBridge
+    while True:
+        bFace.append(outerCount + currentIndex)
+        if currentIndex == bBridge:
+            break
+        currentIndex = (currentIndex - 1) % innerCount
+
+    innerFace = [outerCount + currentIndex for currentIndex in range(0, innerCount)]
+
+    return [aFace, bFace], innerFace
+
+
+# Returns True when 2 edges of the outline cross each other.
+def selfIntersects(points):
+    pointsCount = len(points)
+    for aIndex in range(0, pointsCount):
+        # Consecutive edges share a vertex and can't cross.
+        for bIndex in range(aIndex + 2, pointsCount - 1 if aIndex == 0 else pointsCount):
+            if segmentsIntersect(points[aIndex], points[(aIndex + 1) % pointsCount], points[bIndex], points[(bIndex + 1) % pointsCount]):
+                return True
+    return False
+
+
+# Returns True when offsetting a counter clockwise outline by distance folds it: an edge turns around, short edges do when offset too far,
+# or edges cross each other, in narrow notches.
+def offsetFolds(points, distance):
+    offsetPoints = offsetOutline(points, distance)
+    for currentIndex in range(0, len(points)):
+        nextIndex = (currentIndex + 1) % len(points)
+        direction = (points[nextIndex][0] - points[currentIndex][0], points[nextIndex][1] - points[currentIndex][1])
+        offsetDirection = (offsetPoints[nextIndex][0] - offsetPoints[currentIndex][0], offsetPoints[nextIndex][1] - offsetPoints[currentIndex][1])
+        if direction[0] * offsetDirection[0] + direction[1] * offsetDirection[1] <= 0:
+            return True
+    return selfIntersects(offsetPoints)
+
+
+# Returns True when a polygon is inside another one, which may be concave, without crossing its outline.
+def polygonInPolygon(innerPoints, outerPoints):
+    for currentPoint in innerPoints:
+        if not pointInPolygon(currentPoint, outerPoints):
+            return False
+
+    for currentIndex in range(0, len(innerPoints)):
+        aPoint = innerPoints[currentIndex]
+        bPoint = innerPoints[(currentIndex + 1) % len(innerPoints)]
+        for currentOuterIndex in range(0, len(outerPoints)):
+            if segmentsIntersect(aPoint, bPoint, outerPoints[currentOuterIndex], outerPoints[(currentOuterIndex + 1) % len(outerPoints)]):
+                return False
+
+    return True
+
+
+# Clip a cutting outline against a face and return the points of the inner face, counter clockwise.
+# Returns None when nothing is left of the outline after clipping.
+def clipOutline(outlinePoints, facePoints):
+    clippedPoints = clipPolygon(outlinePoints, scalePolygon(facePoints, 1.0 - clipMargin))
+
+    if len(clippedPoints) < 3 or abs(signedArea(clippedPoints)) < 1e-12:
+        return None
+
+    if signedArea(clippedPoints) < 0:
+        clippedPoints.reverse()
+
+    return clippedPoints
+
+
+# Cut an outline in a face, both given as 2D points in the TBN space of the face, with the topology of cutFaceLoops.
+# The clipping needs a convex face. Without clipping the outline has to be inside the face, which may then be concave, as the inner face
+# of a plate.
+# With a margin, the inner face is to be creased by that offset: the clipping keeps it that far from the face outline, and the crease
+# has to fit on both sides of the inner outline.
+# Returns the points of the inner face, the plate faces and the inner face, the faces as lists of indices in the concatenation of
+# facePoints and the inner points. Returns None when the outline doesn't overlap the face, isn't inside it without clipping, or leaves
+# no room for the crease.
+def cutFace(facePoints, outlinePoints, clip=True, margin=0.0):
+    # The clipping expects a counter clockwise face, mirror everything when the face winds the other way.
+    # Mirroring both the face and the outline keeps the winding of the created faces consistent with the original face.
+    mirror = signedArea(facePoints) < 0
+    if mirror:
+        facePoints = [(currentPoint[0], -currentPoint[1]) for currentPoint in facePoints]
+        outlinePoints = [(currentPoint[0], -currentPoint[1]) for currentPoint in outlinePoints]
+
+    if clip:
+        innerPoints = clipOutline(outlinePoints, offsetOutline(facePoints, margin))
+    elif polygonInPolygon(outlinePoints, facePoints):
+        innerPoints = [(currentPoint[0], currentPoint[1]) for currentPoint in outlinePoints]
+        if signedArea(innerPoints) < 0:
+            innerPoints.reverse()
+    else:
+        innerPoints = None
+
+    # An outline crossing itself, as some notched shapes do, can't give a valid inner face.
+    if innerPoints == None or selfIntersects(innerPoints):
+        return None
+    if margin > 0:
+        if offsetFolds(innerPoints, margin) or offsetFolds(innerPoints, -margin):
+            return None
+        if not polygonInPolygon(offsetOutline(innerPoints, -margin), facePoints):
+            return None
+
+    plateLoops, innerLoop = cutFaceLoops(facePoints, innerPoints)
+
+    if mirror:
+        innerPoints = [(currentPoint[0], -currentPoint[1]) for currentPoint in innerPoints]
+
+    return innerPoints, plateLoops, innerLoop
+
+
+# Place a cutting shape generated for a face of dimension (faceWidth, faceHeight), see genericCutPlate.
+# The shape is scaled uniformly to fit the face with its notches, then a clean rectangle is fitted inside its inner bounds.
+# Returns the placed outline and the clean rectangle, counter clockwise, relative to the center of the face.
+def plateLayout(faceWidth, faceHeight, shapeOutline, edgesDepth, shapeMargin, cleanFaceMargin):
+    shapeDimension = (faceWidth * 0.5, faceHeight * 0.5)
+    # Edges without notch have no depth.
+    edgesDepth = [0.0 if currentDepth == None else currentDepth for currentDepth in edgesDepth]
+
+    outerBounds = [-shapeDimension[0] / 2 - max(0, edgesDepth[0]), # left
+                   -shapeDimension[1] / 2 - max(0, edgesDepth[1]), # bottom
+                   shapeDimension[0] / 2 + max(0, edgesDepth[2]), # right
+                   shapeDimension[1] / 2 + max(0, edgesDepth[3])] # up
+
+    outerBoundsDimension = (outerBounds[2] - outerBounds[0], outerBounds[3] - outerBounds[1])
+    outerBoundsOffset = ((outerBounds[2] + outerBounds[0]) * 0.5, (outerBounds[3] + outerBounds[1]) * 0.5)
+
+    # Scale the shape uniformly around its origin, and center it on the face.
+    translation = (-outerBoundsOffset[0], -outerBoundsOffset[1])
+    scaleFactor = shapeMargin * min(faceWidth / outerBoundsDimension[0], faceHeight / outerBoundsDimension[1])
+    placedOutline = [(currentPoint[0] * scaleFactor + translation[0], currentPoint[1] * scaleFactor + translation[1]) for currentPoint in shapeOutline]
+
+    # Inner bounds of the placed shape.
+    innerBounds = [(-shapeDimension[0] / 2 - min(0, edgesDepth[0])) * scaleFactor + translation[0], # left
+                   (-shapeDimension[1] / 2 - min(0, edgesDepth[1])) * scaleFactor + translation[1], # bottom
+                   ( shapeDimension[0] / 2 + min(0, edgesDepth[2])) * scaleFactor + translation[0], # right
+                   ( shapeDimension[1] / 2 + min(0, edgesDepth[3])) * scaleFactor + translation[1]] # up
+
+    innerBoundsDimension = (innerBounds[2] - innerBounds[0], innerBounds[3] - innerBounds[1])
+    innerBoundsOffset = ((innerBounds[2] + innerBounds[0]) * 0.5, (innerBounds[3] + innerBounds[1]) * 0.5)
+
+    # A rectangle fitting in the inner bounds.
+    cleanFaceHalfDimension = (innerBoundsDimension[0] * cleanFaceMargin * 0.5, innerBoundsDimension[1] * cleanFaceMargin * 0.5)
+    cleanFaceOutline = [(innerBoundsOffset[0] - cleanFaceHalfDimension[0], innerBoundsOffset[1] - cleanFaceHalfDimension[1]),
+                        (innerBoundsOffset[0] + cleanFaceHalfDimension[0], innerBoundsOffset[1] - cleanFaceHalfDimension[1]),
+                        (innerBoundsOffset[0] + cleanFaceHalfDimension[0], innerBoundsOffset[1] + cleanFaceHalfDimension[1]),
+                        (innerBoundsOffset[0] - cleanFaceHalfDimension[0], innerBoundsOffset[1] + cleanFaceHalfDimension[1])]
+
+    return placedOutline, cleanFaceOutline
@@ -3,38 +3,69 @@ import bmesh
 
 import mathutils
 import random
+import numpy as np
 from datetime import datetime
 from mathutils import Euler
 
 # Import submodules.
 import sys
 import os
-import importlib
 import copy
 
-blend_dir = os.path.dirname(bpy.data.filepath)
-if blend_dir not in sys.path:
-   sys.path.append(blend_dir)
+# Run from Blender's text editor, the other scripts are found next to the .blend file.
+if __name__ == "__main__":
+    blend_dir = os.path.dirname(bpy.data.filepath)
+    if blend_dir not in sys.path:
+        sys.path.append(blend_dir)
+
+import hardsurface_2_8
+if __name__ == "__main__":
+    hardsurface_2_8.startReloadPass()
 
 # Cutting shapes generation.
 import generate_cuttingShape0_2_8
-importlib.reload(generate_cuttingShape0_2_8)
+hardsurface_2_8.reloadModule(generate_cuttingShape0_2_8)
 from generate_cuttingShape0_2_8 import *
 
 # Utils.
 import utils_2_8
-importlib.reload(utils_2_8)
+hardsurface_2_8.reloadModule(utils_2_8)
 from utils_2_8 import *
 
+# Analytic cut geometry.
+import cutGeometry_2_8
+hardsurface_2_8.reloadModule(cutGeometry_2_8)
+
+# Cutting shapes library.
+import cuttingShapeCache_2_8
+hardsurface_2_8.reloadModule(cuttingShapeCache_2_8)
+
+# Instrumentation.
+import profiler_2_8
+hardsurface_2_8.reloadModule(profiler_2_8)
+
 
 cuttingShapeMargin = 0.9
 cleanFaceMargin = 0.9
 bevelOffset = 0.01
+# Number of different cutting shapes the cuts pick from, bounded so that the shapes library gets reused.
+cuttingShapeVariants = 100000
 
+# Cut backend, 'KNIFE' uses the knife projection operator and needs a 3D view,
+# 'ANALYTIC' clips the cutting shape against the face in its TBN space and writes the resulting faces with bmesh.
+cutBackend = 'KNIFE'
 
+# When True, the creases of the plates are not made by each cut: the cut outlines are flagged in an edge layer and
+# applyPendingCreases creases all of them in a single bevel, once the recursion is done.
+# executePlan of recursivityManager_2_8 turns it on while it replays a plan, cuts made on their own crease right away.
+deferCreases = False
+pendingCreaseLayerName = "hardsurface_pendingCrease"
+
+
+@profiler_2_8.profiled("knifeProject", 0)
 def knifeProject(surfaceToCut, surfaceCuter, position, tbnMatrix):
     
-    bpy.ops.object.mode_set(mode = 'OBJECT')
+    setObjectMode('OBJECT')
     
     # Check arguments.
     if surfaceToCut == None or surfaceCuter == None:
@@ -56,7 +87,8 @@ def knifeProject(surfaceToCut, surfaceCuter, position, tbnMatrix):
     # And translate it.
     bpy.ops.transform.translate(value=(position[0], position[1], position[2]), orient_type='GLOBAL', orient_matrix=((1, 0, 0), (0, 1, 0), (0, 0, 1)), orient_matrix_type='GLOBAL')
     
-    print("position = " + str(position))
+    if profiler_2_8.verbose:
+        print("position = " + str(position))
     
     
     
@@ -72,13 +104,13 @@ def knifeProject(surfaceToCut, surfaceCuter, position, tbnMatrix):
     bpy.ops.wm.redraw_timer(type='DRAW_WIN_SWAP', iterations=1)
     
     # The knife project has to be used in edit mode.
-    bpy.ops.object.mode_set(mode = 'EDIT')
+    setObjectMode('EDIT')
 
     # Knife cutting operation.
     bpy.ops.mesh.knife_project(override)
     
     # Go back to object mode. This forces an update of the mesh's internal data.
-    bpy.ops.object.mode_set(mode = 'OBJECT')
+    setObjectMode('OBJECT')
     
     # Reset the view to it's configuration before the knife project.
     setRegion3D(override, originalRegion3D)
@@ -92,11 +124,196 @@ def knifeProject(surfaceToCut, surfaceCuter, position, tbnMatrix):
     return resultingPolygon
 
 
+# Returns the outline of a cutting shape as 2D points, in the same space the knife projection sees them before being placed on the face.
+def cuttingShapeOutline(surfaceCuter):
+    cuterMesh = surfaceCuter.data
+    outlineIndices = cutGeometry_2_8.orderedOutline(len(cuterMesh.vertices), [currentEdge.key for currentEdge in cuterMesh.edges])
+
+    if outlineIndices == None:
+        return None
+
+    outlinePoints = []
+    for currentVertexIndex in outlineIndices:
+        currentWorldCoords = surfaceCuter.matrix_world @ cuterMesh.vertices[currentVertexIndex].co
+        outlinePoints.append((currentWorldCoords.x, currentWorldCoords.y))
+
+    return outlinePoints
+
+
+# Find the face lying under a point, in the plane described by the TBN matrix.
+# Used when the face to cut is not known, for example after a crease re-indexed the faces.
+def findFaceUnderPoint(surfaceToCut, position, tbnMatrix):
+    normal = tbnMatrix[2]
+    matrixWorld = surfaceToCut.matrix_world
+    meshToCut = surfaceToCut.data
+
+    foundFaceIndex = None
+    foundDistance = sys.float_info.max
+
+    for currentPolygon in meshToCut.polygons:
+        if currentPolygon.normal.dot(normal) < 0.99:
+            continue
+
+        # Distance from the point to the plane of the face.
+        planeDistance = abs(normal.dot(matrixWorld @ currentPolygon.center - position))
+        if planeDistance >= foundDistance:
+            continue
+
+        facePoints = []
+        for currentVertexIndex in currentPolygon.vertices:
+            currentTangentCoords = tbnMatrix @ (matrixWorld @ meshToCut.vertices[currentVertexIndex].co - position)
+            facePoints.append((currentTangentCoords.x, currentTangentCoords.y))
+
+        if cutGeometry_2_8.pointInPolygon((0.0, 0.0), facePoints):
+            foundFaceIndex = currentPolygon.index
+            foundDistance = planeDistance
+
+    return foundFaceIndex
+
+
+# Cut an outline, given as 2D points in the TBN space of the face centered on position, directly in the mesh.
+# The resulting topology is the same as the one of the knife projection: the outer plate and the inner face, which is left selected.
+# The clipping needs a convex face, an outline known to be inside the face, like the clean face inside a plate, is cut without clipping.
+@profiler_2_8.profiled("analyticCut", 0)
+def analyticCut(surfaceToCut, outlinePoints, position, tbnMatrix, faceIndex=None, clip=True):
+
+    setObjectMode('OBJECT')
+
+    if faceIndex == None:
+        faceIndex = findFaceUnderPoint(surfaceToCut, position, tbnMatrix)
+
+    if faceIndex == None:
+        print("analytic cut could not find a face under position = " + str(position))
+        return
+
+    meshToCut = surfaceToCut.data
+    matrixWorld = surfaceToCut.matrix_world
+    inverseMatrixWorld = matrixWorld.inverted()
+    tangent = tbnMatrix[0]
+    biTangent = tbnMatrix[1]
+
+    bm = bmesh.new()
+    bm.from_mesh(meshToCut)
+    bm.faces.ensure_lookup_table()
+
+    faceToCut = bm.faces[faceIndex]
+    outerVerts = list(faceToCut.verts)
+
+    # Express the face in the TBN space, centered on the cut position.
+    outerPoints = []
+    for currentVert in outerVerts:
+        currentTangentCoords = tbnMatrix @ (matrixWorld @ currentVert.co - position)
+        outerPoints.append((currentTangentCoords.x, currentTangentCoords.y))
+
+    cutResult = cutGeometry_2_8.cutFace(outerPoints, outlinePoints, clip)
+    if cutResult == None:
+        print("analytic cut outline does not overlap the face " + str(faceIndex))
+        bm.free()
+        return
+
+    innerPoints, plateLoops, innerLoop = cutResult
+
+    # Create the inner vertices back in the object's space.
+    allVerts = list(outerVerts)
+    for currentPoint in innerPoints:
+        worldCoords = position + tangent * currentPoint[0] + biTangent * currentPoint[1]
+        allVerts.append(bm.verts.new(inverseMatrixWorld @ worldCoords))
+
+    # New faces inherit the attributes of the cut face (material, smoothing, custom layers).
+    newFaces = [bm.faces.new([allVerts[currentIndex] for currentIndex in currentLoop], faceToCut) for currentLoop in plateLoops]
+    innerFace = bm.faces.new([allVerts[currentIndex] for currentIndex in innerLoop], faceToCut)
+    newFaces.append(innerFace)
+    
+    # Except its identity, which belongs to none of them, as for the side faces of insetBatch.
+    faceIdLayer = bm.faces.layers.int.get(faceIdLayerName)
+    if faceIdLayer != None:
+        for currentFace in newFaces:
+            currentFace[faceIdLayer] = 0
+
+    bmesh.ops.delete(bm, geom=[faceToCut], context='FACES_ONLY')
+
+    # Leave only the inner face selected, as the knife projection does.
+    for currentElements in (bm.verts, bm.edges, bm.faces):
+        for currentElement in currentElements:
+            currentElement.select = False
+    innerFace.select_set(True)
+
+    bm.faces.index_update()
+    innerFaceIndex = innerFace.index
+
+    bm.to_mesh(meshToCut)
+    bm.free()
+    meshToCut.update()
+
+    return meshToCut.polygons[innerFaceIndex]
+
+
+# Same contract as knifeProject, without any operator or 3D view involved.
+def analyticProject(surfaceToCut, surfaceCuter, position, tbnMatrix, faceIndex=None):
+
+    setObjectMode('OBJECT')
+
+    # Check arguments.
+    if surfaceToCut == None or surfaceCuter == None:
+        print("analytic projection tentative with wrong arguments:")
+        print("surfaceToCut = " + str(surfaceToCut))
+        print("surfaceCuter = " + str(surfaceCuter))
+        return
+
+    outlinePoints = cuttingShapeOutline(surfaceCuter)
+    if outlinePoints == None:
+        print("cutting shape " + surfaceCuter.name + " is not a closed outline")
+        return
+
+    return analyticCut(surfaceToCut, outlinePoints, position, tbnMatrix, faceIndex)
+
+
+# Create a cutting shape object from an outline, for the knife projection.
+def createOutlineObject(outlinePoints):
+    outlineMesh = bpy.data.meshes.new("outline_cuttingShape_mesh")
+    outlineMesh.from_pydata([(currentPoint[0], currentPoint[1], 0) for currentPoint in outlinePoints], [(currentIndex, (currentIndex + 1) % len(outlinePoints)) for currentIndex in range(0, len(outlinePoints))], [])
+    outlineMesh.update()
+
+    outlineObject = bpy.data.objects.new("outline_cuttingShape", outlineMesh)
+    bpy.context.scene.collection.objects.link(outlineObject)
+
+    return outlineObject
+
+
+# Cut an outline, given as 2D points in the TBN space of the face centered on position, using the chosen backend.
+# The face index and clip are only hints for the analytic backend, the knife projection always cuts what is under the shape.
+def cutOutline(surfaceToCut, outlinePoints, position, tbnMatrix, backend=None, faceIndex=None, clip=True):
+    if backend == None:
+        backend = cutBackend
+
+    # The knife projection needs a 3D view, fall back on the analytic cut when there is none (background mode).
+    if backend == 'KNIFE' and not hasViewport():
+        backend = 'ANALYTIC'
+
+    if backend == 'ANALYTIC':
+        return analyticCut(surfaceToCut, outlinePoints, position, tbnMatrix, faceIndex, clip)
+    elif backend == 'KNIFE':
+        setObjectMode('OBJECT')
+        cuttingShape = createOutlineObject(outlinePoints)
+
+        resultingFace = knifeProject(surfaceToCut, cuttingShape, position, tbnMatrix)
+
+        # Delete the no longer needed cutting shape.
+        dataToRemove = cuttingShape.data
+        bpy.data.objects.remove(cuttingShape)
+        bpy.data.meshes.remove(dataToRemove)
+
+        return resultingFace
+    else:
+        print("Unknown cut backend: " + str(backend))
+
+
 # Adds a crease in a surface, to simulate metal plates joining.
 # For this function the edge to crease (resulting from the cut) must be selected.
+@profiler_2_8.profiled("addCutCrease", 0)
 def addCutCrease(surfaceToCrease):
     bpy.context.view_layer.objects.active = surfaceToCrease
-    bpy.ops.object.mode_set(mode = 'EDIT')
+    setObjectMode('EDIT')
     
     # Set the edges of the crease as sharp.
     bpy.ops.mesh.mark_sharp()
@@ -104,6 +321,14 @@ def addCutCrease(surfaceToCrease):
     # Create a bevel, the cutting shape of only one segment becomes 3 segments after this.
     bpy.ops.mesh.bevel(offset_type='OFFSET', offset=bevelOffset, offset_pct=0, segments=2, profile=0.5, vertex_only=False, clamp_overlap=True, loop_slide=True, mark_seam=False, mark_sharp=True)
     
+    # The bevel faces, left selected, copy the identity of the faces around, it belongs to none of them.
+    bm = bmesh.from_edit_mesh(surfaceToCrease.data)
+    faceIdLayer = bm.faces.layers.int.get(faceIdLayerName)
+    if faceIdLayer != None:
+        for currentFace in bm.faces:
+            if currentFace.select:
+                currentFace[faceIdLayer] = 0
+        bmesh.update_edit_mesh(surfaceToCrease.data)
     
     # Select less to only keep the middle segment selected.
     bpy.ops.mesh.select_less()
@@ -112,80 +337,135 @@ def addCutCrease(surfaceToCrease):
     bpy.ops.mesh.mark_sharp()
     
     # Lower the middle segment to create the crease.
-    bpy.ops.transform.shrink_fatten(value=bevelOffset)
+    # This is what shrink_fatten does, written on the bmesh since transform operators can't run in background mode.
+    bm = bmesh.from_edit_mesh(surfaceToCrease.data)
+    bm.normal_update()
+    for currentVert in [currentVert for currentVert in bm.verts if currentVert.select]:
+        currentVert.co = currentVert.co - currentVert.normal * bevelOffset
+    bmesh.update_edit_mesh(surfaceToCrease.data)
 
     
     # Go back to object mode.
-    bpy.ops.object.mode_set(mode = 'OBJECT')
-    
-    
-# Computes the borders of a given face in world space. This includes the size of the parent object.
-# The face should be a rectangular quad.
-# Warning: This algorithm assumes that the face is axis aligned.
-def rectangleBorders(parentObject, face, tbnMatrix):
-    minX = sys.float_info.max
-    maxX = -sys.float_info.max
-    minY = sys.float_info.max
-    maxY = -sys.float_info.max
-    
-    for currentVertexIndex in face.vertices:
-        currentVertex = face.id_data.vertices[currentVertexIndex]
-        currentWorldCoords = parentObject.matrix_world @ currentVertex.co
-        currentTangentCoords = tbnMatrix @ currentWorldCoords
-        if currentTangentCoords.x < minX:
-            minX = currentTangentCoords.x
-        if currentTangentCoords.x > maxX:
-            maxX = currentTangentCoords.x
-        if currentTangentCoords.y < minY:
-            minY = currentTangentCoords.y
-        if currentTangentCoords.y > maxY:
-            maxY = currentTangentCoords.y
-    
-    return (minX, maxX, minY, maxY)
-
-
-# Basicaly computes the mean position of the rectangles 4 vertices to return it's center.
-def rectangleCenter(parentObject, face):
-    meanPosition = mathutils.Vector((0,0,0))
-    for currentVertexIndex in face.vertices:
-        # Find the vertex.
-        currentVertex = face.id_data.vertices[currentVertexIndex]
-        # Compute it's world coordinates.
-        currentWorldCoords = parentObject.matrix_world @ currentVertex.co
-        # Add it to the mean position.
-        meanPosition = meanPosition + currentWorldCoords
+    setObjectMode('OBJECT')
+    
+    
+# Flag the selected edges, the outline of a cut, to be creased later by applyPendingCreases.
+# Should be called in object mode.
+def markPendingCrease(surfaceToCrease):
+    mesh = surfaceToCrease.data
+    selection = np.empty(len(mesh.edges), dtype=bool)
+    mesh.edges.foreach_get("select", selection)
+    
+    # Generic attributes only exist from Blender 2.91 on, older versions go through a bmesh.
+    if hasattr(mesh, "attributes"):
+        pendingAttribute = mesh.attributes.get(pendingCreaseLayerName)
+        if pendingAttribute == None:
+            pendingAttribute = mesh.attributes.new(pendingCreaseLayerName, 'INT', 'EDGE')
+        pendingValues = np.empty(len(mesh.edges), dtype=np.int32)
+        pendingAttribute.data.foreach_get("value", pendingValues)
+        pendingValues[selection] = 1
+        pendingAttribute.data.foreach_set("value", pendingValues)
+        return
+    
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
+    pendingLayer = bm.edges.layers.int.get(pendingCreaseLayerName)
+    if pendingLayer == None:
+        pendingLayer = bm.edges.layers.int.new(pendingCreaseLayerName)
+    for currentEdge in bm.edges:
+        if currentEdge.select:
+            currentEdge[pendingLayer] = 1
+    bm.to_mesh(mesh)
+    bm.free()
+
+
+# Crease every flagged cut outline of an object at once, the same crease as addCutCrease in a single bmesh pass.
+@profiler_2_8.profiled("applyPendingCreases", 0)
+def applyPendingCreases(surfaceToCrease):
+    setObjectMode('OBJECT')
+    
+    mesh = surfaceToCrease.data
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
+    
+    pendingLayer = bm.edges.layers.int.get(pendingCreaseLayerName)
+    if pendingLayer == None:
+        bm.free()
+        return
+    
+    edgesToCrease = [currentEdge for currentEdge in bm.edges if currentEdge[pendingLayer] != 0]
+    for currentEdge in bm.edges:
+        currentEdge[pendingLayer] = 0
+    
+    if len(edgesToCrease) > 0:
+        # Set the edges of the crease as sharp.
+        for currentEdge in edgesToCrease:
+            currentEdge.smooth = False
         
-    return meanPosition / len(face.vertices)
+        # Create a bevel, the cutting shape of only one segment becomes 3 segments after this.
+        verticesToCrease = list(set([currentVert for currentEdge in edgesToCrease for currentVert in currentEdge.verts]))
+        bevelArguments = {"offset": bevelOffset, "offset_type": 'OFFSET', "segments": 2, "profile": 0.5, "clamp_overlap": True, "loop_slide": True, "mark_seam": False, "mark_sharp": True}
+        # The vertex_only option became affect in Blender 2.90.
+        if bpy.app.version >= (2, 90, 0):
+            bevelArguments["affect"] = 'EDGES'
+        else:
+            bevelArguments["vertex_only"] = False
+        bevelResult = bmesh.ops.bevel(bm, geom=edgesToCrease + verticesToCrease, **bevelArguments)
         
+        # The bevel faces copy the identity of the faces around, it belongs to none of them.
+        faceIdLayer = bm.faces.layers.int.get(faceIdLayerName)
+        if faceIdLayer != None:
+            for currentFace in bevelResult["faces"]:
+                currentFace[faceIdLayer] = 0
         
+        # The middle segment is made of the vertices only used by the bevel faces.
+        bevelFaces = set(bevelResult["faces"])
+        middleVertices = [currentVert for currentVert in bevelResult["verts"] if len(currentVert.link_faces) > 0 and all([currentFace in bevelFaces for currentFace in currentVert.link_faces])]
+        middleVerticesSet = set(middleVertices)
+        
+        # Set the bottom of the crease as sharp.
+        for currentVert in middleVertices:
+            for currentEdge in currentVert.link_edges:
+                if currentEdge.other_vert(currentVert) in middleVerticesSet:
+                    currentEdge.smooth = False
+        
+        # Lower the middle segment to create the crease, as shrink_fatten does.
+        bm.normal_update()
+        loweredPositions = [currentVert.co - currentVert.normal * bevelOffset for currentVert in middleVertices]
+        for currentVert, currentPosition in zip(middleVertices, loweredPositions):
+            currentVert.co = currentPosition
     
+    bm.to_mesh(mesh)
+    bm.free()
+    mesh.update()
+    clearFaceFrames(mesh)
+
 
 # Cuts a random shape in a surface, then gives it a crease to make it look like a plate.
-def cutPlate(seed, objectToCut, cuttingShape, position, tbnMatrix):
+# The cutting shape is an outline of 2D points in the TBN space of the face, centered on position.
+def cutPlate(objectToCut, cuttingOutline, position, tbnMatrix, backend=None, faceIndex=None):
     
-    # Initialize the random seed, this is important in order to generate exactly the same content for a given seed.
-    random.seed(seed)
-
     # Use the cutting shape to cut the currently selected surface.
-    resultingFace = knifeProject(objectToCut, cuttingShape, position, tbnMatrix)
-
-    # Delete the no longer needed cutting shape.
-    dataToRemove = cuttingShape.data
-    bpy.data.objects.remove(cuttingShape)
-    bpy.data.meshes.remove(dataToRemove)
+    resultingFace = cutOutline(objectToCut, cuttingOutline, position, tbnMatrix, backend, faceIndex)
     
-    # Crease the cut surface.
-    addCutCrease(objectToCut)
+    # Crease the cut surface, or flag it to be creased with the other cuts.
+    if deferCreases:
+        setObjectMode('OBJECT')
+        markPendingCrease(objectToCut)
+    else:
+        addCutCrease(objectToCut)
 
     return resultingFace
 
 
 # The responsibility of this function is to generate the cutting shape and place it correctly for the cutPlate function.
 # It should then cut the inner rectangle to enable recursivity.
-def genericCutPlate(seed, objectToCut, faceTuple):
+@profiler_2_8.profiled("genericCutPlate", 1)
+def genericCutPlate(seed, objectToCut, faceTuple, backend=None, shapeSeed=None, tangent=None):
     
-    print()
-    print("new cut")
+    if profiler_2_8.verbose:
+        print()
+        print("new cut")
     
     if objectToCut == None:
         print("Tried to cut a None object")
@@ -196,113 +476,58 @@ def genericCutPlate(seed, objectToCut, faceTuple):
         return
     
     # Find the face in the object.
-    faceToCut = objectToCut.data.polygons[faceTuple[0]]
+    faceToCutIndex = resolveFaceIndex(objectToCut, faceTuple)
     
-    if faceToCut == None:
+    if faceToCutIndex == None:
         print("Tried to cut a None face")
         return
     
-    # Compute normal and tangent of the current face to cut.
-    normalForCuts = faceToCut.normal.copy()
-    tangentForCuts = faceTangent(objectToCut, faceToCut.index).copy()
-    # Compute the biTangent thanks to the normal and tangent.
-    biTangentForCuts = normalForCuts.cross(tangentForCuts)
+    faceToCut = objectToCut.data.polygons[faceToCutIndex]
     
-    # Assemble a TBN matrix from the normal, tangent and bitangent of the face.
-    tbnMatrix = mathutils.Matrix([
-    [tangentForCuts.x,      tangentForCuts.y,   tangentForCuts.z    ],
-    [biTangentForCuts.x,    biTangentForCuts.y, biTangentForCuts.z  ],
-    [normalForCuts.x,       normalForCuts.y,    normalForCuts.z     ]
-    ])
+    # The TBN matrix, borders and center of the face, precomputed for the whole recursion level when possible.
+    faceFrame = getFaceFrame(objectToCut, faceToCut.index)
+    # A planned tangent keeps the cutting shape in the orientation it was planned in, whatever the first edge of the face is.
+    if tangent != None:
+        faceFrame = orientFaceFrame(faceFrame, tangent)
+    tbnMatrix = faceFrame["tbn"]
     
-    # Initialize the random seed, this is important in order to generate exactly the same content for a given seed.
-    random.seed(seed)
+    # Random stream of this cut, this is important in order to generate exactly the same content for a given seed.
+    randomStream = random.Random(seed)
     
-    # Compute the dimension of the face to cut.
-    rectBorders = rectangleBorders(objectToCut, faceToCut, tbnMatrix)
+    # Dimension of the face to cut.
+    rectBorders = faceFrame["borders"]
     
-    # Compute the center of the face to cut.
-    faceCenter = rectangleCenter(objectToCut, faceToCut)
-    print("faceCenter = " + str(faceCenter))
+    # Center of the face to cut.
+    faceCenter = faceFrame["center"]
+    if profiler_2_8.verbose:
+        print("faceCenter = " + str(faceCenter))
     
     rectDimension = (rectBorders[0], rectBorders[1], rectBorders[2], rectBorders[3])
     
     faceWidth   = rectDimension[1] - rectDimension[0]
     faceHeight  = rectDimension[3] - rectDimension[2]
 
-    # Generate a cutting shape
+    # Generate a cutting shape, or take it from the library if it was already generated.
+    if shapeSeed == None:
+        shapeSeed = randomStream.randint(0, cuttingShapeVariants)
     cuttingShapeDimension = (faceWidth * 0.5, faceHeight * 0.5)
-    cuttingShape, edgesDepth = generateRectangleCuttingShape(seed=random.randint(0, 100000), position=(0,0,0), dimension=cuttingShapeDimension, recursionDepth=0)
-    
-    cuttingShapeOuterBounds =  [-cuttingShapeDimension[0]/2 - max(0, edgesDepth[0]), # left
-                                -cuttingShapeDimension[1]/2 - max(0, edgesDepth[1]), # bottom
-                                cuttingShapeDimension[0]/2 + max(0, edgesDepth[2]), # right
-                                cuttingShapeDimension[1]/2 + max(0, edgesDepth[3])] # up
-
-    cuttingShapeOuterBoundsDimension = (cuttingShapeOuterBounds[2] - cuttingShapeOuterBounds[0], # width
-                                        cuttingShapeOuterBounds[3] - cuttingShapeOuterBounds[1]) # height
-                                        
-    cuttingShapeOuterBoundsOffset = ((  cuttingShapeOuterBounds[2] + cuttingShapeOuterBounds[0]) * 0.5, # width
-                                    (   cuttingShapeOuterBounds[3] + cuttingShapeOuterBounds[1]) * 0.5) # height
-    
+    cuttingShapeOutline, edgesDepth = cuttingShapeCache_2_8.getRectangleCuttingShape(seed=shapeSeed, dimension=cuttingShapeDimension, recursionDepth=0)
     
-    # Translation.
-    cuttingShapeTranslation = (-cuttingShapeOuterBoundsOffset[0], -cuttingShapeOuterBoundsOffset[1], 0)
-    bpy.ops.transform.translate(value=cuttingShapeTranslation, orient_type='GLOBAL', orient_matrix=((1, 0, 0), (0, 1, 0), (0, 0, 1)), orient_matrix_type='GLOBAL')
-    
-    
-    # The cutting shape should be re-scaled and translated to fit the face to cut.
-    # Scale it uniformly however.
-    cuttingShapeScaleFactor = cuttingShapeMargin * min(faceWidth / cuttingShapeOuterBoundsDimension[0], faceHeight / cuttingShapeOuterBoundsDimension[1])
-    # Correct center for the resize.
-    bpy.context.scene.tool_settings.transform_pivot_point = 'MEDIAN_POINT'
-    # Resize operation.
-    bpy.ops.transform.resize(value=(cuttingShapeScaleFactor, cuttingShapeScaleFactor, 1), orient_type='GLOBAL', orient_matrix=((1, 0, 0), (0, 1, 0), (0, 0, 1)), orient_matrix_type='GLOBAL')
-
-    
-    # After this rescale, the inner bounds can be calculated
-    # Compute the inner bounds of the cutting shape.
-    cuttingShapeInnerBounds =  [(-cuttingShapeDimension[0]/2 - min(0, edgesDepth[0])) * cuttingShapeScaleFactor + cuttingShapeTranslation[0], # left
-                                (-cuttingShapeDimension[1]/2 - min(0, edgesDepth[1])) * cuttingShapeScaleFactor + cuttingShapeTranslation[1] , # bottom
-                                ( cuttingShapeDimension[0]/2 + min(0, edgesDepth[2])) * cuttingShapeScaleFactor + cuttingShapeTranslation[0], # right
-                                ( cuttingShapeDimension[1]/2 + min(0, edgesDepth[3])) * cuttingShapeScaleFactor + cuttingShapeTranslation[1]] # up
-
-    cuttingShapeInnerBoundsDimension = (cuttingShapeInnerBounds[2] - cuttingShapeInnerBounds[0], # width
-                                        cuttingShapeInnerBounds[3] - cuttingShapeInnerBounds[1]) # height
-                                        
-    cuttingShapeInnerBoundsOffset = (   (cuttingShapeInnerBounds[2] + cuttingShapeInnerBounds[0]) * 0.5, # width
-                                        (cuttingShapeInnerBounds[3] + cuttingShapeInnerBounds[1]) * 0.5) # height
+    # The cutting shape is re-scaled and translated to fit the face to cut, and a clean rectangle is fitted in its inner bounds.
+    cuttingShapeOutline, cleanFaceOutline = cutGeometry_2_8.plateLayout(faceWidth, faceHeight, cuttingShapeOutline, edgesDepth, cuttingShapeMargin, cleanFaceMargin)
     
     # Cut the plate with the tech-ish shape.
-    resultingFace = cutPlate(seed, objectToCut, cuttingShape, faceCenter, tbnMatrix)
+    resultingFace = cutPlate(objectToCut, cuttingShapeOutline, faceCenter, tbnMatrix, backend, faceToCut.index)
     
     ## Cut the surface again to have a clean surface to work with for recursivity.
-    # Generate a plane cutting shape.
-    bpy.ops.mesh.primitive_plane_add(size=1, align='WORLD', enter_editmode=True, location=((0,0,0)))
-    # Re-scale to fit the plane in the inner bounds.
-    cleanFaceScale = (cuttingShapeInnerBoundsDimension[0] * cleanFaceMargin, cuttingShapeInnerBoundsDimension[1] * cleanFaceMargin, 1)
-    bpy.ops.transform.resize(value=cleanFaceScale, orient_type='GLOBAL', orient_matrix=((1, 0, 0), (0, 1, 0), (0, 0, 1)), orient_matrix_type='GLOBAL')
-    # Translate to fit the plane in the inner bounds.
-    cleanFaceTranslation = (cuttingShapeInnerBoundsOffset[0], cuttingShapeInnerBoundsOffset[1], 0)
-    bpy.ops.transform.translate(value=cleanFaceTranslation, orient_type='GLOBAL', orient_matrix=((1, 0, 0), (0, 1, 0), (0, 0, 1)), orient_matrix_type='GLOBAL')
-
-    # Go back to object mode.
-    bpy.ops.object.mode_set(mode = 'OBJECT')
- 
-    # The cutting plane is the active object.
-    cuttingShape = bpy.context.active_object
-    
-    # Use the cutting shape to cut the currently selected surface.
-    resultingFace = knifeProject(objectToCut, cuttingShape, faceCenter, tbnMatrix)
-    
-    # Delete the no longer needed cutting shape.
-    dataToRemove = cuttingShape.data
-    bpy.data.objects.remove(cuttingShape)
-    bpy.data.meshes.remove(dataToRemove)
+    # The face under the center is the inner face of the plate, found again since creasing re-indexes the faces.
+    # It is concave where the shape has notches, the clean face is inside it and cut without clipping.
+    resultingFace = cutOutline(objectToCut, cleanFaceOutline, faceCenter, tbnMatrix, backend, clip=False)
     
     
     if not resultingFace == None:
-        resultingFaceTuple = buildFaceTuple(objectToCut, resultingFace.index)
+        # The inner face gets a new identity.
+        resultingFaceTuple = buildNewFaceTuples(objectToCut, [resultingFace.index])[0]
         return resultingFaceTuple
 
 
@@ -310,7 +535,7 @@ def genericCutPlate(seed, objectToCut, faceTuple):
 if __name__ == "__main__":
     
     # Delete everything in the scene.
-    bpy.ops.object.mode_set(mode = 'OBJECT')
+    setObjectMode('OBJECT')
     bpy.ops.object.select_all(action='SELECT')
     bpy.ops.object.delete(use_global=False, confirm=False)
 
@@ -318,18 +543,18 @@ if __name__ == "__main__":
     bpy.ops.mesh.primitive_plane_add(align='WORLD', enter_editmode=True, location=(0, 0, 0))
 #    bpy.ops.transform.resize(value=(1, 2.0, 1), orient_type='GLOBAL', orient_matrix=((1, 0, 0), (0, 1, 0), (0, 0, 1)), orient_matrix_type='GLOBAL', constraint_axis=(False, False, False), mirror=True, proportional='DISABLED', proportional_edit_falloff='SMOOTH', proportional_size=1)
     
-    bpy.ops.object.mode_set(mode = 'OBJECT')
+    setObjectMode('OBJECT')
 
     
     # Keep track of the selected object.
     originalySelectedObject = bpy.context.active_object
 
     # Cut a plate in the selected object.
-    resultingFaceTuple = genericCutPlate(datetime.now(), originalySelectedObject, buildFaceTuple(originalySelectedObject, originalySelectedObject.data.polygons[0].index))
-    resultingFaceTuple = genericCutPlate(datetime.now(), originalySelectedObject, resultingFaceTuple)
-    resultingFaceTuple = genericCutPlate(datetime.now(), originalySelectedObject, resultingFaceTuple)
-    resultingFaceTuple = genericCutPlate(datetime.now(), originalySelectedObject, resultingFaceTuple)
+    resultingFaceTuple = genericCutPlate(int(datetime.now().timestamp() * 1000000), originalySelectedObject, buildFaceTuple(originalySelectedObject, originalySelectedObject.data.polygons[0].index))
+    resultingFaceTuple = genericCutPlate(int(datetime.now().timestamp() * 1000000), originalySelectedObject, resultingFaceTuple)
+    resultingFaceTuple = genericCutPlate(int(datetime.now().timestamp() * 1000000), originalySelectedObject, resultingFaceTuple)
+    resultingFaceTuple = genericCutPlate(int(datetime.now().timestamp() * 1000000), originalySelectedObject, resultingFaceTuple)
 #    resultingFaceTuple = genericCutPlate(0, originalySelectedObject, resultingFaceTuple)
 #    resultingFaceTuple = genericCutPlate(0, originalySelectedObject, resultingFaceTuple)
-    bpy.ops.object.mode_set(mode = 'EDIT')
+    setObjectMode('EDIT')
 #datetime.now()
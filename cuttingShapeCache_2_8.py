@@ -0,0 +1,175 @@
+import bpy
+
+import json
+import os
+from array import array
+from collections import OrderedDict
+
+# Import submodules.
+import hardsurface_2_8
+
+# Cutting shapes generation.
+import generate_cuttingShape0_2_8
+hardsurface_2_8.reloadModule(generate_cuttingShape0_2_8)
+
+# Analytic cut geometry.
+import cutGeometry_2_8
+hardsurface_2_8.reloadModule(cutGeometry_2_8)
+
+# Cutting shapes generation without Blender.
+import polylineShape_2_8
+hardsurface_2_8.reloadModule(polylineShape_2_8)
+
+
+# Memoized library of rectangle cutting shapes.
+# Notches are proportional to the edges they are created from, so a shape of dimension (width, height) is the shape of
+# dimension (1, height / width) scaled uniformly by width. Outlines are stored for a width of 1 and scaled when requested.
+# Rounded corners are not proportional, their bevel offset is absolute, so with a roundProbability shapes are stored for their own width.
+
+cacheCapacity = 4096 # Maximum number of outlines kept, the least recently used ones are evicted first.
+cacheFilePath = None # When set, the cache is loaded from this file on first use and saveShapeCache writes it there.
+ratioPrecision = 6 # Number of decimals the height / width ratio is rounded to in the keys.
+shapeGenerator = 'POLYLINE' # 'POLYLINE' generates the outlines as polylines, 'BMESH' generates them as meshes with generate_cuttingShape0_2_8.
+
+shapeCache = OrderedDict()
+cacheLoaded = False
+cacheHits = 0
+cacheMisses = 0
+
+
+# Parameters of the notches generation, part of the keys so that changing them doesn't return stale shapes.
+# Both generators read the settings of generate_cuttingShape0_2_8, their outlines differ slightly so the generator is part of the keys too.
+def notchParameters():
+    return (shapeGenerator,) + tuple(getattr(generate_cuttingShape0_2_8, currentName) for currentName in polylineShape_2_8.parameterNames)
+
+
+# Width the outline of a shape of this width is stored for, 1 unless it has rounded corners.
+def storedWidth(width):
+    if generate_cuttingShape0_2_8.roundProbability > 0:
+        return round(width, ratioPrecision)
+    return 1.0
+
+
+def shapeKey(seed, dimensionRatio, recursionDepth, width=1.0):
+    return (seed, round(dimensionRatio, ratioPrecision), recursionDepth, notchParameters(), width)
+
+
+# Generate a shape of width, 1 by default, and return its outline as a flat array of x, y coordinates, along with its edges depth.
+def generateUnitShape(seed, dimensionRatio, recursionDepth, width=1.0):
+    if shapeGenerator == 'POLYLINE':
+        return generateUnitPolylineShape(seed, dimensionRatio, recursionDepth, width)
+
+    createdShape, edgesDepth = generate_cuttingShape0_2_8.generateRectangleCuttingShape(seed=seed, position=(0,0,0), dimension=(width, dimensionRatio * width), recursionDepth=recursionDepth)
+
+    shapeMesh = createdShape.data
+    outlineIndices = cutGeometry_2_8.orderedOutline(len(shapeMesh.vertices), [currentEdge.key for currentEdge in shapeMesh.edges])
+
+    flatOutline = array('d')
+    if outlineIndices != None:
+        for currentVertexIndex in outlineIndices:
+            currentCoordinates = shapeMesh.vertices[currentVertexIndex].co
+            flatOutline.append(currentCoordinates.x)
+            flatOutline.append(currentCoordinates.y)
+    else:
+        print("cutting shape " + str(seed) + " is not a closed outline")
+
+    # Delete the no longer needed shape.
+    bpy.data.objects.remove(createdShape)
+    bpy.data.meshes.remove(shapeMesh)
+
+    return (flatOutline, tuple(edgesDepth))
+
+
+# Same as generateUnitShape, without creating any mesh.
+def generateUnitPolylineShape(seed, dimensionRatio, recursionDepth, width=1.0):
+    parameters = dict(zip(polylineShape_2_8.parameterNames, notchParameters()[1:]))
+    outline, edgesDepth = polylineShape_2_8.generateRectangleOutline(seed, (width, dimensionRatio * width), recursionDepth, parameters)
+
+    return (array('d', outline.ravel().tolist()), tuple(edgesDepth))
+
+
+def storeShape(key, entry):
+    shapeCache[key] = entry
+    shapeCache.move_to_end(key)
+    while len(shapeCache) > cacheCapacity:
+        shapeCache.popitem(last=False)
+
+
+# Returns the outline of a rectangle cutting shape as a list of 2D points, along with the depth of its notches
+# in the [left, bottom, right, up] order, generating the shape only if it is not in the cache yet.
+def getRectangleCuttingShape(seed, dimension, recursionDepth):
+    global cacheHits
+    global cacheMisses
+
+    if not cacheLoaded and cacheFilePath != None:
+        loadShapeCache()
+
+    width = dimension[0]
+    if width <= 0:
+        print("cutting shape of null width")
+        return [], [None, None, None, None]
+
+    dimensionRatio = dimension[1] / width
+    key = shapeKey(seed, dimensionRatio, recursionDepth, storedWidth(width))
+
+    entry = shapeCache.get(key)
+    if entry != None:
+        cacheHits = cacheHits + 1
+        shapeCache.move_to_end(key)
+    else:
+        cacheMisses = cacheMisses + 1
+        entry = generateUnitShape(seed, key[1], recursionDepth, key[4])
+        storeShape(key, entry)
+
+    flatOutline, unitEdgesDepth = entry
+    # Scale from the width the outline is stored for.
+    scale = width / key[4]
+
+    outlinePoints = [(flatOutline[currentIndex] * scale, flatOutline[currentIndex + 1] * scale) for currentIndex in range(0, len(flatOutline), 2)]
+    edgesDepth = [None if currentDepth == None else currentDepth * scale for currentDepth in unitEdgesDepth]
+
+    return outlinePoints, edgesDepth
+
+
+def clearShapeCache():
+    global cacheHits
+    global cacheMisses
+
+    shapeCache.clear()
+    cacheHits = 0
+    cacheMisses = 0
+
+
+# Load shapes saved by saveShapeCache, from the least to the most recently used.
+def loadShapeCache(filePath=None):
+    global cacheLoaded
+
+    cacheLoaded = True
+
+    if filePath == None:
+        filePath = cacheFilePath
+    if filePath == None or not os.path.isfile(filePath):
+        return
+
+    with open(filePath, "r") as cacheFile:
+        savedEntries = json.load(cacheFile)
+
+    for currentKey, currentOutline, currentEdgesDepth in savedEntries:
+        # Caches saved before shapes were stored for their own width only have unit shapes.
+        key = (currentKey[0], currentKey[1], currentKey[2], tuple(currentKey[3]), currentKey[4] if len(currentKey) > 4 else 1.0)
+        storeShape(key, (array('d', currentOutline), tuple(currentEdgesDepth)))
+
+
+def saveShapeCache(filePath=None):
+    if filePath == None:
+        filePath = cacheFilePath
+    if filePath == None:
+        return
+
+    savedEntries = [[list(currentKey[0:3]) + [list(currentKey[3]), currentKey[4]], list(currentEntry[0]), list(currentEntry[1])] for currentKey, currentEntry in shapeCache.items()]
+
+    # Write next to the destination first, so that an interrupted save doesn't corrupt the cache.
+    temporaryPath = filePath + ".tmp"
+    with open(temporaryPath, "w") as cacheFile:
+        json.dump(savedEntries, cacheFile)
+    os.replace(temporaryPath, filePath)
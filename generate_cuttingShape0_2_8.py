@@ -9,16 +9,21 @@ from datetime import datetime
 # Import submodules.
 import sys
 import os
-import importlib
 import copy
 
-blend_dir = os.path.dirname(bpy.data.filepath)
-if blend_dir not in sys.path:
-   sys.path.append(blend_dir)
+# Run from Blender's text editor, the other scripts are found next to the .blend file.
+if __name__ == "__main__":
+    blend_dir = os.path.dirname(bpy.data.filepath)
+    if blend_dir not in sys.path:
+        sys.path.append(blend_dir)
+
+import hardsurface_2_8
+if __name__ == "__main__":
+    hardsurface_2_8.startReloadPass()
 
 # Utils.
 import utils_2_8
-importlib.reload(utils_2_8)
+hardsurface_2_8.reloadModule(utils_2_8)
 from utils_2_8 import *
 
 
@@ -341,11 +346,8 @@ def generateCircleCuttingShape(seed, position, dimension, edgeCount, recursionDe
 	createdShape.name = "circle_cuttingShape"
 	createdShape.data.name = "circle_cuttingShape_mesh"
 	
-	# Resize object in edit mode.
-	bpy.ops.object.mode_set(mode = 'EDIT')
-	bpy.ops.mesh.select_all(action='SELECT')
-	bpy.ops.transform.resize(value=(dimension[0], dimension[1], 1.0), orient_type='GLOBAL')
-	bpy.ops.object.mode_set(mode = 'OBJECT')
+	# Resize the object's vertices, transform operators can't be used in background mode.
+	createdShape.data.transform(mathutils.Matrix.Diagonal((dimension[0], dimension[1], 1.0, 1.0)))
 
 	# Generic function to add details on edges.
 	genericShapeTransformation(seed, recursionDepth)
@@ -362,11 +364,8 @@ def generateRectangleCuttingShape(seed, position, dimension, recursionDepth):
 	createdShape.name = "rectangle_cuttingShape"
 	createdShape.data.name = "rectangle_cuttingShape_mesh"
 	
-	# Resize object in edit mode.
-	bpy.ops.object.mode_set(mode = 'EDIT')
-	bpy.ops.mesh.select_all(action='SELECT')
-	bpy.ops.transform.resize(value=(dimension[0], dimension[1], 1.0), orient_type='GLOBAL')
-	bpy.ops.object.mode_set(mode = 'OBJECT')
+	# Resize the object's vertices, transform operators can't be used in background mode.
+	createdShape.data.transform(mathutils.Matrix.Diagonal((dimension[0], dimension[1], 1.0, 1.0)))
 	
 	# Generic function to add details on edges.
 	edgesDepth = genericShapeTransformation(seed, recursionDepth)
@@ -389,7 +388,7 @@ def generateGenericCuttingShape(seed, position):
 			
 	else:
 		# Generate a circle of random vertices.
-		verticesCount = random.uniform(minmumCircleEdges, maximumCircleEdges)
+		verticesCount = random.randint(minmumCircleEdges, maximumCircleEdges)
 		createdShape = generateCircleCuttingShape(seed=seed, position=position, dimension=((1.0, 1.0)), edgeCount=verticesCount, recursionDepth=recursivity)
 
 	return createdShape
@@ -438,7 +437,7 @@ def generateCuttingShapesArray(squareRadius = 5, generateNewCollection = False):
 		random.seed(randomSeed)
 	else:
 		# Take the current time to randomize the seed when we want it different each time.
-		random.seed(datetime.now())
+		random.seed(int(datetime.now().timestamp() * 1000000))
 
 	#generateGenericShape(seed=randomSeed, position=(0, 0, 0))
 
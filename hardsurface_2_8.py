@@ -0,0 +1,84 @@
+import os
+import importlib
+
+
+# Entry point of the scripts, and import graph shared by the modules.
+# Submodules are imported on first access, so a background job only loads what it uses:
+#   import hardsurface_2_8
+#   hardsurface_2_8.recursivityManager.generateBatch(5, seed=0)
+# Modules no longer reload each other when imported. While editing them in Blender, set developmentReload to True from the Python
+# console, or the HARDSURFACE_RELOAD environment variable to 1, and every module is reloaded once per run of a script.
+
+developmentReload = os.environ.get("HARDSURFACE_RELOAD", "0") not in ("", "0")
+
+# Modules by short name.
+moduleNames = {
+    "arrayMesh": "arrayMesh_2_8",
+    "cameraDetail": "cameraDetail_2_8",
+    "checkpoint": "checkpoint_2_8",
+    "cutGeometry": "cutGeometry_2_8",
+    "cutSurface": "cut_surface0_2_8",
+    "cuttingShapeCache": "cuttingShapeCache_2_8",
+    "cuttingShape": "generate_cuttingShape0_2_8",
+    "insetSurface": "inset_surface_2_8",
+    "instancedDetail": "instancedDetail_2_8",
+    "parallelFaces": "parallelFaces_2_8",
+    "polylineShape": "polylineShape_2_8",
+    "profiler": "profiler_2_8",
+    "recursionPlan": "recursionPlan_2_8",
+    "recursivityManager": "recursivityManager_2_8",
+    "seeds": "seeds_2_8",
+    "streamExport": "streamExport_2_8",
+    "subdivideSurface": "subdivide_surface_2_8",
+    "utils": "utils_2_8",
+}
+
+# Modules already reloaded in the current run, each module is reloaded at most once however many modules import it.
+reloadedModules = set()
+
+
+# Start a new run of reloads, called by the scripts run from Blender's text editor.
+def startReloadPass():
+    reloadedModules.clear()
+
+
+# Reload a module in development, once per run. Does nothing otherwise.
+def reloadModule(module):
+    if not developmentReload or module.__name__ in reloadedModules:
+        return module
+
+    reloadedModules.add(module.__name__)
+    return importlib.reload(module)
+
+
+def loadModule(moduleName):
+    return reloadModule(importlib.import_module(moduleName))
+
+
+# Module imported on its first attribute access, for the modules only some code paths use.
+class LazyModule:
+
+    def __init__(self, moduleName):
+        object.__setattr__(self, "lazyModuleName", moduleName)
+
+    def __getattr__(self, name):
+        return getattr(loadModule(self.lazyModuleName), name)
+
+    def __setattr__(self, name, value):
+        setattr(loadModule(self.lazyModuleName), name, value)
+
+
+def lazyModule(moduleName):
+    return LazyModule(moduleName)
+
+
+# Submodules as attributes of this module, imported on first access.
+def __getattr__(name):
+    moduleName = moduleNames.get(name)
+    if moduleName == None:
+        raise AttributeError("module " + __name__ + " has no attribute " + name)
+    return loadModule(moduleName)
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + list(moduleNames.keys()))
@@ -0,0 +1,151 @@
+import bpy
+
+# Import submodules.
+import sys
+import os
+import argparse
+
+# Command line entry point for batch generation in background mode:
+# blender -b --python headlessBatch_2_8.py -- --seed-start 0 --seed-end 10 --grid 5 --depth 3 --output /path/to/output
+# Every seed of the range generates one batch, written as a .blend and/or an .obj file in the output directory.
+# --tiles restricts the generation to some tiles of the batch, and --merge assembles batches generated in several processes,
+# see batchCoordinator_2_8.py.
+
+# There is no .blend file to locate the scripts from in background mode, use the location of this script instead.
+scriptDirectory = os.path.dirname(os.path.abspath(__file__))
+if scriptDirectory not in sys.path:
+   sys.path.append(scriptDirectory)
+
+import hardsurface_2_8
+import recursivityManager_2_8
+import cut_surface0_2_8
+import profiler_2_8
+# Only streamed batches need the writers.
+streamExport_2_8 = hardsurface_2_8.lazyModule("streamExport_2_8")
+
+
+def parseArguments(argv):
+    # Blender's own arguments come first, ours are the ones after "--".
+    if "--" in argv:
+        argv = argv[argv.index("--") + 1:]
+    else:
+        argv = []
+
+    parser = argparse.ArgumentParser(description="Generate batches of procedural hard surface tiles without user interface.")
+    parser.add_argument("--seed-start", type=int, default=0, help="First batch seed.")
+    parser.add_argument("--seed-end", type=int, default=1, help="Last batch seed, excluded.")
+    parser.add_argument("--grid", type=int, default=recursivityManager_2_8.batchSize, help="Number of tiles on each side of a batch.")
+    parser.add_argument("--depth", type=int, default=recursivityManager_2_8.recursiveDepth, help="Recursion depth of the generation.")
+    parser.add_argument("--budget", type=int, default=None, help="Maximum number of polygons added to each tile, no limit besides the depth by default.")
+    parser.add_argument("--instanced", action="store_true", help="Replace the detailed faces by instances of shared detail patches.")
+    parser.add_argument("--arrays", action="store_true", help="Detail the tiles in numpy arrays and build their meshes once, see arrayMesh_2_8.py.")
+    parser.add_argument("--output", required=True, help="Directory the batches are written to.")
+    parser.add_argument("--format", choices=["blend", "obj", "both"], default="blend", help="Output file format.")
+    parser.add_argument("--stream", choices=["ply", "obj", "glb"], default=None, help="Write each tile to a file of this format as soon as it is generated, instead of saving the batch at the end.")
+    parser.add_argument("--tiles", default=None, help="Comma separated indices of the tiles to generate, all of them by default.")
+    parser.add_argument("--profile", default=None, help="File the time spent in each operation is written to, as CSV when it ends with .csv and JSON otherwise.")
+    parser.add_argument("--merge", nargs="+", default=None, help="Batch files to merge into one batch instead of generating.")
+
+    return parser.parse_args(argv)
+
+
+# Remove every object and mesh so that each batch starts from an empty scene.
+def clearScene():
+    if bpy.context.object != None and bpy.context.object.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode = 'OBJECT')
+
+    for currentObject in list(bpy.data.objects):
+        bpy.data.objects.remove(currentObject)
+    for currentMesh in list(bpy.data.meshes):
+        bpy.data.meshes.remove(currentMesh)
+
+
+def exportObj(filepath):
+    # The OBJ exporter moved to a native operator in recent Blender versions.
+    if hasattr(bpy.ops.wm, "obj_export"):
+        bpy.ops.wm.obj_export(filepath=filepath)
+    else:
+        bpy.ops.export_scene.obj(filepath=filepath)
+
+
+def saveBatch(outputDirectory, seed, outputFormat):
+    batchName = "batch_" + str(seed)
+
+    if outputFormat in ("blend", "both"):
+        bpy.ops.wm.save_as_mainfile(filepath=os.path.join(outputDirectory, batchName + ".blend"), check_existing=False)
+
+    if outputFormat in ("obj", "both"):
+        exportObj(os.path.join(outputDirectory, batchName + ".obj"))
+
+
+# Gather the tiles of several partial batches into the current scene.
+# Tiles are linked in the order of their index, as generateBatch creates them.
+def mergeBatches(batchFiles):
+    loadedObjects = []
+    for currentFile in batchFiles:
+        with bpy.data.libraries.load(currentFile, link=False) as (dataFrom, dataTo):
+            dataTo.objects = [currentName for currentName in dataFrom.objects if currentName.startswith("tile_")]
+        loadedObjects.extend(dataTo.objects)
+
+    # Instanced patches are named after their tile and ordered with it.
+    for currentObject in sorted(loadedObjects, key=lambda currentObject: (currentObject if currentObject.parent == None else currentObject.parent)["tileIndex"]):
+        bpy.context.scene.collection.objects.link(currentObject)
+
+
+# Name of the file a batch is streamed to.
+# Processes sharing a batch stream their tiles to their own files, named after the range of their tiles, shards of
+# batchCoordinator_2_8.py never start with the same tile.
+def streamFileName(seed, tiles):
+    batchName = "batch_" + str(seed)
+    if tiles != None and len(tiles) > 0:
+        batchName = batchName + "_tiles" + str(min(tiles)) + "-" + str(max(tiles))
+    return batchName
+
+
+def main():
+    arguments = parseArguments(sys.argv)
+
+    if not os.path.isdir(arguments.output):
+        os.makedirs(arguments.output)
+
+    if arguments.merge != None:
+        clearScene()
+        mergeBatches(arguments.merge)
+        saveBatch(arguments.output, arguments.seed_start, arguments.format)
+        return
+
+    tiles = None
+    if arguments.tiles != None:
+        tiles = [int(currentTile) for currentTile in arguments.tiles.split(",")]
+
+    # The knife projection needs a 3D view, cut analytically instead.
+    cut_surface0_2_8.cutBackend = 'ANALYTIC'
+    recursivityManager_2_8.recursiveDepth = arguments.depth
+    recursivityManager_2_8.polygonBudget = arguments.budget
+    if arguments.instanced:
+        recursivityManager_2_8.outputMode = 'INSTANCED'
+    elif arguments.arrays:
+        recursivityManager_2_8.outputMode = 'ARRAY'
+
+    if arguments.profile != None:
+        profiler_2_8.enabled = True
+        profiler_2_8.statisticsFilePath = arguments.profile
+
+    for currentSeed in range(arguments.seed_start, arguments.seed_end):
+        print("batch seed " + str(currentSeed) + " of [" + str(arguments.seed_start) + " ; " + str(arguments.seed_end) + "[")
+
+        clearScene()
+        if arguments.stream != None:
+            stream = streamExport_2_8.openStream(os.path.join(arguments.output, streamFileName(currentSeed, tiles) + "." + arguments.stream))
+            # The temporary files of the writer are removed even when the generation fails.
+            try:
+                recursivityManager_2_8.generateBatch(arguments.grid, seed=currentSeed, tiles=tiles, stream=stream)
+            finally:
+                stream.close()
+        else:
+            recursivityManager_2_8.generateBatch(arguments.grid, seed=currentSeed, tiles=tiles)
+            saveBatch(arguments.output, currentSeed, arguments.format)
+
+
+if __name__ == "__main__":
+    main()
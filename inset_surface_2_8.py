@@ -10,14 +10,21 @@ from mathutils import Euler
 # Import submodules.
 import sys
 import os
-import importlib
 import copy
 
+import hardsurface_2_8
+if __name__ == "__main__":
+    hardsurface_2_8.startReloadPass()
+
 # Utils.
 import utils_2_8
-importlib.reload(utils_2_8)
+hardsurface_2_8.reloadModule(utils_2_8)
 from utils_2_8 import *
 
+# Instrumentation.
+import profiler_2_8
+hardsurface_2_8.reloadModule(profiler_2_8)
+
 insetThickness      = 0.01   # Thickness of the inset operation.
 insetDepth          = 0.01   # Depth of the inset operation.
 insetRelativeOffset = True # True of the offset value should represent a proportion of offset.
@@ -25,53 +32,79 @@ insetRelativeOffset = True # True of the offset value should represent a proport
 inwardProbability   = 0.5   # Probability of the inset to go in the surface's direction.
 
 
-def insetGeneric(seed, objectToInset, faceTuple):
+# Inset faces directly in a bmesh, all the inward ones in a single pass and all the outward ones in another.
+# insets is a list of (faceIndex, inward) tuples.
+# Returns, for every inset, the face tuple of the inner face, which is left selected and gets a new identity.
+@profiler_2_8.profiled("insetBatch", 0)
+def insetBatch(objectToInset, insets):
     
-    # Initialize the random seed, this is important in order to generate exactly the same content for a given seed.
-    random.seed(seed)
+    if len(insets) == 0:
+        return []
     
-    # Find the right face despit faces that have been reindexed.
-    #if checkIsSameFace(objectToInset, faceTuple):
-        #print("face corresponding")
-        #faceToSubdivideIndex = faceTuple[0]
-    #else:
-        #print("no correspondance")
-        #faceToSubdivideIndex = findFaceByVertices(objectToInset, faceTuple[1])
-        
-    faceToSubdivideIndex = faceTuple[0]
+    # We always want to work on up to date object data.
+    setObjectMode('OBJECT')
     
+    meshToInset = objectToInset.data
+    bm = bmesh.new()
+    bm.from_mesh(meshToInset)
+    bm.faces.ensure_lookup_table()
     
-    bpy.ops.object.mode_set(mode = 'EDIT')
-    # Deselect everything.
-    bpy.ops.mesh.select_all(action='DESELECT')
+    # Gather the faces before any modification, the indices are only valid on the original mesh.
+    facesToInset = [bm.faces[currentInset[0]] for currentInset in insets]
     
-    # Selecting faces only works when not in edit mode, for some reason.
-    bpy.ops.object.mode_set(mode = 'OBJECT')
-    # Select only the face to inset.
-    objectToInset.data.polygons[faceToSubdivideIndex].select = True
+    # Deselect everything, only the inner faces end up selected.
+    for currentElements in (bm.verts, bm.edges, bm.faces):
+        for currentElement in currentElements:
+            currentElement.select = False
     
-    # Enter edit mode for the object in argument.
-    bpy.context.view_layer.objects.active = objectToInset
-    bpy.ops.object.mode_set(mode = 'EDIT')
+    faceIdLayer = bm.faces.layers.int.get(faceIdLayerName)
+    for inward, finalDepth in ((True, -insetDepth), (False, insetDepth)):
+        groupFaces = [currentFace for currentFace, currentInset in zip(facesToInset, insets) if currentInset[1] == inward]
+        if len(groupFaces) == 0:
+            continue
+        
+        # The inset faces stay in place as the inner faces, surrounded by new side faces.
+        insetResult = bmesh.ops.inset_individual(bm, faces=groupFaces, thickness=insetThickness, depth=finalDepth, use_even_offset=True, use_relative_offset=insetRelativeOffset)
+        
+        # Side faces copy the identity of the face they were created from, it belongs to the inner face only.
+        if faceIdLayer != None:
+            for currentSideFace in insetResult["faces"]:
+                currentSideFace[faceIdLayer] = 0
     
-    # Randomly pick if the inset is to be made inward or outward.
-    if random.uniform(0, 1) < inwardProbability:
-        finalDepth = -insetDepth
-    else:
-        finalDepth = insetDepth
+    for currentFace in facesToInset:
+        currentFace.select_set(True)
     
-    # Perform the inset operation.
-    bpy.ops.mesh.inset(thickness=insetThickness, depth=finalDepth, use_relative_offset=insetRelativeOffset)
+    # Indices of the bmesh faces are the ones of the mesh polygons once written.
+    bm.faces.index_update()
+    innerIndices = [currentFace.index for currentFace in facesToInset]
     
-    # Refresh data.
-    objectToInset.data.validate(verbose=True)
-    objectToInset.update_from_editmode()
+    bm.to_mesh(meshToInset)
+    bm.free()
+    meshToInset.update()
     
-    # Return an array of face tuples for the selected face.
-    # The selected face is the one resulting of the inset.
-    faceTuplesResult = [buildFaceTuple(objectToInset, currentPolygon.index) for currentPolygon in objectToInset.data.polygons if currentPolygon.select]
+    # The inner faces get new identities.
+    return buildNewFaceTuples(objectToInset, innerIndices)
 
-    return faceTuplesResult
+
+# inward forces the direction of the inset, it is randomly picked when None.
+@profiler_2_8.profiled("insetGeneric", 1)
+def insetGeneric(seed, objectToInset, faceTuple, inward=None):
+    
+    # Random stream of this inset, this is important in order to generate exactly the same content for a given seed.
+    randomStream = random.Random(seed)
+    
+    # Find the right face despit faces that have been reindexed.
+    faceToInsetIndex = resolveFaceIndex(objectToInset, faceTuple)
+    if faceToInsetIndex == None:
+        print("Face to inset not found.")
+        return []
+    
+    # Randomly pick if the inset is to be made inward or outward.
+    if inward == None:
+        inward = randomStream.uniform(0, 1) < inwardProbability
+    
+    # Return an array of face tuples for the face resulting of the inset.
+    return insetBatch(objectToInset, [(faceToInsetIndex, inward)])
 
 
 # Test function
@@ -79,9 +112,9 @@ if __name__ == "__main__":
     # Keep track of the selected object.
     originalySelectedObject = bpy.context.active_object
     
-    originalySelectedObject.data.validate(verbose=True)
+    validateMesh(originalySelectedObject.data)
     originalySelectedObject.update_from_editmode()
     
     for currentPolygon in originalySelectedObject.data.polygons:
         if currentPolygon.select:
-            insetGeneric(datetime.now(), originalySelectedObject, buildFaceTuple(originalySelectedObject, currentPolygon.index))
\ No newline at end of file
+            insetGeneric(int(datetime.now().timestamp()), originalySelectedObject, buildFaceTuple(originalySelectedObject, currentPolygon.index))
\ No newline at end of file
@@ -0,0 +1,173 @@
+import bpy
+import bmesh
+
+import mathutils
+import random
+
+# Import submodules.
+import hardsurface_2_8
+
+# Utils.
+import utils_2_8
+hardsurface_2_8.reloadModule(utils_2_8)
+from utils_2_8 import *
+
+
+# Instanced output of the generation, see the outputMode of recursivityManager_2_8.
+# Instead of detailing every face in the mesh, each face is replaced by a linked duplicate of a detail patch.
+# A patch is a detailed rectangle, generated once for a seed variant, quantized dimensions, depth and material, and shared by every face
+# with the same key. Memory and file size then grow with the number of distinct patches rather than with the number of faces.
+
+patchVariants = 16 # Number of different patches per dimension, faces pick theirs from their seed.
+patchDimensionStep = 0.05 # Faces dimensions are rounded to this step, patches are scaled to fit their faces exactly.
+patchCollectionPrefix = "hardsurface_patches_"
+
+# Meshes of the patches, by key.
+patchMeshes = {}
+
+
+def quantizeDimension(dimension):
+    return max(1, int(round(dimension / patchDimensionStep)))
+
+
+# Key of the patch of a face, detail being its (depth, probabilityScale) tuple and budget its polygon budget, None without budget.
+def patchKey(faceSeed, dimension, detail, budget, materialName):
+    variant = random.Random(faceSeed).randint(0, patchVariants - 1)
+    if budget != None:
+        budget = int(round(budget))
+    return (variant, quantizeDimension(dimension[0]), quantizeDimension(dimension[1]), detail[0], round(detail[1], 2), budget, materialName)
+
+
+def patchMeshName(key):
+    return "hardsurface_patch_" + "_".join([str(currentValue) for currentValue in key])
+
+
+# Returns the mesh of a patch, generating it if it doesn't exist yet.
+# generateDetail(seed, objectToModify, facesToModify, recursiveDepth, budget, budgetMode, probabilityScale) details the rectangle of the patch,
+# as recursiveGeneration does.
+# Should be called in object mode.
+def getPatchMesh(key, generateDetail):
+    patchMesh = patchMeshes.get(key)
+    # Meshes removed by the user are generated again, their Python references are no longer valid.
+    if patchMesh != None:
+        try:
+            if patchMesh.name in bpy.data.meshes and bpy.data.meshes[patchMesh.name] == patchMesh:
+                return patchMesh
+        except ReferenceError:
+            pass
+
+    # Previous sessions patches are reused.
+    patchMesh = bpy.data.meshes.get(patchMeshName(key))
+    if patchMesh != None:
+        patchMeshes[key] = patchMesh
+        return patchMesh
+
+    variant, quantizedWidth, quantizedHeight, depth, probabilityScale, budget, materialName = key
+    halfWidth = quantizedWidth * patchDimensionStep * 0.5
+    halfHeight = quantizedHeight * patchDimensionStep * 0.5
+
+    patchMesh = bpy.data.meshes.new(patchMeshName(key))
+    # Patches are kept for the next faces even when the instances using them are freed.
+    patchMesh.use_fake_user = True
+    patchMesh.from_pydata([(-halfWidth, -halfHeight, 0), (halfWidth, -halfHeight, 0), (halfWidth, halfHeight, 0), (-halfWidth, halfHeight, 0)], [], [(0, 1, 2, 3)])
+    if materialName != None and materialName in bpy.data.materials:
+        patchMesh.materials.append(bpy.data.materials[materialName])
+    patchMesh.update()
+
+    # The generation works on the active object of the scene.
+    patchObject = bpy.data.objects.new(patchMeshName(key), patchMesh)
+    bpy.context.scene.collection.objects.link(patchObject)
+    bpy.context.view_layer.objects.active = patchObject
+
+    generateDetail(deriveSeed("patch", variant), patchObject, [buildFaceTuple(patchObject, 0)], depth, budget=budget, budgetMode='FACE', probabilityScale=probabilityScale)
+
+    setObjectMode('OBJECT')
+    clearFaceFrames(patchMesh)
+    bpy.data.objects.remove(patchObject)
+
+    patchMeshes[key] = patchMesh
+    return patchMesh
+
+
+def patchCollection(objectToModify):
+    collectionName = patchCollectionPrefix + objectToModify.name
+    collection = bpy.data.collections.get(collectionName)
+    if collection == None:
+        collection = bpy.data.collections.new(collectionName)
+        bpy.context.scene.collection.children.link(collection)
+    return collection
+
+
+# Replace faces of an object by instances of detail patches.
+# seeds are the seeds of the faces, details their (depth, probabilityScale) tuples, faces with a None depth are left as they are.
+# budgets are the polygon budgets of the faces, see facesBudgets in recursivityManager_2_8, None without budget.
+# Returns the created instances, parented to the object.
+def instanceFaces(objectToModify, facesTuples, seeds, details, generateDetail, budgets=None):
+    if budgets == None:
+        budgets = [None] * len(facesTuples)
+
+    setObjectMode('OBJECT')
+
+    faceIndices = [resolveFaceIndex(objectToModify, currentFaceTuple) for currentFaceTuple in facesTuples]
+    precomputeFaceFrames(objectToModify, faceIndices)
+
+    matrixWorld = objectToModify.matrix_world.copy()
+
+    # Placement of every face, read before the generation of the patches changes the active object.
+    placements = []
+    for faceIndex, faceSeed, faceDetail, faceBudget in zip(faceIndices, seeds, details, budgets):
+        if faceIndex == None or faceDetail[0] == None:
+            continue
+
+        faceFrame = getFaceFrame(objectToModify, faceIndex)
+        borders = faceFrame["borders"]
+        dimension = (borders[1] - borders[0], borders[3] - borders[2])
+
+        materialName = None
+        materialIndex = objectToModify.data.polygons[faceIndex].material_index
+        if materialIndex < len(objectToModify.data.materials) and objectToModify.data.materials[materialIndex] != None:
+            materialName = objectToModify.data.materials[materialIndex].name
+
+        # The frame of a patch has its tangent along -X and its bitangent along -Y, see computeFaceFrames.
+        # The TBN matrix applies to world coordinates, as in the cuts.
+        orientation = mathutils.Matrix((-faceFrame["tbn"][0], -faceFrame["tbn"][1], faceFrame["tbn"][2])).transposed().to_4x4()
+
+        # The borders are in the TBN space of world coordinates, the center of the patch is the one of the borders.
+        centerTangentCoords = mathutils.Vector(((borders[0] + borders[1]) * 0.5, (borders[2] + borders[3]) * 0.5, (faceFrame["tbn"] @ faceFrame["center"]).z))
+        center = faceFrame["tbn"].transposed() @ centerTangentCoords
+
+        key = patchKey(faceSeed, dimension, faceDetail, faceBudget, materialName)
+        scale = mathutils.Matrix.Diagonal((dimension[0] / (key[1] * patchDimensionStep), dimension[1] / (key[2] * patchDimensionStep), 1.0, 1.0))
+        placements.append((faceIndex, key, mathutils.Matrix.Translation(center) @ orientation @ scale))
+
+    # Generate every distinct patch once.
+    for currentKey in sorted(set([currentPlacement[1] for currentPlacement in placements]), key=str):
+        getPatchMesh(currentKey, generateDetail)
+
+    collection = patchCollection(objectToModify)
+    instances = []
+    for currentPosition, (faceIndex, key, placementMatrix) in enumerate(placements):
+        instance = bpy.data.objects.new(objectToModify.name + "_patch_" + str(currentPosition), patchMeshes[key])
+        collection.objects.link(instance)
+        instance.parent = objectToModify
+        instance.matrix_parent_inverse = matrixWorld.inverted()
+        instance.matrix_world = placementMatrix
+        instances.append(instance)
+
+    # The instances replace the faces.
+    meshToModify = objectToModify.data
+    bm = bmesh.new()
+    bm.from_mesh(meshToModify)
+    bm.faces.ensure_lookup_table()
+    # Edges and vertices no longer used by any face go with them, no loose wire is left between adjacent instanced faces.
+    bmesh.ops.delete(bm, geom=[bm.faces[currentPlacement[0]] for currentPlacement in placements], context='FACES')
+    bm.to_mesh(meshToModify)
+    bm.free()
+    meshToModify.update()
+    clearFaceFrames(meshToModify)
+
+    bpy.context.view_layer.objects.active = objectToModify
+
+    print(str(len(instances)) + " faces instanced from " + str(len(set([currentPlacement[1] for currentPlacement in placements]))) + " patches.")
+
+    return instances
@@ -0,0 +1,384 @@
+import bpy
+import bmesh
+
+# Import submodules.
+import sys
+import os
+import json
+import heapq
+import argparse
+import tempfile
+import shutil
+import subprocess
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+
+# Parallel detailing of the selected faces of an object, see applyToSelectedFaces.
+# The faces are shared between groups of similar cost, each group is extracted into its own mesh and detailed by a background Blender
+# process, then the detailed meshes are welded back in place of the original faces.
+# Faces are planned here, as in a serial run, and the workers only replay the plans with the settings of this process, so the
+# operations don't depend on how the faces are renumbered in the extracted meshes.
+# Operations split the sides they cut in the neighbouring faces too, adjacent faces are detailed together in their order so that they
+# split each other as in a serial run, and the faces around are split when the detailed meshes are welded back.
+# A serial and a parallel run can be compared with:
+# blender -b --factory-startup --python parallelFaces_2_8.py -- --check --seed 0 --workers 4
+# Workers run this script:
+# blender -b --factory-startup --python parallelFaces_2_8.py -- --job /path/to/job.json
+
+# There is no .blend file to locate the scripts from in background mode, use the location of this script instead.
+scriptDirectory = os.path.dirname(os.path.abspath(__file__))
+if scriptDirectory not in sys.path:
+   sys.path.append(scriptDirectory)
+
+import hardsurface_2_8
+from mathutils import kdtree
+
+# Utils.
+import utils_2_8
+hardsurface_2_8.reloadModule(utils_2_8)
+
+# Planning of the recursion.
+import recursionPlan_2_8
+hardsurface_2_8.reloadModule(recursionPlan_2_8)
+
+# Distance under which the vertices of the detailed faces are welded to the original ones.
+weldDistance = 0.0001
+
+
+# Share the faces between groups, the longest first, each one to the group with the least work so far.
+# Returns the groups as lists of positions in costs.
+def scheduleLongestFirst(costs, groupsCount):
+    groups = [[] for currentGroup in range(0, groupsCount)]
+    groupsLoads = [(0.0, currentGroup) for currentGroup in range(0, groupsCount)]
+
+    for currentPosition in sorted(range(0, len(costs)), key=lambda currentPosition: -costs[currentPosition]):
+        currentLoad, currentGroup = heapq.heappop(groupsLoads)
+        groups[currentGroup].append(currentPosition)
+        heapq.heappush(groupsLoads, (currentLoad + costs[currentPosition], currentGroup))
+
+    return [currentGroup for currentGroup in groups if len(currentGroup) > 0]
+
+
+# Gather faces sharing a vertex, directly or through other faces of faceIndices.
+# Returns the groups as lists of positions in faceIndices, in their order.
+def groupAdjacentFaces(objectToModify, faceIndices):
+    mesh = objectToModify.data
+
+    # Union find over the positions, by vertex.
+    parents = list(range(0, len(faceIndices)))
+    def findRoot(position):
+        while parents[position] != position:
+            parents[position] = parents[parents[position]]
+            position = parents[position]
+        return position
+
+    vertexOwners = {}
+    for currentPosition, currentFaceIndex in enumerate(faceIndices):
+        for currentVertexIndex in mesh.polygons[currentFaceIndex].vertices:
+            ownerPosition = vertexOwners.setdefault(currentVertexIndex, currentPosition)
+            parents[findRoot(currentPosition)] = findRoot(ownerPosition)
+
+    groups = {}
+    for currentPosition in range(0, len(faceIndices)):
+        groups.setdefault(findRoot(currentPosition), []).append(currentPosition)
+    return list(groups.values())
+
+
+# Copy some faces of an object into a new object, in the same space and with the same materials.
+# The faces are in the order of faceIndices.
+def extractFaces(objectToModify, faceIndices, name):
+    sourceMesh = objectToModify.data
+
+    vertexMap = {}
+    vertices = []
+    faces = []
+    materialIndices = []
+    for currentFaceIndex in faceIndices:
+        currentPolygon = sourceMesh.polygons[currentFaceIndex]
+        currentFace = []
+        for currentVertexIndex in currentPolygon.vertices:
+            if currentVertexIndex not in vertexMap:
+                vertexMap[currentVertexIndex] = len(vertices)
+                vertices.append(sourceMesh.vertices[currentVertexIndex].co.copy())
+            currentFace.append(vertexMap[currentVertexIndex])
+        faces.append(currentFace)
+        materialIndices.append(currentPolygon.material_index)
+
+    extractedMesh = bpy.data.meshes.new(name)
+    extractedMesh.from_pydata(vertices, [], faces)
+    for currentMaterial in sourceMesh.materials:
+        extractedMesh.materials.append(currentMaterial)
+    extractedMesh.polygons.foreach_set("material_index", materialIndices)
+    extractedMesh.update()
+
+    extractedObject = bpy.data.objects.new(name, extractedMesh)
+    extractedObject.matrix_world = objectToModify.matrix_world.copy()
+
+    return extractedObject
+
+
+def loadObject(filePath, objectName):
+    with bpy.data.libraries.load(filePath, link=False) as (dataFrom, dataTo):
+        dataTo.objects = [objectName]
+    return dataTo.objects[0]
+
+
+def removeObject(objectToRemove):
+    meshToRemove = objectToRemove.data
+    bpy.data.objects.remove(objectToRemove)
+    bpy.data.meshes.remove(meshToRemove)
+
+
+# Replace faces of an object by detailed meshes, welding the detailed meshes to the surrounding faces.
+# Adjacent faces are detailed in the same group, see groupAdjacentFaces, so the detailed meshes only meet the faces that were not
+# detailed. The edges of those faces are split wherever a detailed vertex lies on them, as the operations do in a serial run.
+def stitchResults(objectToModify, faceIndices, resultMeshes):
+    utils_2_8.setObjectMode('OBJECT')
+
+    meshToModify = objectToModify.data
+    bm = bmesh.new()
+    bm.from_mesh(meshToModify)
+    bm.faces.ensure_lookup_table()
+
+    # Remove the original faces, the edges they share with the other faces are kept to weld the detailed faces on them.
+    facesToRemove = [bm.faces[currentFaceIndex] for currentFaceIndex in faceIndices]
+    originalEdges = set()
+    originalVertices = set()
+    for currentFace in facesToRemove:
+        originalEdges.update(currentFace.edges)
+        originalVertices.update(currentFace.verts)
+    bmesh.ops.delete(bm, geom=facesToRemove, context='FACES_ONLY')
+    borderEdges = [currentEdge for currentEdge in originalEdges if currentEdge.is_valid and len(currentEdge.link_faces) > 0]
+    bmesh.ops.delete(bm, geom=[currentEdge for currentEdge in originalEdges if currentEdge.is_valid and len(currentEdge.link_faces) == 0], context='EDGES')
+
+    # Meshes loaded into a bmesh are added to its geometry.
+    verticesCountBefore = len(bm.verts)
+    facesCountBefore = len(bm.faces)
+    for currentMesh in resultMeshes:
+        bm.from_mesh(currentMesh)
+    bm.verts.ensure_lookup_table()
+    bm.faces.ensure_lookup_table()
+
+    # Identities given by the workers mean nothing in this object, the detailed faces get new ones when needed.
+    faceIdLayer = bm.faces.layers.int.get(utils_2_8.faceIdLayerName)
+    if faceIdLayer != None:
+        for currentFaceIndex in range(facesCountBefore, len(bm.faces)):
+            bm.faces[currentFaceIndex][faceIdLayer] = 0
+
+    # Only the vertices on the outline of the detailed meshes can lie on a border edge.
+    outlineVertices = [currentVertex for currentVertex in bm.verts[verticesCountBefore:] if any([currentEdge.is_boundary for currentEdge in currentVertex.link_edges])]
+    outlineTree = kdtree.KDTree(len(outlineVertices))
+    for currentPosition, currentVertex in enumerate(outlineVertices):
+        outlineTree.insert(currentVertex.co, currentPosition)
+    outlineTree.balance()
+
+    targetMap = {}
+    for currentEdge in borderEdges:
+        startVertex, endVertex = currentEdge.verts
+        direction = endVertex.co - startVertex.co
+        edgeLength = direction.length
+        if edgeLength <= weldDistance:
+            continue
+        direction.normalize()
+
+        # Detailed vertices on the edge, by distance from its start.
+        edgeVertices = []
+        for foundCoordinates, foundPosition, foundDistance in outlineTree.find_range((startVertex.co + endVertex.co) * 0.5, edgeLength * 0.5 + weldDistance):
+            currentVertex = outlineVertices[foundPosition]
+            currentDistance = (currentVertex.co - startVertex.co).dot(direction)
+            if (currentVertex.co - startVertex.co - direction * currentDistance).length <= weldDistance:
+                edgeVertices.append((currentDistance, currentVertex))
+        edgeVertices.sort(key=lambda edgeVertex: edgeVertex[0])
+
+        # Vertices at the ends are welded on them, the other ones on a vertex splitting the edge, in the faces around too.
+        pieceStart = startVertex
+        pieceStartDistance = 0.0
+        for currentDistance, currentVertex in edgeVertices:
+            if currentDistance <= weldDistance:
+                targetMap[currentVertex] = startVertex
+            elif currentDistance >= edgeLength - weldDistance:
+                targetMap[currentVertex] = endVertex
+            elif currentDistance - pieceStartDistance <= weldDistance:
+                # Several detailed vertices lie there.
+                targetMap[currentVertex] = pieceStart
+            else:
+                # The new edge goes from the start of the piece to the new vertex, the edge keeps the rest of the piece.
+                newEdge, pieceStart = bmesh.utils.edge_split(currentEdge, pieceStart, (currentDistance - pieceStartDistance) / (edgeLength - pieceStartDistance))
+                pieceStartDistance = currentDistance
+                targetMap[currentVertex] = pieceStart
+    bmesh.ops.weld_verts(bm, targetmap=targetMap)
+
+    # Original vertices no detailed face was welded on.
+    looseVertices = [currentVertex for currentVertex in originalVertices if currentVertex.is_valid and len(currentVertex.link_faces) == 0 and len(currentVertex.link_edges) == 0]
+    bmesh.ops.delete(bm, geom=looseVertices, context='VERTS')
+
+    bm.to_mesh(meshToModify)
+    bm.free()
+    meshToModify.update()
+    utils_2_8.clearFaceFrames(meshToModify)
+
+
+def runWorkerProcess(command):
+    completedProcess = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    if completedProcess.returncode != 0:
+        print(completedProcess.stdout.decode(errors="replace"))
+        raise RuntimeError("Worker process failed: " + " ".join(command))
+
+
+# Detail faces of an object in workersCount background Blender processes.
+# plans are the plans of recursionPlan_2_8 of the faces, one root each, settings the module level settings of the generation modules
+# the workers use, by module name, see workerSettings in recursivityManager_2_8.
+# Should be called in object mode.
+def detailFacesInParallel(objectToModify, faceIndices, plans, workersCount, settings):
+    if len(faceIndices) == 0:
+        return
+
+    # Adjacent faces stay together, the sets of adjacent faces are shared according to the polygons their plans add.
+    costs = [recursionPlan_2_8.estimatedPolygons(currentPlan) + 1 for currentPlan in plans]
+    adjacentGroups = groupAdjacentFaces(objectToModify, faceIndices)
+    adjacentCosts = [sum([costs[currentPosition] for currentPosition in currentAdjacentGroup]) for currentAdjacentGroup in adjacentGroups]
+    groups = []
+    for currentGroup in scheduleLongestFirst(adjacentCosts, max(1, min(workersCount, len(adjacentGroups)))):
+        # Faces are detailed in the order of a serial run.
+        groups.append(sorted([currentPosition for currentAdjacentPosition in currentGroup for currentPosition in adjacentGroups[currentAdjacentPosition]]))
+
+    jobsDirectory = tempfile.mkdtemp(prefix="hardsurface_faces_")
+
+    try:
+        commands = []
+        jobs = []
+        for currentGroupIndex, currentGroup in enumerate(groups):
+            groupFaceIndices = [faceIndices[currentPosition] for currentPosition in currentGroup]
+
+            # Every group goes to its worker as a file holding only its faces.
+            groupName = "hardsurface_faces_" + str(currentGroupIndex)
+            groupObject = extractFaces(objectToModify, groupFaceIndices, groupName)
+            inputPath = os.path.join(jobsDirectory, groupName + ".blend")
+            bpy.data.libraries.write(inputPath, {groupObject})
+            removeObject(groupObject)
+
+            job = {"input": inputPath,
+                   "output": os.path.join(jobsDirectory, groupName + "_result.blend"),
+                   "objectName": groupName,
+                   "plans": [plans[currentPosition] for currentPosition in currentGroup],
+                   "settings": settings}
+            jobPath = os.path.join(jobsDirectory, groupName + ".json")
+            with open(jobPath, "w") as jobFile:
+                json.dump(job, jobFile)
+
+            jobs.append(job)
+            commands.append([bpy.app.binary_path, "-b", "--factory-startup", "--python", os.path.abspath(__file__), "--", "--job", jobPath])
+
+        with ThreadPoolExecutor(max_workers=len(commands)) as executor:
+            # Consume the results so that a failing worker raises here.
+            list(executor.map(runWorkerProcess, commands))
+
+        resultObjects = [loadObject(currentJob["output"], currentJob["objectName"]) for currentJob in jobs]
+        stitchResults(objectToModify, faceIndices, [currentObject.data for currentObject in resultObjects])
+        for currentObject in resultObjects:
+            removeObject(currentObject)
+    finally:
+        shutil.rmtree(jobsDirectory, ignore_errors=True)
+
+
+# Detail the faces of a job, in a worker process.
+def runJob(jobPath):
+    # Only workers need the generation itself.
+    import recursivityManager_2_8
+    import cut_surface0_2_8
+
+    with open(jobPath, "r") as jobFile:
+        job = json.load(jobFile)
+
+    for currentModuleName, currentSettings in job["settings"].items():
+        currentModule = importlib.import_module(currentModuleName)
+        for currentName, currentValue in currentSettings.items():
+            setattr(currentModule, currentName, currentValue)
+    # The knife projection needs a 3D view, cut analytically instead.
+    cut_surface0_2_8.cutBackend = 'ANALYTIC'
+
+    groupObject = loadObject(job["input"], job["objectName"])
+    bpy.context.scene.collection.objects.link(groupObject)
+    bpy.context.view_layer.objects.active = groupObject
+
+    # The extracted faces are in the order of the plans.
+    facesTuples = utils_2_8.buildNewFaceTuples(groupObject, list(range(0, len(job["plans"]))))
+    for currentFaceTuple, currentPlan in zip(facesTuples, job["plans"]):
+        recursivityManager_2_8.executePlan(groupObject, currentPlan, [currentFaceTuple])
+
+    utils_2_8.setObjectMode('OBJECT')
+    bpy.data.libraries.write(job["output"], {groupObject})
+
+
+# Create an object made of 2 separate blocks of columns * columns adjacent unit quads, all selected.
+def createBlocksGrid(name, columns):
+    vertices = []
+    faces = []
+    for currentBlock in range(0, 2):
+        firstVertex = len(vertices)
+        blockOffset = currentBlock * (columns + 1)
+        for y in range(0, columns + 1):
+            for x in range(0, columns + 1):
+                vertices.append((blockOffset + x, y, 0))
+        for y in range(0, columns):
+            for x in range(0, columns):
+                currentVertex = firstVertex + y * (columns + 1) + x
+                faces.append((currentVertex, currentVertex + 1, currentVertex + columns + 2, currentVertex + columns + 1))
+
+    gridMesh = bpy.data.meshes.new(name)
+    gridMesh.from_pydata(vertices, [], faces)
+    gridMesh.update()
+    for currentPolygon in gridMesh.polygons:
+        currentPolygon.select = True
+
+    gridObject = bpy.data.objects.new(name, gridMesh)
+    bpy.context.scene.collection.objects.link(gridObject)
+    return gridObject
+
+
+# What a serial and a parallel run should agree on: the numbers of elements and the positions of the vertices.
+def meshSignature(mesh):
+    positions = sorted([tuple([round(currentCoordinate, 4) for currentCoordinate in currentVertex.co]) for currentVertex in mesh.vertices])
+    return (len(mesh.vertices), len(mesh.edges), len(mesh.polygons), positions)
+
+
+# Detail the same grid serially and in workersCount processes with the same seed, returns True when both give the same mesh.
+def checkAgainstSerialRun(seed, workersCount, columns):
+    import recursivityManager_2_8
+    import cut_surface0_2_8
+
+    # The workers cut analytically, so does the serial run.
+    cut_surface0_2_8.cutBackend = 'ANALYTIC'
+
+    signatures = []
+    for currentWorkersCount in (1, workersCount):
+        gridObject = createBlocksGrid("hardsurface_check_" + str(currentWorkersCount), columns)
+        recursivityManager_2_8.applyToSelectedFaces(gridObject, seed, currentWorkersCount)
+        utils_2_8.setObjectMode('OBJECT')
+        signatures.append(meshSignature(gridObject.data))
+
+    serialSignature, parallelSignature = signatures
+    print("Serial run: " + str(serialSignature[:3]) + " vertices, edges and faces, parallel run: " + str(parallelSignature[:3]) + ".")
+    if serialSignature[3] != parallelSignature[3]:
+        print(str(len(set(serialSignature[3]) ^ set(parallelSignature[3]))) + " vertex positions differ.")
+    return serialSignature == parallelSignature
+
+
+if __name__ == "__main__":
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Detail the faces of a job file, see detailFacesInParallel.")
+    parser.add_argument("--job", help="Job file written by detailFacesInParallel.")
+    parser.add_argument("--check", action="store_true", help="Compare a serial and a parallel run instead, see checkAgainstSerialRun.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the compared runs.")
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes of the parallel run.")
+    parser.add_argument("--columns", type=int, default=3, help="Columns and rows of quads of each block of the compared grid.")
+    arguments = parser.parse_args(argv)
+
+    if arguments.check:
+        if not checkAgainstSerialRun(arguments.seed, arguments.workers, arguments.columns):
+            print("The parallel run doesn't match the serial run.")
+            sys.exit(1)
+    elif arguments.job != None:
+        runJob(arguments.job)
+    else:
+        parser.error("one of --job or --check is required")
@@ -0,0 +1,247 @@
+import math
+import random
+
+import numpy as np
+
+
+# Generation of the notched cutting shapes as 2D closed polylines, without Blender.
+# Follows generate_cuttingShape0_2_8 step by step, random draws included, but works on lists of points instead of editing a BMesh.
+# Shapes only become meshes when outlineToMesh is called.
+
+# Names of the notches parameters, the same as the module level settings of generate_cuttingShape0_2_8.
+parameterNames = ('poppingNewEdge',
+                  'notchType45',
+                  'outerProbability',
+                  'relativeWidthMin',
+                  'relativeWidthMax',
+                  'relativeDepthWidthRatioMax',
+                  'thinnestOffset',
+                  'roundProbability',
+                  'outerRoundProbability',
+                  'roundSegments',
+                  'symetry')
+
+# Default values, the same as generate_cuttingShape0_2_8.
+defaultParameters = {
+    'poppingNewEdge'                : 1.0,
+    'notchType45'                   : 0.5,
+    'outerProbability'              : 0.5,
+    'relativeWidthMin'              : 0.1,
+    'relativeWidthMax'              : 0.9,
+    'relativeDepthWidthRatioMax'    : 0.3,
+    'thinnestOffset'                : 0.05,
+    'roundProbability'              : 0.0,
+    'outerRoundProbability'         : 0.5,
+    'roundSegments'                 : 5,
+    'symetry'                       : False}
+
+# Same values as the bevel of vertToRound.
+roundOffset = 1.05
+outerRoundProfile = 0.125
+innerRoundProfile = 0.5
+
+# Same distance as the final remove_doubles.
+mergeDistance = 0.000001
+
+
+def pointAlong(a, u, v, uFactor, vFactor):
+    return (a[0] + uFactor * u[0] + vFactor * v[0], a[1] + uFactor * u[1] + vFactor * v[1])
+
+
+# Replace a corner by a superellipse arc, the way a vertex only bevel does.
+# Returns the points of the arc, from the previous point side to the next point side.
+def roundCorner(previousPoint, corner, nextPoint, profile, segments):
+    previousLength = math.hypot(previousPoint[0] - corner[0], previousPoint[1] - corner[1])
+    nextLength = math.hypot(nextPoint[0] - corner[0], nextPoint[1] - corner[1])
+    if previousLength == 0 or nextLength == 0:
+        return [corner]
+
+    # The offset is clamped so that the arcs of 2 neighbour corners don't overlap.
+    offset = min(roundOffset, previousLength * 0.5, nextLength * 0.5)
+    startPoint = (corner[0] + (previousPoint[0] - corner[0]) * offset / previousLength, corner[1] + (previousPoint[1] - corner[1]) * offset / previousLength)
+    endPoint = (corner[0] + (nextPoint[0] - corner[0]) * offset / nextLength, corner[1] + (nextPoint[1] - corner[1]) * offset / nextLength)
+
+    # Profile 0.5 is a circle, 0.25 a straight chamfer, lower values are concave.
+    exponent = -math.log(2.0) / math.log(math.sqrt(profile))
+    origin = (startPoint[0] + endPoint[0] - corner[0], startPoint[1] + endPoint[1] - corner[1])
+    aAxis = (startPoint[0] - origin[0], startPoint[1] - origin[1])
+    bAxis = (endPoint[0] - origin[0], endPoint[1] - origin[1])
+
+    arcPoints = []
+    for currentSegment in range(0, segments + 1):
+        angle = (math.pi * 0.5) * currentSegment / segments
+        aFactor = math.cos(angle) ** (2.0 / exponent)
+        bFactor = math.sin(angle) ** (2.0 / exponent)
+        arcPoints.append((origin[0] + aFactor * aAxis[0] + bFactor * bAxis[0], origin[1] + aFactor * aAxis[1] + bFactor * bAxis[1]))
+
+    return arcPoints
+
+
+# Same as genericEdgeTransformation, on the segment going from a to b.
+# Returns the points replacing the inside of the segment, a and b excluded, and the depth of the notch.
+def transformEdge(seed, a, b, recursionDepth, parameters):
+
+    # Initialize the random seed, this is important in order to generate exactly the same content for a given seed.
+    random.seed(seed)
+
+    edgeToTransformLength = math.hypot(b[0] - a[0], b[1] - a[1])
+
+    # Decide if there is going to be a recursion pass for this edge.
+    if not random.uniform(0, 1) < parameters['poppingNewEdge']:
+        return [], None
+
+    currentWidth = random.uniform(parameters['relativeWidthMin'], parameters['relativeWidthMax'])
+    widthOffset = random.uniform(parameters['thinnestOffset'], (1.0 - parameters['thinnestOffset']) - currentWidth)
+    currentDepth = random.uniform(0.01, currentWidth * parameters['relativeDepthWidthRatioMax'])
+    outer = random.uniform(0, 1) < parameters['outerProbability']
+
+    # Local coordinate system.
+    vectorU = (b[0] - a[0], b[1] - a[1])
+    vectorV = (-vectorU[1], vectorU[0])
+    if outer:
+        vectorV = (-vectorV[0], -vectorV[1])
+
+    roundedCorners = [False, False, False, False]
+    outerRound = False
+
+    if random.uniform(0, 1) < parameters['notchType45']:
+        # ___________    ->    _____       _____
+        #                           \_____/
+        notchPoints = [pointAlong(a, vectorU, vectorV, widthOffset, 0),
+                       pointAlong(a, vectorU, vectorV, widthOffset + currentDepth, currentDepth),
+                       pointAlong(a, vectorU, vectorV, widthOffset + currentWidth - currentDepth, currentDepth),
+                       pointAlong(a, vectorU, vectorV, widthOffset + currentWidth, 0)]
+    else:
+        # ___________    ->    _____       _____
+        #                           |_____|
+        notchPoints = [pointAlong(a, vectorU, vectorV, widthOffset, 0),
+                       pointAlong(a, vectorU, vectorV, widthOffset, currentDepth),
+                       pointAlong(a, vectorU, vectorV, widthOffset + currentWidth, currentDepth),
+                       pointAlong(a, vectorU, vectorV, widthOffset + currentWidth, 0)]
+
+        # Only for 90 degrees notches will we round some vertices up, randomly picked among the 4 inner vertices.
+        roundedCorners = [random.uniform(0, 1) < parameters['roundProbability'] for currentCorner in notchPoints]
+        # Randomly choose if an the rounding will be an inner or outer one.
+        outerRound = random.uniform(0, 1) < parameters['outerRoundProbability']
+
+    # Corners of the notch, between the 5 segments replacing the edge.
+    polylinePoints = [a] + notchPoints + [b]
+    cornersPoints = [[currentPoint] for currentPoint in notchPoints]
+    for currentIndex in range(0, 4):
+        if roundedCorners[currentIndex]:
+            chosenProfile = outerRoundProfile if outerRound else innerRoundProfile
+            cornersPoints[currentIndex] = roundCorner(polylinePoints[currentIndex], polylinePoints[currentIndex + 1], polylinePoints[currentIndex + 2], chosenProfile, parameters['roundSegments'])
+
+    # The 5 segments, shortened by the rounded corners.
+    segmentsEnds = [a] + [currentCorner for currentCornerPoints in cornersPoints for currentCorner in (currentCornerPoints[0], currentCornerPoints[-1])] + [b]
+    segments = [(segmentsEnds[currentIndex * 2], segmentsEnds[currentIndex * 2 + 1]) for currentIndex in range(0, 5)]
+
+    # Recursion.
+    segmentsInnerPoints = [[] for currentSegment in segments]
+    if recursionDepth > 0:
+        for currentIndex, currentSegment in enumerate(segments):
+            if parameters['symetry']:
+                # When symetry is enabled, take the same seed for every edge.
+                futureSeed = seed
+            else:
+                # When symetry is disabled, randomize the seed for every edge.
+                futureSeed = random.randint(0, 1000000)
+
+            segmentsInnerPoints[currentIndex] = transformEdge(futureSeed, currentSegment[0], currentSegment[1], recursionDepth - 1, parameters)[0]
+
+    # Assemble the segments and the corners, a and b excluded.
+    resultingPoints = []
+    for currentIndex in range(0, 5):
+        resultingPoints.extend(segmentsInnerPoints[currentIndex])
+        if currentIndex < 4:
+            resultingPoints.extend(cornersPoints[currentIndex])
+
+    # The actual depth length is the proportional depth * the edge length.
+    currentDepth = currentDepth * edgeToTransformLength
+
+    if outer:
+        return resultingPoints, currentDepth
+    else:
+        return resultingPoints, -currentDepth
+
+
+# Remove the points at the same position as the previous one, what remove_doubles does on a closed outline.
+def removeDoubles(points):
+    cleanPoints = []
+    for currentPoint in points:
+        if len(cleanPoints) == 0 or math.hypot(currentPoint[0] - cleanPoints[-1][0], currentPoint[1] - cleanPoints[-1][1]) > mergeDistance:
+            cleanPoints.append(currentPoint)
+
+    while len(cleanPoints) > 1 and math.hypot(cleanPoints[0][0] - cleanPoints[-1][0], cleanPoints[0][1] - cleanPoints[-1][1]) <= mergeDistance:
+        cleanPoints.pop()
+
+    return cleanPoints
+
+
+# Same as generateRectangleCuttingShape followed by genericShapeTransformation.
+# The rectangle is walked counter clockwise, starting with its left edge, so that the depths come in the
+# [left, bottom, right, up] order genericCutPlate reads them in and outer notches point outward.
+# Returns the outline as an array of shape (pointsCount, 2), and the depth of the notch of each edge.
+def generateRectangleOutline(seed, dimension, recursionDepth, parameters=None):
+    if parameters == None:
+        parameters = defaultParameters
+
+    halfWidth = dimension[0] * 0.5
+    halfHeight = dimension[1] * 0.5
+    corners = [(-halfWidth, halfHeight), (-halfWidth, -halfHeight), (halfWidth, -halfHeight), (halfWidth, halfHeight)]
+
+    # Initialize the random seed, this is important in order to generate exactly the same content for a given seed.
+    random.seed(seed)
+
+    outlinePoints = []
+    edgesDepth = []
+    for currentIndex in range(0, 4):
+        if parameters['symetry']:
+            # When symetry is enabled, take the same seed for every edge.
+            futureSeed = seed
+        else:
+            # When symetry is disabled, randomize the seed for every edge.
+            futureSeed = random.randint(0, 1000000)
+
+        a = corners[currentIndex]
+        b = corners[(currentIndex + 1) % 4]
+        innerPoints, currentEdgeDepth = transformEdge(futureSeed, a, b, recursionDepth, parameters)
+
+        outlinePoints.append(a)
+        outlinePoints.extend(innerPoints)
+        edgesDepth.append(currentEdgeDepth)
+
+    return np.array(removeDoubles(outlinePoints), dtype=np.float64), edgesDepth
+
+
+# Generate a whole batch of shapes at once.
+# Returns the concatenated outlines as an array of shape (totalPointsCount, 2), the offsets of each outline in it
+# (outline i is coordinates[offsets[i]:offsets[i + 1]]), and the edges depths as an array of shape (shapesCount, 4), NaN where an edge has no notch.
+def generateRectangleOutlines(seeds, dimensions, recursionDepth, parameters=None):
+    outlines = []
+    edgesDepths = np.full((len(seeds), 4), np.nan)
+    offsets = np.zeros(len(seeds) + 1, dtype=np.int64)
+
+    for currentIndex, (currentSeed, currentDimension) in enumerate(zip(seeds, dimensions)):
+        currentOutline, currentEdgesDepth = generateRectangleOutline(currentSeed, currentDimension, recursionDepth, parameters)
+        outlines.append(currentOutline)
+        edgesDepths[currentIndex] = [np.nan if currentDepth == None else currentDepth for currentDepth in currentEdgesDepth]
+        offsets[currentIndex + 1] = offsets[currentIndex] + len(currentOutline)
+
+    if len(outlines) == 0:
+        return np.zeros((0, 2)), offsets, edgesDepths
+
+    return np.concatenate(outlines), offsets, edgesDepths
+
+
+# Convert an outline to a Blender mesh made of a closed loop of edges, like the shapes generate_cuttingShape0_2_8 creates.
+def outlineToMesh(name, outline):
+    # Only this function needs Blender.
+    import bpy
+
+    pointsCount = len(outline)
+    outlineMesh = bpy.data.meshes.new(name)
+    outlineMesh.from_pydata([(float(currentPoint[0]), float(currentPoint[1]), 0.0) for currentPoint in outline], [(currentIndex, (currentIndex + 1) % pointsCount) for currentIndex in range(0, pointsCount)], [])
+    outlineMesh.update()
+
+    return outlineMesh
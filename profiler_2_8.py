@@ -0,0 +1,101 @@
+import csv
+import json
+import time
+import functools
+
+
+# Instrumentation of the generation: wall time, calls and polygons growth per operation and recursion depth.
+# Nothing is measured while enabled is False, profiled functions then only cost a test of that flag.
+
+enabled = False # Measure the profiled operations.
+verbose = False # Print the debug information of the operations, like the face identities they process.
+statisticsFilePath = None # When set, exportStatistics writes there, as CSV if the path ends with .csv and JSON otherwise.
+
+# Recursion depth the operations are currently recorded under, set by the recursion.
+currentDepth = 0
+
+# Statistics by (operation name, depth): [calls, total time in seconds, polygons delta].
+statistics = {}
+
+
+def clearStatistics():
+    statistics.clear()
+
+
+def record(name, depth, duration, polygonsDelta):
+    entry = statistics.get((name, depth))
+    if entry == None:
+        entry = [0, 0.0, 0]
+        statistics[(name, depth)] = entry
+
+    entry[0] = entry[0] + 1
+    entry[1] = entry[1] + duration
+    entry[2] = entry[2] + polygonsDelta
+
+
+def polygonsCount(objectToCount):
+    if objectToCount == None:
+        return 0
+    # Meshes are accepted as well as objects.
+    meshToCount = getattr(objectToCount, "data", objectToCount)
+    polygons = getattr(meshToCount, "polygons", None)
+    if polygons == None:
+        return 0
+    return len(polygons)
+
+
+# Decorator measuring an operation.
+# objectArgument is the position of the object or mesh argument whose polygons growth is recorded, None to record no growth.
+# Times are inclusive, an operation calling another profiled one includes its time.
+def profiled(name, objectArgument=None):
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+
+            objectToCount = None
+            if objectArgument != None and objectArgument < len(args):
+                objectToCount = args[objectArgument]
+
+            depth = currentDepth
+            polygonsBefore = polygonsCount(objectToCount)
+            startTime = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(name, depth, time.perf_counter() - startTime, polygonsCount(objectToCount) - polygonsBefore)
+
+        return wrapper
+    return decorator
+
+
+# Statistics as a list of rows sorted by operation and depth.
+def statisticsRows():
+    rows = []
+    for (name, depth), (calls, totalTime, polygonsDelta) in sorted(statistics.items()):
+        rows.append({"operation": name,
+                     "depth": depth,
+                     "calls": calls,
+                     "totalTime": totalTime,
+                     "meanTime": totalTime / calls,
+                     "polygonsDelta": polygonsDelta})
+    return rows
+
+
+def exportStatistics(filePath=None):
+    if filePath == None:
+        filePath = statisticsFilePath
+    if not enabled or filePath == None:
+        return
+
+    rows = statisticsRows()
+
+    if filePath.lower().endswith(".csv"):
+        with open(filePath, "w", newline="") as statisticsFile:
+            writer = csv.DictWriter(statisticsFile, fieldnames=["operation", "depth", "calls", "totalTime", "meanTime", "polygonsDelta"])
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(filePath, "w") as statisticsFile:
+            json.dump(rows, statisticsFile, indent=4)
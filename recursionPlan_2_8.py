@@ -0,0 +1,304 @@
+import json
+import heapq
+import random
+
+# Import submodules.
+import hardsurface_2_8
+
+# Seeds derivation.
+import seeds_2_8
+hardsurface_2_8.reloadModule(seeds_2_8)
+from seeds_2_8 import *
+
+# Analytic cut geometry.
+import cutGeometry_2_8
+hardsurface_2_8.reloadModule(cutGeometry_2_8)
+
+# Cutting shapes generation without Blender.
+import polylineShape_2_8
+hardsurface_2_8.reloadModule(polylineShape_2_8)
+
+
+# Planning of the recursive generation, without Blender.
+# Every random decision of the recursion is taken here, on rectangles expressed in the TBN space of the root face, and stored in a plan
+# made of dictionaries and lists only, so that it can be saved as JSON and replayed by an executor without any random logic.
+#
+# A node of the plan is a face:
+#   "rect"      its (minX, maxX, minY, maxY) bounds in the TBN space of the root face,
+#   "depth"     the remaining recursion depth, -1 for the faces resulting from the last level,
+#   "inset"     0, or the direction of the inset applied to the face right after its creation by a subdivision, -1 inward and 1 outward,
+#   "operation" None when nothing is done to the face, otherwise
+#               {"type": "subdivide", "axis": 0 to cut along the tangent or 1 along the bitangent, "cuts": number of cuts}
+#               {"type": "cut", "seed": seed of the cut, "shapeSeed": seed of the cutting shape},
+#               both with the estimated number of "polygons" the operation adds,
+#   "children"  the nodes of the faces resulting from the operation.
+# Root nodes also have the "seed" they were planned from and the "tangent" of their TBN space.
+# Roots given to the planner may also have the "position" of their face among the faces of an operation.
+# Seeds follow the same derivation as recursiveGeneration, subdivideOrCut and subdivideFaces.
+
+# Settings of the decisions, the same as the module level settings of the Blender modules.
+defaultSettings = {
+    "subdivisionProbability"        : 1.8,
+    "insetProbability"              : 0.1,
+    "subdivisionOverCutProbability" : 0.7,
+    "verticalProbability"           : 0.5,
+    "minCuts"                       : 1,
+    "maxCuts"                       : 4,
+    "minimumLength"                 : 0.05,
+    "inwardProbability"             : 0.5,
+    "insetThickness"                : 0.01,
+    "insetRelativeOffset"           : True,
+    "cuttingShapeMargin"            : 0.9,
+    "cleanFaceMargin"               : 0.7,
+    "cuttingShapeVariants"          : 100000}
+
+
+# Cutting shapes of the plans made outside of Blender.
+def polylineShapeProvider(seed, dimension, recursionDepth):
+    outline, edgesDepth = polylineShape_2_8.generateRectangleOutline(seed, dimension, recursionDepth)
+    return [tuple(currentPoint) for currentPoint in outline.tolist()], edgesDepth
+
+
+def newNode(rect, depth, inset=0):
+    return {"rect": list(rect), "depth": depth, "inset": inset, "operation": None, "children": []}
+
+
+def rectDimension(rect):
+    return (rect[1] - rect[0], rect[3] - rect[2])
+
+
+# Bounds of a face after an inset, the inset moves every border by the same amount.
+def insetRect(rect, settings):
+    thickness = settings["insetThickness"]
+    if settings["insetRelativeOffset"]:
+        thickness = thickness * min(rectDimension(rect))
+    return [rect[0] + thickness, rect[1] - thickness, rect[2] + thickness, rect[3] - thickness]
+
+
+# Same decisions as subdivideFaces for the face at position, then planSubdivision.
+# Returns the (rect, inset) of the resulting faces, from the lowest to the highest coordinate along the cut axis.
+# A subdivision adds one face per cut, and each inset 4 side faces.
+def planSubdivision(seed, position, node, settings):
+    randomStream = random.Random(deriveSeed(seed, position))
+    if not randomStream.uniform(0, 1) < settings["subdivisionProbability"]:
+        return []
+
+    subdivisionStream = random.Random(deriveSeed(seed, position, "subdivision"))
+    if subdivisionStream.uniform(0, 1) < settings["verticalProbability"]:
+        axis = 0
+    else:
+        axis = 1
+
+    # Minimum length test.
+    if rectDimension(node["rect"])[axis] < settings["minimumLength"]:
+        return []
+
+    numberOfCuts = subdivisionStream.randint(settings["minCuts"], settings["maxCuts"])
+    node["operation"] = {"type": "subdivide", "axis": axis, "cuts": numberOfCuts}
+
+    rect = node["rect"]
+    pieceLength = rectDimension(rect)[axis] / (numberOfCuts + 1)
+    childrenDescriptions = []
+    for currentChild in range(0, numberOfCuts + 1):
+        childRect = list(rect)
+        childRect[axis * 2] = rect[axis * 2] + pieceLength * currentChild
+        childRect[axis * 2 + 1] = rect[axis * 2] + pieceLength * (currentChild + 1)
+
+        # Faces resulting from the subdivision are randomly inset.
+        childPath = (position, currentChild)
+        inset = 0
+        if random.Random(deriveSeed(seed, childPath, "inset")).uniform(0, 1) < settings["insetProbability"]:
+            if random.Random(deriveSeed(seed, childPath, "insetOperation")).uniform(0, 1) < settings["inwardProbability"]:
+                inset = -1
+            else:
+                inset = 1
+            childRect = insetRect(childRect, settings)
+
+        childrenDescriptions.append((childRect, inset))
+
+    node["operation"]["polygons"] = numberOfCuts + 4 * len([currentChild for currentChild in childrenDescriptions if currentChild[1] != 0])
+
+    return childrenDescriptions
+
+
+# Same decisions as genericCutPlate.
+# Returns the (rect, inset) of the clean face resulting from the cut.
+# A cut adds 2 plate faces, 2 faces per outline edge for its crease, and 2 faces around the clean face.
+def planCut(seed, node, settings, shapeProvider):
+    faceWidth, faceHeight = rectDimension(node["rect"])
+    if faceWidth <= 0 or faceHeight <= 0:
+        return []
+
+    shapeSeed = random.Random(seed).randint(0, settings["cuttingShapeVariants"])
+    node["operation"] = {"type": "cut", "seed": seed, "shapeSeed": shapeSeed}
+
+    shapeOutline, edgesDepth = shapeProvider(shapeSeed, (faceWidth * 0.5, faceHeight * 0.5), 0)
+    cleanFaceOutline = cutGeometry_2_8.plateLayout(faceWidth, faceHeight, shapeOutline, edgesDepth, settings["cuttingShapeMargin"], settings["cleanFaceMargin"])[1]
+    node["operation"]["polygons"] = 4 + 2 * len(shapeOutline)
+
+    # The clean face is expressed relative to the center of the face.
+    centerX = (node["rect"][0] + node["rect"][1]) * 0.5
+    centerY = (node["rect"][2] + node["rect"][3]) * 0.5
+    childRect = [centerX + min([currentPoint[0] for currentPoint in cleanFaceOutline]), centerX + max([currentPoint[0] for currentPoint in cleanFaceOutline]),
+                 centerY + min([currentPoint[1] for currentPoint in cleanFaceOutline]), centerY + max([currentPoint[1] for currentPoint in cleanFaceOutline])]
+
+    return [(childRect, 0)]
+
+
+# Same decisions as subdivideOrCut for the face at position.
+# operationType forces a 'subdivide' or a 'cut' operation, subdivideFaces is planned with 'subdivide'.
+def planOperation(seed, position, node, settings, shapeProvider, operationType=None):
+    if operationType == 'subdivide':
+        return planSubdivision(seed, position, node, settings)
+
+    randomStream = random.Random(deriveSeed(seed, position))
+    subdivisionOverCut = randomStream.uniform(0, 1) < settings["subdivisionOverCutProbability"]
+
+    if operationType == 'cut' or not subdivisionOverCut:
+        return planCut(deriveSeed(seed, position, "cut"), node, settings, shapeProvider)
+    return planSubdivision(deriveSeed(seed, position, "subdivide"), 0, node, settings)
+
+
+# Plan the operation of a node, same decisions as recursiveGeneration for one face.
+# Returns the seeds and nodes of its children, without their own operations.
+def expandNode(seed, node, settings, shapeProvider):
+    childrenDescriptions = planOperation(deriveSeed(seed, "operation"), 0, node, settings, shapeProvider)
+
+    childrenSeed = deriveSeed(seed, "children")
+    return [(deriveSeed(childrenSeed, currentPosition), newNode(childRect, node["depth"] - 1, childInset))
+            for currentPosition, (childRect, childInset) in enumerate(childrenDescriptions)]
+
+
+# Plan a node and its descendants.
+def planSubtree(seed, node, settings, shapeProvider):
+    if node["depth"] < 0:
+        return node
+
+    node["children"] = [planSubtree(childSeed, childNode, settings, shapeProvider) for childSeed, childNode in expandNode(seed, node, settings, shapeProvider)]
+
+    return node
+
+
+def rectArea(rect):
+    faceWidth, faceHeight = rectDimension(rect)
+    return faceWidth * faceHeight
+
+
+# Plan nodes the largest first, as long as the estimated polygons of their operation fit in the budget.
+# budgetMode 'OBJECT' shares the budget between all the roots, 'FACE' gives it to each root, 'AREA' to each unit of area of the roots,
+# the area of their rectangle in world space.
+# A node whose operation doesn't fit is left as it is, smaller nodes may still fit in what is left.
+def planWithinBudget(rootsSeeds, rootNodes, settings, shapeProvider, budget, budgetMode):
+    if budgetMode == 'OBJECT':
+        pools = [budget]
+        rootsPools = [0] * len(rootNodes)
+    elif budgetMode == 'FACE':
+        pools = [budget] * len(rootNodes)
+        rootsPools = list(range(0, len(rootNodes)))
+    elif budgetMode == 'AREA':
+        pools = [budget * rectArea(currentNode["rect"]) for currentNode in rootNodes]
+        rootsPools = list(range(0, len(rootNodes)))
+    else:
+        raise ValueError("Unknown budget mode: " + str(budgetMode))
+
+    # The counter keeps the order of nodes of the same area, and of their expansion, deterministic.
+    nodesHeap = []
+    counter = 0
+    for currentSeed, currentNode, currentPool in zip(rootsSeeds, rootNodes, rootsPools):
+        heapq.heappush(nodesHeap, (-rectArea(currentNode["rect"]), counter, currentSeed, currentNode, currentPool))
+        counter = counter + 1
+
+    while len(nodesHeap) > 0:
+        currentArea, currentOrder, currentSeed, currentNode, currentPool = heapq.heappop(nodesHeap)
+        if currentNode["depth"] < 0:
+            continue
+
+        children = expandNode(currentSeed, currentNode, settings, shapeProvider)
+        if currentNode["operation"] == None:
+            continue
+
+        if currentNode["operation"]["polygons"] > pools[currentPool]:
+            currentNode["operation"] = None
+            continue
+        pools[currentPool] = pools[currentPool] - currentNode["operation"]["polygons"]
+
+        currentNode["children"] = [childNode for childSeed, childNode in children]
+        for childSeed, childNode in children:
+            heapq.heappush(nodesHeap, (-rectArea(childNode["rect"]), counter, childSeed, childNode, currentPool))
+            counter = counter + 1
+
+
+def completeSettings(settings):
+    completedSettings = dict(defaultSettings)
+    if settings != None:
+        completedSettings.update(settings)
+    return completedSettings
+
+
+# Plan the whole recursion of several faces.
+# roots is a list of {"seed", "rect", "tangent"} dictionaries, one per face, recursiveDepth the depth of the recursion.
+# shapeProvider(seed, dimension, recursionDepth) returns the outline and edges depth of a cutting shape.
+# With a budget, the estimated number of added polygons is kept under it, see planWithinBudget.
+# The same faces get the same operations with or without a budget, a budget only stops their refinement.
+def planRecursion(roots, recursiveDepth, settings=None, shapeProvider=None, budget=None, budgetMode='OBJECT'):
+    settings = completeSettings(settings)
+    if shapeProvider == None:
+        shapeProvider = polylineShapeProvider
+
+    rootNodes = []
+    for currentRoot in roots:
+        rootNode = newNode(currentRoot["rect"], recursiveDepth)
+        rootNode["seed"] = currentRoot["seed"]
+        rootNode["tangent"] = list(currentRoot["tangent"])
+        rootNodes.append(rootNode)
+
+    if budget == None:
+        for currentNode in rootNodes:
+            planSubtree(currentNode["seed"], currentNode, settings, shapeProvider)
+    else:
+        planWithinBudget([currentNode["seed"] for currentNode in rootNodes], rootNodes, settings, shapeProvider, budget, budgetMode)
+
+    return {"settings": settings, "roots": rootNodes}
+
+
+# Plan a single operation on several faces, same decisions as subdivideOrCut, or subdivideFaces with operationType 'subdivide'.
+def planOperations(seed, roots, settings=None, shapeProvider=None, operationType=None):
+    settings = completeSettings(settings)
+    if shapeProvider == None:
+        shapeProvider = polylineShapeProvider
+
+    plannedRoots = []
+    for currentPosition, currentRoot in enumerate(roots):
+        rootNode = newNode(currentRoot["rect"], 0)
+        # Roots keep the position of their face among the faces given to the operation, when some could not be described.
+        childrenDescriptions = planOperation(seed, currentRoot.get("position", currentPosition), rootNode, settings, shapeProvider, operationType)
+        rootNode["children"] = [newNode(childRect, -1, childInset) for childRect, childInset in childrenDescriptions]
+        rootNode["tangent"] = list(currentRoot["tangent"])
+        plannedRoots.append(rootNode)
+
+    return {"settings": settings, "roots": plannedRoots}
+
+
+# Nodes of a plan level by level, the roots first.
+def planLevels(plan):
+    levels = []
+    currentLevel = list(plan["roots"])
+    while len(currentLevel) > 0:
+        levels.append(currentLevel)
+        currentLevel = [currentChild for currentNode in currentLevel for currentChild in currentNode["children"]]
+    return levels
+
+
+# Estimated number of polygons a plan adds.
+def estimatedPolygons(plan):
+    return sum([currentNode["operation"]["polygons"] for currentLevel in planLevels(plan) for currentNode in currentLevel if currentNode["operation"] != None])
+
+
+def savePlan(plan, filePath):
+    with open(filePath, "w") as planFile:
+        json.dump(plan, planFile)
+
+
+def loadPlan(filePath):
+    with open(filePath, "r") as planFile:
+        return json.load(planFile)
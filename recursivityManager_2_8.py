@@ -9,32 +9,60 @@ from datetime import datetime
 # Import submodules.
 import sys
 import os
-import importlib
 import copy
+import json
+
+# Run from Blender's text editor, the other scripts are found next to the .blend file.
+if __name__ == "__main__":
+    blend_dir = os.path.dirname(bpy.data.filepath)
+    if blend_dir not in sys.path:
+        sys.path.append(blend_dir)
+
+import hardsurface_2_8
+if __name__ == "__main__":
+    hardsurface_2_8.startReloadPass()
 
-blend_dir = os.path.dirname(bpy.data.filepath)
-if blend_dir not in sys.path:
-   sys.path.append(blend_dir)
-   
 # First inset.
 firstInsetDepth = -0.03
 firstInsetThickness = 0.0
 
 # Surface cutting.  
 import cut_surface0_2_8
-importlib.reload(cut_surface0_2_8)
+hardsurface_2_8.reloadModule(cut_surface0_2_8)
 from cut_surface0_2_8 import *
 
 # Subdivisions.
 import subdivide_surface_2_8
-importlib.reload(subdivide_surface_2_8)
+hardsurface_2_8.reloadModule(subdivide_surface_2_8)
 from subdivide_surface_2_8 import *
 
 # Recursive insets.
 import inset_surface_2_8
-importlib.reload(inset_surface_2_8)
+hardsurface_2_8.reloadModule(inset_surface_2_8)
 from inset_surface_2_8 import *
 
+# Instrumentation.
+import profiler_2_8
+hardsurface_2_8.reloadModule(profiler_2_8)
+
+# Modules of optional features, imported when the feature is first used.
+# Parallel detailing.
+parallelFaces_2_8 = hardsurface_2_8.lazyModule("parallelFaces_2_8")
+# Checkpoints.
+checkpoint_2_8 = hardsurface_2_8.lazyModule("checkpoint_2_8")
+# Camera aware detail density.
+cameraDetail_2_8 = hardsurface_2_8.lazyModule("cameraDetail_2_8")
+# Instanced output.
+instancedDetail_2_8 = hardsurface_2_8.lazyModule("instancedDetail_2_8")
+# Streaming export.
+streamExport_2_8 = hardsurface_2_8.lazyModule("streamExport_2_8")
+# Array output.
+arrayMesh_2_8 = hardsurface_2_8.lazyModule("arrayMesh_2_8")
+
+# Planning of the recursion.
+import recursionPlan_2_8
+hardsurface_2_8.reloadModule(recursionPlan_2_8)
+
     
 subdivisionProbability = 1.8
 insetProbability = 0.1
@@ -52,191 +80,540 @@ generate_cuttingShape0_2_8.roundProbability = 0.0
 # Recursive settings.
 recursiveDepth = 3
 subdivisionOverCutProbability = 0.7
+# Maximum number of polygons the recursion adds, None for no limit besides recursiveDepth.
+# The largest faces are refined first, see recursionPlan_2_8.planWithinBudget.
+polygonBudget = None
+# 'OBJECT' for a budget of the whole object, 'FACE' for a budget of each detailed face, 'AREA' for a budget per unit of world space area.
+polygonBudgetMode = 'OBJECT'
 
 # Batches generation.
 batchSize = 5
 seedOffsetForBatches = 6
+# Checkpoints of applyToSelectedFaces, written every checkpointInterval faces in checkpointDirectory when both are set.
+# A run with the same object, seed and settings, see checkpointSettings, resumes from the last checkpoint.
+# Only serial runs are checkpointed: parallel runs are refused with a checkpointDirectory, and the 'INSTANCED' and 'ARRAY' output
+# modes detail every face in a single pass, with no checkpoint in between.
+checkpointInterval = 0
+checkpointDirectory = None
 
+# 'BAKED' details the faces in the mesh, 'INSTANCED' replaces them by linked duplicates of shared detail patches, see instancedDetail_2_8.
+# 'ARRAY' details the faces in numpy arrays, see arrayMesh_2_8, and builds the Blender mesh of the object once at the end.
+outputMode = 'BAKED'
 
+# Cameras, or their names, applyToSelectedFaces adapts the detail of each face to, see cameraDetail_2_8.
+# Faces no camera sees are not detailed. None details every face the same.
+detailCameras = None
 
-def subdivideFaces(seed, objectToBrowse, facesTuples):
-    
-    # Initialize the random seed, this is important in order to generate exactly the same content for a given seed.
-    random.seed(seed)
+# Module level settings of the generation modules given to the parallel workers, by module name.
+# The settings of the plans are not in there, the workers get the plans of their faces, planned in this process.
+workerSettingNames = {
+    "cut_surface0_2_8"           : ("cuttingShapeMargin", "cleanFaceMargin", "bevelOffset", "cuttingShapeVariants"),
+    "inset_surface_2_8"          : ("insetThickness", "insetDepth", "insetRelativeOffset", "inwardProbability"),
+    "subdivide_surface_2_8"      : ("minCuts", "maxCuts", "verticalProbability", "minimumLength"),
+    "generate_cuttingShape0_2_8" : ("poppingNewEdge", "outerProbability", "relativeWidthMin", "relativeWidthMax", "relativeDepthWidthRatioMax", "thinnestOffset",
+                                    "roundProbability", "outerRoundProbability", "roundSegments", "rectangleProbability", "maximumRatioDifference",
+                                    "verticalProbability", "minmumCircleEdges", "maximumCircleEdges", "recursivity", "symetry"),
+    "cuttingShapeCache_2_8"      : ("ratioPrecision", "shapeGenerator")}
+# Axis the batch tiles are randomly rotated around, the Z axis of the view the batches were designed in.
+tileRotationAxis = mathutils.Vector((0.0912528, -0.801197, -0.591402))
+
+
+
+# Settings of the plans, taken from the module level settings of the generation modules.
+def planSettings():
+    return {
+        "subdivisionProbability"        : subdivisionProbability,
+        "insetProbability"              : insetProbability,
+        "subdivisionOverCutProbability" : subdivisionOverCutProbability,
+        "verticalProbability"           : subdivide_surface_2_8.verticalProbability,
+        "minCuts"                       : subdivide_surface_2_8.minCuts,
+        "maxCuts"                       : subdivide_surface_2_8.maxCuts,
+        "minimumLength"                 : subdivide_surface_2_8.minimumLength,
+        "inwardProbability"             : inset_surface_2_8.inwardProbability,
+        "insetThickness"                : inset_surface_2_8.insetThickness,
+        "insetRelativeOffset"           : inset_surface_2_8.insetRelativeOffset,
+        "cuttingShapeMargin"            : cut_surface0_2_8.cuttingShapeMargin,
+        "cleanFaceMargin"               : cut_surface0_2_8.cleanFaceMargin,
+        "cuttingShapeVariants"          : cut_surface0_2_8.cuttingShapeVariants}
+
+
+# Everything a checkpoint must have been written with to be resumed, as it is stored in the checkpoint.
+def checkpointSettings(objectToModify, seed):
+    cameraNames = None
+    if detailCameras != None:
+        cameraNames = [currentCamera if isinstance(currentCamera, str) else currentCamera.name for currentCamera in detailCameras]
+    
+    # Stored as JSON, compared as read back.
+    return json.loads(json.dumps({
+        "objectName"        : objectToModify.name,
+        "seed"              : seed,
+        "recursiveDepth"    : recursiveDepth,
+        "planSettings"      : planSettings(),
+        "polygonBudget"     : polygonBudget,
+        "polygonBudgetMode" : polygonBudgetMode,
+        "detailCameras"     : cameraNames,
+        "cutBackend"        : cut_surface0_2_8.cutBackend,
+        "outputMode"        : outputMode}))
+
+
+# Current values of the settings given to the parallel workers, see workerSettingNames.
+def workerSettings():
+    return {currentModuleName: {currentName: getattr(sys.modules[currentModuleName], currentName) for currentName in currentNames}
+            for currentModuleName, currentNames in workerSettingNames.items()}
+
+
+# Describe faces as the roots of a plan, in the TBN space of their own frame.
+# Returns the roots along with the tuples of the faces found in the object, in the same order.
+def describePlanRoots(objectToBrowse, facesTuples, seed=0):
+    setObjectMode('OBJECT')
+    
+    roots = []
+    rootsTuples = []
+    for currentPosition, currentFaceTuple in enumerate(facesTuples):
+        faceIndex = resolveFaceIndex(objectToBrowse, currentFaceTuple)
+        if faceIndex == None:
+            print("Face to plan not found.")
+            continue
+        
+        faceFrame = getFaceFrame(objectToBrowse, faceIndex)
+        roots.append({"seed": deriveSeed(seed, currentPosition), "position": currentPosition, "rect": list(faceFrame["borders"]), "tangent": list(faceFrame["tbn"][0])})
+        rootsTuples.append(currentFaceTuple)
     
-    totalFacesTuples = []
-    for currentFaceTuple in facesTuples:
-        if random.uniform(0, 1) < subdivisionProbability:
-            generatedFacesTuples = subdivideGeneric(seed, objectToBrowse, currentFaceTuple)
-            if(generatedFacesTuples is not None):
-                totalFacesTuples.extend(generatedFacesTuples)
+    return roots, rootsTuples
+
+
+def faceTupleCenter(faceTuple):
+    center = mathutils.Vector((0, 0, 0))
+    for currentVertex in faceTuple[1]:
+        center = center + mathutils.Vector(currentVertex)
+    return center / len(faceTuple[1])
+
+
+# Replay a plan of recursionPlan_2_8 on the faces it was planned from, rootsTuples being in the order of the plan's roots.
+# Nothing is random here, every decision was taken by the plan.
+# The plan is replayed level by level, the subdivisions of a level in a single pass, then its insets and its cuts.
+# Returns the face tuples of the faces resulting from the last level.
+def executePlan(objectToModify, plan, rootsTuples, backend=None):
+    
+    # Nodes to replay, with their face tuple and the tangent of their root.
+    currentLevel = [(currentNode, currentTuple, mathutils.Vector(currentNode["tangent"])) for currentNode, currentTuple in zip(plan["roots"], rootsTuples)]
+    frontierTuples = []
+    
+    # The cuts of the plan only flag their creases, they are all made at once at the end.
+    cut_surface0_2_8.deferCreases = True
+    try:
+        while len(currentLevel) > 0:
+            # Compute the frames of the whole level at once, the operations look them up instead of reading the faces one vertex at a time.
+            setObjectMode('OBJECT')
+            precomputeFaceFrames(objectToModify, [resolveFaceIndex(objectToModify, currentTuple) for currentNode, currentTuple, currentTangent in currentLevel])
+        
+            # Operations are recorded under the remaining recursion depth.
+            profiler_2_8.currentDepth = currentLevel[0][0]["depth"]
+        
+            subdivisions = []
+            subdividedNodes = []
+            cutNodes = []
+            for currentNode, currentTuple, currentTangent in currentLevel:
+                operation = currentNode["operation"]
+                if operation == None:
+                    # Faces of the last level are the result, faces without operation before it are left as they are.
+                    if currentNode["depth"] < 0:
+                        frontierTuples.append(currentTuple)
+                elif operation["type"] == "subdivide":
+                    faceIndex = resolveFaceIndex(objectToModify, currentTuple)
+                    if faceIndex == None or len(faceCornerPositions([objectToModify.data.vertices[currentVertexIndex].co for currentVertexIndex in objectToModify.data.polygons[faceIndex].vertices])) != 4:
+                        print("Face to subdivide not found, or does not have 4 corners.")
+                        continue
+                
+                    # The plan cuts along its root's tangent or bitangent, which the face's first edge may not follow.
+                    faceFrame = getFaceFrame(objectToModify, faceIndex)
+                    cutDirection = currentTangent
+                    if operation["axis"] == 1:
+                        cutDirection = faceFrame["tbn"][2].cross(currentTangent)
+                    verticalSubdivision = abs(faceFrame["tbn"][0].dot(cutDirection)) >= abs(faceFrame["tbn"][1].dot(cutDirection))
                 
-    # Sort the arrays from in descending order according to the index, to avoid index offsetting side effects when modifying a face.
-    totalFacesTuples = sorted(totalFacesTuples, key= lambda faceTuple: faceTuple[0], reverse = True)
-    print("totalFacesTuples (after subdivision) = " + str([currentTuple[0] for currentTuple in totalFacesTuples]))
+                    subdivisions.append((faceIndex, verticalSubdivision, operation["cuts"]))
+                    subdividedNodes.append((currentNode, currentTangent, cutDirection))
+                else:
+                    cutNodes.append((currentNode, currentTuple, currentTangent))
+        
+            nextLevel = []
+            insets = []
+            insetNodes = []
+            for (currentNode, currentTangent, cutDirection), childrenTuples in zip(subdividedNodes, subdivideBatch(objectToModify, subdivisions)):
+                # Resulting faces are matched with the planned ones by their position along the cut direction.
+                childrenTuples = sorted(childrenTuples, key=lambda currentTuple: faceTupleCenter(currentTuple).dot(cutDirection))
+                for childNode, childTuple in zip(currentNode["children"], childrenTuples):
+                    if childNode["inset"] == 0:
+                        nextLevel.append((childNode, childTuple, currentTangent))
+                        continue
+                
+                    childIndex = resolveFaceIndex(objectToModify, childTuple)
+                    if childIndex == None:
+                        print("Face to inset not found.")
+                        continue
+                    insets.append((childIndex, childNode["inset"] < 0))
+                    insetNodes.append((childNode, currentTangent))
+        
+            # Every inset of the level in a single pass.
+            for (childNode, currentTangent), innerTuple in zip(insetNodes, insetBatch(objectToModify, insets)):
+                nextLevel.append((childNode, innerTuple, currentTangent))
+        
+            for currentNode, currentTuple, currentTangent in cutNodes:
+                operation = currentNode["operation"]
+                resultingTuple = genericCutPlate(operation["seed"], objectToModify, currentTuple, backend, operation["shapeSeed"], currentTangent)
+                # This might be necessary to refresh the object, check this.
+                setObjectMode('OBJECT')
+            
+                if not (resultingTuple == [] or resultingTuple == None) and len(currentNode["children"]) > 0:
+                    nextLevel.append((currentNode["children"][0], resultingTuple, currentTangent))
+        
+            currentLevel = nextLevel
+    finally:
+        cut_surface0_2_8.deferCreases = False
     
+    # Crease the plates of the whole plan at once.
+    applyPendingCreases(objectToModify)
     
-    resultFacesTuples = []
-    for currentFaceTuple in totalFacesTuples:
-        if random.uniform(0, 1) < insetProbability:
-            generatedFacesTuples = insetGeneric(seed, objectToBrowse, currentFaceTuple)
-            resultFacesTuples.extend(generatedFacesTuples)
-        else:
-            resultFacesTuples.append(currentFaceTuple)
+    if profiler_2_8.verbose:
+        print("frontierTuples = " + str([currentTuple[0] for currentTuple in frontierTuples]))
     
-    # Sort the arrays from in descending order according to the index, to avoid index offsetting side effects when modifying a face.
-    resultFacesTuples = sorted(resultFacesTuples, key= lambda faceTuple: faceTuple[0], reverse = True)
-    print("resultFacesTuples (after inset) = " + str([currentTuple[0] for currentTuple in resultFacesTuples]))
-        
-    return resultFacesTuples
+    return frontierTuples
 
 
-def subdivideOrCut(seed, objectToBrowse, facesTuples):
+# Every face gets its own random stream, derived from the seed and the face's position in facesTuples.
+def subdivideFaces(seed, objectToBrowse, facesTuples):
     
-    # Initialize the random seed, this is important in order to generate exactly the same content for a given seed.
-    random.seed(seed)
+    roots, rootsTuples = describePlanRoots(objectToBrowse, facesTuples)
+    plan = recursionPlan_2_8.planOperations(seed, roots, planSettings(), cuttingShapeCache_2_8.getRectangleCuttingShape, operationType='subdivide')
     
-    print("subdivideOrCut facesTuples = " + str([currentTuple[0] for currentTuple in facesTuples]))
+    return executePlan(objectToBrowse, plan, rootsTuples)
+
+
+# Every face gets its own random stream, derived from the seed and the face's position in facesTuples.
+def subdivideOrCut(seed, objectToBrowse, facesTuples):
     
-    # Final result to return.
-    finalFacesTuples = []
+    if profiler_2_8.verbose:
+        print("subdivideOrCut facesTuples = " + str([currentTuple[0] for currentTuple in facesTuples]))
     
-    for currentFaceTuple in facesTuples:
-        resultingFacesTuples = []
-        
-        # Randomly pick a subdivision or cut operation.
-        subdivisionOverCut = random.uniform(0, 1) < subdivisionOverCutProbability
-        
-        if subdivisionOverCut:
-            resultingFacesTuples = subdivideFaces(random.randint(0, 100000), objectToBrowse, [currentFaceTuple])
-        else:
-            resultingFacesTuples = [genericCutPlate(random.randint(0, 100000), objectToBrowse, currentFaceTuple)]
-        # This might be necessary to refresh the object, check this.
-        bpy.ops.object.mode_set(mode = 'OBJECT')
-            
-        # Add the resulting faces to the final total array.
-        if resultingFacesTuples == None:
-            finalFacesTuples.append(currentFaceTuple)
-        else:
-            finalFacesTuples.extend(resultingFacesTuples)
-    
-    # Filter out empty elements.
-    finalFacesTuples = [currentTuple for currentTuple in finalFacesTuples if not (currentTuple == [] or currentTuple == None) ]
+    roots, rootsTuples = describePlanRoots(objectToBrowse, facesTuples)
+    plan = recursionPlan_2_8.planOperations(seed, roots, planSettings(), cuttingShapeCache_2_8.getRectangleCuttingShape)
     
-    print("finalFacesTuples before sort = " + str([currentTuple[0] for currentTuple in finalFacesTuples]))
+    return executePlan(objectToBrowse, plan, rootsTuples)
+
+
+# Plan the recursion of faces without touching the mesh.
+# Each node of the recursion tree, a face, derives its seed from the seed of the level and its position among the faces of the level.
+# The result of a face then doesn't depend on the order, or the process, faces are detailed in.
+# budget and budgetMode default to polygonBudget and polygonBudgetMode.
+# probabilityScale scales the subdivision and inset probabilities, for faces seen small.
+def planGeneration(seed, objectToModify, facesToModify, recursiveDepth, budget=None, budgetMode=None, probabilityScale=1.0):
+    if budget == None:
+        budget = polygonBudget
+    if budgetMode == None:
+        budgetMode = polygonBudgetMode
+    
+    settings = planSettings()
+    settings["subdivisionProbability"] = settings["subdivisionProbability"] * probabilityScale
+    settings["insetProbability"] = settings["insetProbability"] * probabilityScale
+    
+    roots, rootsTuples = describePlanRoots(objectToModify, facesToModify, seed)
+    return recursionPlan_2_8.planRecursion(roots, recursiveDepth, settings, cuttingShapeCache_2_8.getRectangleCuttingShape, budget, budgetMode), rootsTuples
+
+
+# Plan the whole recursion first, then execute it.
+# Returns the face tuples of the faces resulting from the last level.
+def recursiveGeneration(seed, objectToModify, facesToModify, recursiveDepth, budget=None, budgetMode=None, probabilityScale=1.0):
+    plan, rootsTuples = planGeneration(seed, objectToModify, facesToModify, recursiveDepth, budget, budgetMode, probabilityScale)
     
-    # Sort the arrays from in descending order according to the index, to avoid index offsetting side effects when modifying a face.
-    finalFacesTuples = sorted(finalFacesTuples, key= lambda faceTuple: faceTuple[0], reverse = True)
-    print("finalFacesTuples after sort = " + str([currentTuple[0] for currentTuple in finalFacesTuples]))
+    if profiler_2_8.verbose:
+        print("planned polygons = " + str(recursionPlan_2_8.estimatedPolygons(plan)))
     
-    return finalFacesTuples
+    return executePlan(objectToModify, plan, rootsTuples)
 
 
+# Execute the plans of faces of an object, given by their indices, on an array mesh of the object, then replace the mesh of the object
+# by the detailed one in a single conversion.
+def executePlansOnArrays(objectToModify, plans, faceIndices):
+    setObjectMode('OBJECT')
+    
+    detailedMesh = arrayMesh_2_8.fromBlenderObject(objectToModify)
+    for currentPlan, currentFaceIndex in zip(plans, faceIndices):
+        arrayMesh_2_8.executeArrayPlan(detailedMesh, currentPlan, [currentFaceIndex], cuttingShapeCache_2_8.getRectangleCuttingShape)
+    
+    originalMesh = objectToModify.data
+    newMesh = arrayMesh_2_8.toBlenderMesh(detailedMesh, originalMesh.name, objectToModify.matrix_world)
+    for currentMaterial in originalMesh.materials:
+        newMesh.materials.append(currentMaterial)
+    
+    objectToModify.data = newMesh
+    clearFaceFrames(originalMesh)
+    bpy.data.meshes.remove(originalMesh)
+    newMesh.name = objectToModify.name
 
-def recursiveGeneration(seed, objectToModify, facesToModify, recursiveDepth):
-    
-    # Initialize the random seed, this is important in order to generate exactly the same content for a given seed.
-    random.seed(seed)
 
-    # Subdivide or cut recursively.
-    # Traverse the created faces in a descending order according to their index, to avoid issues with index offsetting when creating new faces.
-    for currentFaceToModify in facesToModify:
-        resultingFaceTuples = subdivideOrCut(random.randint(0, 100000), objectToModify, [currentFaceToModify])
+# Budget of each face detailed on its own, None without budget.
+# An object budget is shared between the faces according to their area.
+def facesBudgets(objectToBrowse, facesTuples):
+    if polygonBudget == None:
+        return [None] * len(facesTuples)
+    
+    if polygonBudgetMode == 'FACE':
+        return [polygonBudget] * len(facesTuples)
     
-        # Faces should have been returned in a descending order for the index.
-        if recursiveDepth > 0:
-            recursiveGeneration(random.randint(0, 100000), objectToModify, resultingFaceTuples, recursiveDepth - 1)
+    # Areas of the world space rectangles of the faces, the ones the planner shares an 'AREA' budget with.
+    facesAreas = []
+    for currentFaceTuple in facesTuples:
+        faceIndex = resolveFaceIndex(objectToBrowse, currentFaceTuple)
+        if faceIndex == None:
+            facesAreas.append(0.0)
+            continue
+        faceBorders = getFaceFrame(objectToBrowse, faceIndex)["borders"]
+        facesAreas.append((faceBorders[1] - faceBorders[0]) * (faceBorders[3] - faceBorders[2]))
+    
+    if polygonBudgetMode == 'AREA':
+        return [polygonBudget * currentArea for currentArea in facesAreas]
+    
+    totalArea = sum(facesAreas)
+    if totalArea <= 0:
+        return [0] * len(facesTuples)
+    return [polygonBudget * currentArea / totalArea for currentArea in facesAreas]
 
    
  
-def generateBatch(squareSize):
-
-    #datetime.now()
-    # Initialize the random seed, this is important in order to generate exactly the same content for a given seed.
-    #random.seed(1)
-    random.seed(datetime.now())
+# Generates one detailed tile of a batch.
+# Everything random about a tile derives from its own seeds, so a tile is the same whichever process or order generates it.
+def generateTile(tileSeed, rotationSeed, xCoords, yCoords):
     
-    facesCount = 0
-    for xCoords in range(0, squareSize):
-        for yCoords in range(0, squareSize):
-            
-            bpy.ops.mesh.primitive_plane_add(size=0.95, align='WORLD', enter_editmode=False, location=(xCoords, yCoords, 0))
-            
-            #bpy.ops.transform.rotate(value=1.1055, orient_axis='X', orient_type='GLOBAL', orient_matrix=((-0.527618, 0.849482, 6.25849e-07), (-0.432952, -0.268908, -0.860373), (0.730871, 0.453949, -0.509665)), orient_matrix_type='VIEW', mirror=True)
-            bpy.ops.transform.rotate(value=random.uniform(0, 4), orient_axis='Z', orient_type='VIEW', orient_matrix=((0.993576, 0.113164, 4.95464e-07), (-0.0669248, 0.587603, -0.806377), (0.0912528, -0.801197, -0.591402)), orient_matrix_type='VIEW')
-            #bpy.ops.transform.rotate(value=-1.5708, orient_axis='X', orient_type='GLOBAL', orient_matrix=((-0.527618, 0.849482, 6.25849e-07), (-0.432952, -0.268908, -0.860373), (0.730871, 0.453949, -0.509665)), orient_matrix_type='VIEW', mirror=True)
-            
-            position = (1,0,0)
-            bpy.ops.transform.translate(value=(-position[0], -position[1], -position[2]), orient_type='GLOBAL', orient_matrix=((1, 0, 0), (0, 1, 0), (0, 0, 1)), orient_matrix_type='GLOBAL')
-            
-            bpy.ops.object.transform_apply() # TODO: remove this later, only for temporary edit mode normal direction test.
-            
-        
-            # Keep track of the selected object.
-            originalySelectedObject = bpy.context.active_object
-            
-            # Find the first and only polygon in it.
-            firstPolygonTuple = buildFaceTuple(originalySelectedObject, originalySelectedObject.data.polygons[0].index)
-            firstPolygon = originalySelectedObject.data.polygons[0]
-            
-            # Recursive generation.
-            recursiveGeneration(seedOffsetForBatches + facesCount, originalySelectedObject, [firstPolygonTuple], recursiveDepth)
-            facesCount = facesCount + 1
-            
-            bpy.ops.object.mode_set(mode = 'OBJECT')
+    bpy.ops.mesh.primitive_plane_add(size=0.95, align='WORLD', enter_editmode=False, location=(xCoords, yCoords, 0))
     
-
-
-#    bpy.ops.object.mode_set(mode = 'EDIT')
+    # Keep track of the selected object.
+    originalySelectedObject = bpy.context.active_object
     
-    override, originalRegion3D = createOverrideContext()
+    # Name tiles after their coordinates, so that batches generated in several processes can be merged back identically.
+    originalySelectedObject.name = "tile_" + str(xCoords) + "_" + str(yCoords)
+    originalySelectedObject.data.name = originalySelectedObject.name
     
-    # Reset the view to it's original configuration.
-    setRegion3D(override, originalRegion3D)
+    # Randomly rotate the tile around its origin then offset it.
+    # The matrices are set directly, transform operators need a 3D view and can't run in background mode.
+    randomStream = random.Random(rotationSeed)
+    position = (1,0,0)
+    rotationMatrix = mathutils.Matrix.Rotation(randomStream.uniform(0, 4), 4, tileRotationAxis)
+    translationMatrix = mathutils.Matrix.Translation((xCoords - position[0], yCoords - position[1], -position[2]))
+    originalySelectedObject.matrix_world = translationMatrix @ rotationMatrix
     
-
-def applyToSelectedFaces():
+    bpy.ops.object.transform_apply() # TODO: remove this later, only for temporary edit mode normal direction test.
     
-    if not bpy.context.mode == 'EDIT_MESH':
-        print("applyToMesh function should be performed in edit mode.")
-        return
+    # Find the first and only polygon in it.
+    firstPolygonTuple = buildFaceTuple(originalySelectedObject, originalySelectedObject.data.polygons[0].index)
     
-    # Keep a reference to the object to modify.
-    objectToModify = bpy.context.edit_object
+    # Recursive generation.
+    if outputMode == 'INSTANCED':
+        instancedDetail_2_8.instanceFaces(originalySelectedObject, [firstPolygonTuple], [tileSeed], [(recursiveDepth, 1.0)], recursiveGeneration,
+                                          facesBudgets(originalySelectedObject, [firstPolygonTuple]))
+    elif outputMode == 'ARRAY':
+        plan, rootsTuples = planGeneration(tileSeed, originalySelectedObject, [firstPolygonTuple], recursiveDepth)
+        executePlansOnArrays(originalySelectedObject, [plan], [resolveFaceIndex(originalySelectedObject, firstPolygonTuple)])
+    else:
+        recursiveGeneration(tileSeed, originalySelectedObject, [firstPolygonTuple], recursiveDepth)
     
+    setObjectMode('OBJECT')
     
-    # Preliminary operations, before any recursion.
-    # Inset.
-    bpy.ops.mesh.inset(thickness=firstInsetThickness, depth=firstInsetDepth)
+    # The frames of the tile's faces are no longer needed.
+    clearFaceFrames(originalySelectedObject.data)
     
-    # Apply the details material to the faces inside the inset.
-    assignMaterialSlotByName("hardsurface_details_material")
+    return originalySelectedObject
+
+
+# Generates a grid of squareSize * squareSize detailed tiles.
+# When a seed is given the whole batch is reproducible, otherwise the tiles orientations are randomized with the current time.
+# tiles optionally restricts the generation to some tiles, given by their index x * squareSize + y, to share a batch between processes.
+# With a stream, a writer of streamExport_2_8, each tile is written to it and removed from the scene as soon as it is generated.
+def generateBatch(squareSize, seed=None, tiles=None, stream=None):
+
+    tilesCount = squareSize * squareSize
+    
+    # Tiles seeds derive from the batch seed and the tile index.
+    if seed == None:
+        batchSeed = deriveSeed(seedOffsetForBatches)
+        rotationSeed = deriveSeed(int(datetime.now().timestamp() * 1000000))
+    else:
+        batchSeed = deriveSeed(seedOffsetForBatches, seed)
+        rotationSeed = deriveSeed(seed, "rotation")
+    
+    if tiles == None:
+        tiles = range(0, tilesCount)
+    
+    for currentTile in sorted(tiles):
+        xCoords = currentTile // squareSize
+        yCoords = currentTile % squareSize
+        
+        createdTile = generateTile(deriveSeed(batchSeed, currentTile), deriveSeed(rotationSeed, currentTile), xCoords, yCoords)
+        createdTile["tileIndex"] = currentTile
+        
+        # Memory stays flat whatever the size of the batch.
+        if stream != None:
+            streamExport_2_8.writeObject(stream, createdTile)
+            streamExport_2_8.freeObject(createdTile)
     
-    # Populate an array of currently selected faces.
-    # First the mandatory object mode to have up to date select values for faces.
-    bpy.ops.object.mode_set(mode = 'OBJECT')
+    # Reset the view to it's original configuration, there is no view to reset in background mode.
+    if hasViewport():
+        override, originalRegion3D = createOverrideContext()
+        setRegion3D(override, originalRegion3D)
     
-    # The faces should have 4 vertices exactly.
-    # Sort the array from in descending order according to the index, to avoid index offsetting side effects when modifying a face.
-    selectedFacesIndexes = [currentFace.index for currentFace in objectToModify.data.polygons if currentFace.select and len(currentFace.vertices) == 4]
-    selectedFacesIndexes = sorted(selectedFacesIndexes, reverse = True)
+    # Keep the generated cutting shapes for the next sessions, when the library has a file.
+    cuttingShapeCache_2_8.saveShapeCache()
     
-    totalFaces = len(selectedFacesIndexes)
-    counter = 0
+    # Write the measures of the generation, when profiling.
+    profiler_2_8.exportStatistics()
     
-    for currentFaceIndex in selectedFacesIndexes:
-        # Progression.
-        counter = counter + 1
-        print(str(counter) + " of " + str(totalFaces) + " faces.")
+
+# Details the selected faces of an object.
+# Without an object, the object currently in edit mode is used.
+# With an object, for example in background mode, its faces selection is used as is.
+# Each face is seeded from seed and its index, so it gets the same details whichever other faces are selected.
+# With several workers, the faces are detailed in parallel by background Blender processes, which always use the analytic cut backend.
+# With a checkpointDirectory, the progression is saved regularly and an interrupted run resumes where it stopped.
+# With detailCameras, faces get less details the smaller they are seen, and none when they are not seen.
+# With the 'INSTANCED' outputMode, faces are replaced by instances of shared detail patches, in a single pass.
+# With the 'ARRAY' outputMode, faces are detailed in arrays and the mesh of the object is rebuilt once, in a single pass.
+def applyToSelectedFaces(objectToModify=None, seed=0, workers=1):
+    
+    # Workers detail all their faces at once, there is no progression to checkpoint.
+    if checkpointDirectory != None and workers > 1:
+        print("Parallel runs can't be checkpointed, unset checkpointDirectory or use a single worker.")
+        return
+    
+    if objectToModify == None:
+        if not bpy.context.mode == 'EDIT_MESH':
+            print("applyToMesh function should be performed in edit mode.")
+            return
+        
+        # Keep a reference to the object to modify.
+        objectToModify = bpy.context.edit_object
+    else:
+        # Operators work on the active object.
+        bpy.context.view_layer.objects.active = objectToModify
+        setObjectMode('EDIT')
+    
+    
+    # Resume the same generation from its last checkpoint, when there is one.
+    state = None
+    if checkpointDirectory != None:
+        state = checkpoint_2_8.readState(checkpointDirectory)
+        if state != None and state.get("settings") != checkpointSettings(objectToModify, seed):
+            print("Checkpoint in " + checkpointDirectory + " belongs to another generation, starting over.")
+            state = None
+    
+    if state == None:
+        # Preliminary operations, before any recursion.
+        # Inset.
+        bpy.ops.mesh.inset(thickness=firstInsetThickness, depth=firstInsetDepth)
+        
+        # Apply the details material to the faces inside the inset.
+        assignMaterialSlotByName("hardsurface_details_material")
         
-        # Build tuple.
-        firstPolygonTuple = buildFaceTuple(objectToModify, objectToModify.data.polygons[currentFaceIndex].index)
+        # Populate an array of currently selected faces.
+        # First the mandatory object mode to have up to date select values for faces.
+        setObjectMode('OBJECT')
         
-        # Recursive generation.
-        recursiveGeneration(counter, objectToModify, [firstPolygonTuple], recursiveDepth)
+        # The faces should have 4 vertices exactly.
+        # Faces are tracked by identity, so the order they are processed in doesn't matter.
+        selectedFacesTuples = harvestSelectedFaceTuples(objectToModify, verticesCount=4, newIdentities=True)
+        # Faces are seeded with their indices before any of them gets detailed.
+        selectedFacesSeeds = [deriveSeed(seed, resolveFaceIndex(objectToModify, currentFaceTuple)) for currentFaceTuple in selectedFacesTuples]
+        # Faces are detailed one by one, each with its share of the budget.
+        selectedFacesBudgets = facesBudgets(objectToModify, selectedFacesTuples)
+        # Depth and probabilities scale of each face.
+        if detailCameras == None:
+            selectedFacesDetails = [(recursiveDepth, 1.0)] * len(selectedFacesTuples)
+        else:
+            selectedFacesDetails = cameraDetail_2_8.faceDetails(objectToModify, selectedFacesTuples, detailCameras, recursiveDepth)
+            print(str(len([currentDetail for currentDetail in selectedFacesDetails if currentDetail[0] == None])) + " faces not seen by the cameras.")
+        completedFacesIds = []
+    else:
+        # The mesh of the checkpoint already has the first inset and the faces completed before it.
+        setObjectMode('OBJECT')
+        checkpoint_2_8.restoreCheckpoint(checkpointDirectory, objectToModify)
+        
+        selectedFacesTuples = [(currentFaceTuple[0], [tuple(currentVertex) for currentVertex in currentFaceTuple[1]]) for currentFaceTuple in state["faces"]]
+        selectedFacesSeeds = state["seeds"]
+        selectedFacesBudgets = state.get("budgets", [None] * len(selectedFacesTuples))
+        selectedFacesDetails = [tuple(currentDetail) for currentDetail in state.get("details", [(recursiveDepth, 1.0)] * len(selectedFacesTuples))]
+        completedFacesIds = state["completedFaceIds"]
+        print("Resuming after " + str(len(completedFacesIds)) + " faces.")
+    
+    completedFacesIdsSet = set(completedFacesIds)
+    # Faces not seen by the cameras are left as they are.
+    pendingFaces = [(currentFaceTuple, currentSeed, currentBudget, currentDetail) for currentFaceTuple, currentSeed, currentBudget, currentDetail in zip(selectedFacesTuples, selectedFacesSeeds, selectedFacesBudgets, selectedFacesDetails)
+                    if currentFaceTuple[0] not in completedFacesIdsSet and currentDetail[0] != None]
+    
+    totalFaces = len(pendingFaces) + len(completedFacesIds)
+    counter = len(completedFacesIds)
+    
+    if outputMode == 'INSTANCED':
+        instancedDetail_2_8.instanceFaces(objectToModify, [currentPendingFace[0] for currentPendingFace in pendingFaces], [currentPendingFace[1] for currentPendingFace in pendingFaces],
+                                          [currentPendingFace[3] for currentPendingFace in pendingFaces], recursiveGeneration,
+                                          [currentPendingFace[2] for currentPendingFace in pendingFaces])
+    elif outputMode == 'ARRAY':
+        # Every face is planned on the original mesh, the arrays keep the indices of its faces.
+        arrayFaceIndices = []
+        arrayPlans = []
+        for firstPolygonTuple, firstPolygonSeed, firstPolygonBudget, firstPolygonDetail in pendingFaces:
+            plan, rootsTuples = planGeneration(firstPolygonSeed, objectToModify, [firstPolygonTuple], firstPolygonDetail[0], firstPolygonBudget, 'FACE', firstPolygonDetail[1])
+            if len(rootsTuples) == 0:
+                continue
+            arrayFaceIndices.append(resolveFaceIndex(objectToModify, firstPolygonTuple))
+            arrayPlans.append(plan)
+        executePlansOnArrays(objectToModify, arrayPlans, arrayFaceIndices)
+    elif workers > 1:
+        print(str(len(pendingFaces)) + " faces shared between " + str(workers) + " workers.")
+        # Every face is planned here as in a serial run, the workers only replay the plans.
+        parallelFaceIndices = []
+        parallelPlans = []
+        for firstPolygonTuple, firstPolygonSeed, firstPolygonBudget, firstPolygonDetail in pendingFaces:
+            plan, rootsTuples = planGeneration(firstPolygonSeed, objectToModify, [firstPolygonTuple], firstPolygonDetail[0], firstPolygonBudget, 'FACE', firstPolygonDetail[1])
+            if len(rootsTuples) == 0:
+                continue
+            parallelFaceIndices.append(resolveFaceIndex(objectToModify, firstPolygonTuple))
+            parallelPlans.append(plan)
+        parallelFaces_2_8.detailFacesInParallel(objectToModify, parallelFaceIndices, parallelPlans, workers, workerSettings())
+    else:
+        for firstPolygonTuple, firstPolygonSeed, firstPolygonBudget, firstPolygonDetail in pendingFaces:
+            # Progression.
+            counter = counter + 1
+            print(str(counter) + " of " + str(totalFaces) + " faces.")
+            
+            # Recursive generation.
+            recursiveGeneration(firstPolygonSeed, objectToModify, [firstPolygonTuple], firstPolygonDetail[0], firstPolygonBudget, 'FACE', firstPolygonDetail[1])
+            completedFacesIds.append(firstPolygonTuple[0])
+            
+            # Save the progression every checkpointInterval faces.
+            if checkpointDirectory != None and checkpointInterval > 0 and len(completedFacesIds) % checkpointInterval == 0:
+                setObjectMode('OBJECT')
+                checkpoint_2_8.writeCheckpoint(checkpointDirectory, objectToModify, {
+                    "settings"          : checkpointSettings(objectToModify, seed),
+                    "faces"             : selectedFacesTuples,
+                    "seeds"             : selectedFacesSeeds,
+                    "budgets"           : selectedFacesBudgets,
+                    "details"           : selectedFacesDetails,
+                    "completedFaceIds"  : completedFacesIds})
+    
+    # The generation went through, its checkpoint is no longer needed.
+    if checkpointDirectory != None:
+        checkpoint_2_8.clearCheckpoint(checkpointDirectory)
+    
+    # The frames of the object's faces are no longer needed.
+    clearFaceFrames(objectToModify.data)
+    
+    # Keep the generated cutting shapes for the next sessions, when the library has a file.
+    cuttingShapeCache_2_8.saveShapeCache()
+    
+    # Write the measures of the generation, when profiling.
+    profiler_2_8.exportStatistics()
     
     # Go back in edit mode.
-    bpy.ops.object.mode_set(mode = 'EDIT')
+    setObjectMode('EDIT')
     
     
 # Test function
@@ -0,0 +1,12 @@
+import hashlib
+
+
+# Seeds of the generation, without Blender so that plans can be made outside of it.
+
+# Derive the seed of a node of the generation from the seed of its root and its path from it, for example the position of a face among
+# the faces resulting from its parent operation. Seeds don't depend on the order nodes are processed in, and are 64 bits long so they
+# don't collide across large batches.
+# Each node draws its random values from its own random.Random(seed) rather than from the global generator.
+def deriveSeed(rootSeed, *path):
+    hasher = hashlib.blake2b(repr((rootSeed,) + path).encode("utf-8"), digest_size=8)
+    return int.from_bytes(hasher.digest(), "little")
@@ -0,0 +1,288 @@
+import os
+import json
+import shutil
+import struct
+import tempfile
+
+import numpy as np
+
+
+# Streaming export of generated geometry, without Blender.
+# Meshes are appended to the file as soon as they are generated, in chunks, so that the scene can be freed right after,
+# see generateBatch. Meshes are given as numpy arrays: vertices (n, 3) in world space, the number of vertices of each face,
+# and the vertex indices of all the faces one after the other.
+# PLY and GLB files need counts and offsets in their header, the header is written when the file is closed.
+
+# Size of the chunks files are copied with.
+copyChunkSize = 16 * 1024 * 1024
+
+
+# Append every file of a list to an open file, in chunks.
+def appendFiles(outputFile, filePaths):
+    for currentPath in filePaths:
+        with open(currentPath, "rb") as inputFile:
+            shutil.copyfileobj(inputFile, outputFile, copyChunkSize)
+
+
+# Largest face a PLY file holds, its vertices count is written as an unsigned char.
+plyMaximumFaceCount = 255
+
+
+# Faces as a flat array of bytes: the vertices count as an unsigned char, then the vertex indices as little endian ints.
+def plyFacesBytes(faceCounts, faceIndices):
+    faceCounts = np.asarray(faceCounts, dtype=np.int64)
+    faceIndices = np.asarray(faceIndices, dtype="<i4")
+    if len(faceCounts) > 0 and faceCounts.max() > plyMaximumFaceCount:
+        raise ValueError("PLY faces have at most " + str(plyMaximumFaceCount) + " vertices, see splitLargeFaces.")
+
+    recordSizes = 1 + 4 * faceCounts
+    recordStarts = np.concatenate(([0], np.cumsum(recordSizes)[:-1]))
+    faceOffsets = np.concatenate(([0], np.cumsum(faceCounts)[:-1]))
+
+    facesBytes = np.zeros(int(recordSizes.sum()), dtype=np.uint8)
+    facesBytes[recordStarts] = faceCounts
+    indexPositions = np.repeat(recordStarts + 1, faceCounts) + 4 * (np.arange(len(faceIndices)) - np.repeat(faceOffsets, faceCounts))
+    facesBytes[indexPositions[:, np.newaxis] + np.arange(4)] = faceIndices.view(np.uint8).reshape(-1, 4)
+
+    return facesBytes
+
+
+# Fan triangulation of faces, exact for the triangles and convex faces.
+def fanTriangles(faceCounts, faceIndices):
+    faceCounts = np.asarray(faceCounts, dtype=np.int64)
+    faceIndices = np.asarray(faceIndices, dtype=np.int64)
+
+    faceOffsets = np.concatenate(([0], np.cumsum(faceCounts)[:-1]))
+    trianglesCounts = np.maximum(faceCounts - 2, 0)
+    trianglesFaces = np.repeat(np.arange(len(faceCounts)), trianglesCounts)
+    trianglesRanks = np.arange(int(trianglesCounts.sum())) - np.repeat(np.concatenate(([0], np.cumsum(trianglesCounts)[:-1])), trianglesCounts)
+
+    firstCorners = faceOffsets[trianglesFaces]
+    return np.stack((faceIndices[firstCorners], faceIndices[firstCorners + trianglesRanks + 1], faceIndices[firstCorners + trianglesRanks + 2]), axis=1)
+
+
+# Replace the faces of more than maximumCount vertices by their fan triangulation, the others are kept as they are.
+def splitLargeFaces(faceCounts, faceIndices, maximumCount):
+    faceCounts = np.asarray(faceCounts, dtype=np.int64)
+    faceIndices = np.asarray(faceIndices, dtype=np.int64)
+
+    largeFaces = faceCounts > maximumCount
+    if not largeFaces.any():
+        return faceCounts, faceIndices
+
+    smallLoops = np.repeat(~largeFaces, faceCounts)
+    largeLoops = np.repeat(largeFaces, faceCounts)
+    triangles = fanTriangles(faceCounts[largeFaces], faceIndices[largeLoops])
+
+    return np.concatenate((faceCounts[~largeFaces], np.full(len(triangles), 3, dtype=np.int64))), np.concatenate((faceIndices[smallLoops], triangles.ravel()))
+
+
+# Binary little endian PLY.
+# Faces of more than plyMaximumFaceCount vertices are triangulated.
+# Vertices are written to the file as they come, faces to a temporary file appended to it when closing.
+class PlyStreamWriter:
+    needsTriangles = False
+
+    # Counts are written on a fixed width, so that the header can be rewritten in place.
+    countWidth = 12
+
+    def __init__(self, filePath):
+        self.filePath = filePath
+        self.verticesCount = 0
+        self.facesCount = 0
+        self.outputFile = open(filePath, "wb")
+        self.outputFile.write(self.header())
+        facesFileDescriptor, self.facesPath = tempfile.mkstemp(suffix=".ply_faces")
+        self.facesFile = os.fdopen(facesFileDescriptor, "wb")
+
+    def header(self):
+        return ("ply\n"
+                "format binary_little_endian 1.0\n"
+                "element vertex " + str(self.verticesCount).rjust(self.countWidth) + "\n"
+                "property float x\n"
+                "property float y\n"
+                "property float z\n"
+                "element face " + str(self.facesCount).rjust(self.countWidth) + "\n"
+                "property list uchar int vertex_indices\n"
+                "end_header\n").encode("ascii")
+
+    def addMesh(self, name, vertices, faceCounts, faceIndices):
+        faceCounts, faceIndices = splitLargeFaces(faceCounts, faceIndices, plyMaximumFaceCount)
+        self.outputFile.write(np.asarray(vertices, dtype="<f4").tobytes())
+        self.facesFile.write(plyFacesBytes(faceCounts, np.asarray(faceIndices, dtype=np.int64) + self.verticesCount).tobytes())
+        self.verticesCount = self.verticesCount + len(vertices)
+        self.facesCount = self.facesCount + len(faceCounts)
+
+    def close(self):
+        self.facesFile.close()
+        appendFiles(self.outputFile, [self.facesPath])
+        os.remove(self.facesPath)
+
+        self.outputFile.seek(0)
+        self.outputFile.write(self.header())
+        self.outputFile.close()
+
+
+# Wavefront OBJ, every mesh as its own object.
+class ObjStreamWriter:
+    needsTriangles = False
+
+    def __init__(self, filePath):
+        self.filePath = filePath
+        self.verticesCount = 0
+        self.outputFile = open(filePath, "w")
+
+    def addMesh(self, name, vertices, faceCounts, faceIndices):
+        self.outputFile.write("o " + name + "\n")
+        np.savetxt(self.outputFile, np.asarray(vertices, dtype=np.float64), fmt="v %.6f %.6f %.6f")
+
+        # Faces of the same size are written together, OBJ indices start at 1 and are global to the file.
+        faceCounts = np.asarray(faceCounts, dtype=np.int64)
+        faceIndices = np.asarray(faceIndices, dtype=np.int64) + self.verticesCount + 1
+        faceOffsets = np.concatenate(([0], np.cumsum(faceCounts)[:-1]))
+        for currentCount in np.unique(faceCounts).tolist():
+            sizeOffsets = faceOffsets[faceCounts == currentCount]
+            sizeIndices = faceIndices[sizeOffsets[:, np.newaxis] + np.arange(currentCount)]
+            np.savetxt(self.outputFile, sizeIndices, fmt="f" + " %d" * currentCount)
+
+        self.verticesCount = self.verticesCount + len(vertices)
+
+    def close(self):
+        self.outputFile.close()
+
+
+# Binary glTF, every mesh as its own node.
+# The binary chunk is streamed to a temporary file, the JSON chunk is written in front of it when closing.
+# Positions are converted from Blender's Z up to glTF's Y up.
+class GlbStreamWriter:
+    needsTriangles = True
+
+    def __init__(self, filePath):
+        self.filePath = filePath
+        self.binaryLength = 0
+        self.document = {"asset": {"version": "2.0", "generator": "Procedural_hardsurface"},
+                         "scene": 0, "scenes": [{"nodes": []}], "nodes": [], "meshes": [], "accessors": [], "bufferViews": [], "buffers": []}
+        binaryFileDescriptor, self.binaryPath = tempfile.mkstemp(suffix=".glb_bin")
+        self.binaryFile = os.fdopen(binaryFileDescriptor, "wb")
+
+    # Write a block of the binary chunk, aligned on 4 bytes, and return its buffer view.
+    def writeBufferView(self, data, target):
+        self.binaryFile.write(data)
+        self.document["bufferViews"].append({"buffer": 0, "byteOffset": self.binaryLength, "byteLength": len(data), "target": target})
+        self.binaryLength = self.binaryLength + len(data)
+
+        padding = (4 - self.binaryLength % 4) % 4
+        self.binaryFile.write(b"\x00" * padding)
+        self.binaryLength = self.binaryLength + padding
+
+        return len(self.document["bufferViews"]) - 1
+
+    def addMesh(self, name, vertices, faceCounts, faceIndices):
+        vertices = np.asarray(vertices, dtype=np.float32)
+        triangles = fanTriangles(faceCounts, faceIndices)
+        if len(vertices) == 0 or len(triangles) == 0:
+            return
+
+        positions = np.ascontiguousarray(np.stack((vertices[:, 0], vertices[:, 2], -vertices[:, 1]), axis=1), dtype="<f4")
+
+        positionsView = self.writeBufferView(positions.tobytes(), 34962)
+        indicesView = self.writeBufferView(np.ascontiguousarray(triangles, dtype="<u4").tobytes(), 34963)
+
+        accessors = self.document["accessors"]
+        accessors.append({"bufferView": positionsView, "componentType": 5126, "count": len(positions), "type": "VEC3",
+                          "min": positions.min(axis=0).tolist(), "max": positions.max(axis=0).tolist()})
+        accessors.append({"bufferView": indicesView, "componentType": 5125, "count": int(triangles.size), "type": "SCALAR"})
+
+        self.document["meshes"].append({"name": name, "primitives": [{"attributes": {"POSITION": len(accessors) - 2}, "indices": len(accessors) - 1}]})
+        self.document["nodes"].append({"name": name, "mesh": len(self.document["meshes"]) - 1})
+        self.document["scenes"][0]["nodes"].append(len(self.document["nodes"]) - 1)
+
+    def close(self):
+        self.binaryFile.close()
+        if self.binaryLength > 0:
+            self.document["buffers"].append({"byteLength": self.binaryLength})
+
+        # glTF doesn't allow empty arrays, a file without mesh has an empty scene, no buffer and no binary chunk.
+        for currentKey in [currentKey for currentKey, currentValue in self.document.items() if currentValue == []]:
+            del self.document[currentKey]
+        if len(self.document["scenes"][0]["nodes"]) == 0:
+            del self.document["scenes"][0]["nodes"]
+
+        jsonBytes = json.dumps(self.document, separators=(",", ":")).encode("utf-8")
+        jsonBytes = jsonBytes + b" " * ((4 - len(jsonBytes) % 4) % 4)
+
+        binaryChunkLength = 8 + self.binaryLength if self.binaryLength > 0 else 0
+        with open(self.filePath, "wb") as outputFile:
+            outputFile.write(struct.pack("<III", 0x46546C67, 2, 12 + 8 + len(jsonBytes) + binaryChunkLength))
+            outputFile.write(struct.pack("<II", len(jsonBytes), 0x4E4F534A))
+            outputFile.write(jsonBytes)
+            if self.binaryLength > 0:
+                outputFile.write(struct.pack("<II", self.binaryLength, 0x004E4942))
+                appendFiles(outputFile, [self.binaryPath])
+        os.remove(self.binaryPath)
+
+
+streamFormats = {"ply": PlyStreamWriter, "obj": ObjStreamWriter, "glb": GlbStreamWriter}
+
+
+# Open a writer for a file, its format given by its extension.
+def openStream(filePath):
+    extension = os.path.splitext(filePath)[1].lower().lstrip(".")
+    writerClass = streamFormats.get(extension)
+    if writerClass == None:
+        print("Unknown stream format: " + extension)
+        return None
+    return writerClass(filePath)
+
+
+# Geometry of an object in world space, as the arrays the writers take, read in bulk with foreach_get.
+# Faces are triangulated for the writers that need triangles.
+def meshArrays(objectToExport, triangulate=False):
+    mesh = objectToExport.data
+
+    vertices = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", vertices)
+    matrixWorld = np.array(objectToExport.matrix_world, dtype=np.float64)
+    vertices = (vertices.reshape(-1, 3) @ matrixWorld[:3, :3].T + matrixWorld[:3, 3]).astype(np.float32)
+
+    if triangulate:
+        mesh.calc_loop_triangles()
+        faceIndices = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("vertices", faceIndices)
+        return vertices, np.full(len(mesh.loop_triangles), 3, dtype=np.int64), faceIndices.astype(np.int64)
+
+    loopStarts = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_start", loopStarts)
+    faceCounts = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", faceCounts)
+    loopVertices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loopVertices)
+
+    faceCounts = faceCounts.astype(np.int64)
+    faceOffsets = np.concatenate(([0], np.cumsum(faceCounts)[:-1]))
+    loopIndices = np.repeat(loopStarts.astype(np.int64), faceCounts) + np.arange(int(faceCounts.sum())) - np.repeat(faceOffsets, faceCounts)
+
+    return vertices, faceCounts, loopVertices[loopIndices].astype(np.int64)
+
+
+# Append an object and its children, like the instanced patches of a tile, to a writer.
+def writeObject(writer, objectToExport):
+    if objectToExport.type == 'MESH':
+        vertices, faceCounts, faceIndices = meshArrays(objectToExport, writer.needsTriangles)
+        writer.addMesh(objectToExport.name, vertices, faceCounts, faceIndices)
+
+    for currentChild in objectToExport.children:
+        writeObject(writer, currentChild)
+
+
+# Remove an object and its children from the file, along with the meshes no other object uses.
+def freeObject(objectToFree):
+    import bpy
+
+    for currentChild in list(objectToFree.children):
+        freeObject(currentChild)
+
+    meshToFree = objectToFree.data if objectToFree.type == 'MESH' else None
+    bpy.data.objects.remove(objectToFree)
+    if meshToFree != None and meshToFree.users == 0:
+        bpy.data.meshes.remove(meshToFree)
@@ -10,14 +10,21 @@ from mathutils import Euler
 # Import submodules.
 import sys
 import os
-import importlib
 import copy
 
+import hardsurface_2_8
+if __name__ == "__main__":
+    hardsurface_2_8.startReloadPass()
+
 # Utils.
 import utils_2_8
-importlib.reload(utils_2_8)
+hardsurface_2_8.reloadModule(utils_2_8)
 from utils_2_8 import *
 
+# Instrumentation.
+import profiler_2_8
+hardsurface_2_8.reloadModule(profiler_2_8)
+
 
 # Global parameters.
 minCuts = 1 # Minimum number of cuts per subdivision.
@@ -26,6 +33,8 @@ verticalProbability = 0.5 # Probability of doing a vertical subdivision.
 
 # Conditions
 minimumLength = 0.2
+# Distance under which a vertex a neighbour inserted on a side is reused rather than splitting the side next to it.
+splitTolerance = 0.00001
 
 
 # Should be in object mode when calling this function.
@@ -35,104 +44,167 @@ def findFirstSelectedPolygon(objectToSubdivide):
             return currentPolygon
 
 
-def subdivideGeneric(seed, objectToSubdivide, faceTuple):
+# Decide how a face is to be subdivided.
+# Returns a (faceIndex, verticalSubdivision, numberOfCuts) tuple, or None when the face can't or shouldn't be subdivided.
+def planSubdivision(seed, objectToSubdivide, faceTuple):
     
-    # Initialize the random seed, this is important in order to generate exactly the same content for a given seed.
-    random.seed(seed)
+    # Random stream of this subdivision, this is important in order to generate exactly the same content for a given seed.
+    randomStream = random.Random(seed)
     
     # Find the right face despit faces that have been reindexed.
-    #if checkIsSameFace(objectToSubdivide, faceTuple):
-        #faceToSubdivideIndex = faceTuple[0]
-    #else:
-        #faceToSubdivideIndex = findFaceByVertices(objectToSubdivide, faceTuple[1])
-
-    faceToSubdivideIndex = faceTuple[0]
+    faceToSubdivideIndex = resolveFaceIndex(objectToSubdivide, faceTuple)
+    if faceToSubdivideIndex == None:
+        print("Face to subdivide not found.")
+        return
+    
     faceToSubdivide = objectToSubdivide.data.polygons[faceToSubdivideIndex]
+    faceCoordinates = [objectToSubdivide.data.vertices[currentVertexIndex].co.copy() for currentVertexIndex in faceToSubdivide.vertices]
+    cornerPositions = faceCornerPositions(faceCoordinates)
     
-    # Sanity check.
-    if len(faceToSubdivide.edge_keys) != 4:
-        print("Face does not have 4 edges.")
+    # Sanity check, the neighbours may have inserted vertices on the sides.
+    if len(cornerPositions) != 4:
+        print("Face does not have 4 corners.")
         return
     
     # Decide whether the subidivision is to happen vertically of horizontally.
-    if random.uniform(0, 1) < verticalProbability:
+    if randomStream.uniform(0, 1) < verticalProbability:
         verticalSubdivision = True
     else:
         verticalSubdivision = False
     
+    # Minimum length test, on the first side for vertical subdivisions and the second one otherwise.
     if verticalSubdivision:
-        aEdgeKey = faceToSubdivide.edge_keys[0]
+        edgeLength = (faceCoordinates[cornerPositions[1]] - faceCoordinates[cornerPositions[0]]).length
     else:
-        aEdgeKey = faceToSubdivide.edge_keys[1]
+        edgeLength = (faceCoordinates[cornerPositions[2]] - faceCoordinates[cornerPositions[1]]).length
     
-    # Minimum length test.
-    point0Coordinates = objectToSubdivide.data.vertices[aEdgeKey[0]].co
-    point1Coordinates = objectToSubdivide.data.vertices[aEdgeKey[1]].co
-    edgeLength = distance(point0Coordinates, point1Coordinates)
     if edgeLength < minimumLength:
         return None
     
-    bpy.ops.object.mode_set(mode = 'EDIT')
-    # Deselect everything.
-    bpy.ops.mesh.select_all(action='DESELECT')
-    
-    # Selecting faces only works when not in edit mode, for some reason.
-    bpy.ops.object.mode_set(mode = 'OBJECT')
-    # Select only the face to inset.
-    objectToSubdivide.data.polygons[faceToSubdivideIndex].select = True
-    
-    # Enter edit mode for the object in argument.
-    bpy.context.view_layer.objects.active = objectToSubdivide
-    bpy.ops.object.mode_set(mode = 'EDIT')
-    
-    bpy.ops.mesh.inset(thickness=0.0001)
-    
-    bpy.ops.object.mode_set(mode = 'OBJECT')
-    faceToSubdivide_inset = findFirstSelectedPolygon(objectToSubdivide)
-    
-    if verticalSubdivision:
-        aEdgeKey_inset = faceToSubdivide_inset.edge_keys[0]
-        bEdgeKey_inset = faceToSubdivide_inset.edge_keys[2]
-    else:
-        aEdgeKey_inset = faceToSubdivide_inset.edge_keys[1]
-        bEdgeKey_inset = faceToSubdivide_inset.edge_keys[3]
-    
-    # Find the chosen edges in the object's data.
-    aEdge_inset = findEdge(objectToSubdivide.data, aEdgeKey_inset)
-    bEdge_inset = findEdge(objectToSubdivide.data, bEdgeKey_inset)
-    
-    # Deselect all the faces.
-    bpy.ops.object.mode_set(mode = 'EDIT')
-    bpy.ops.mesh.select_all(action='DESELECT')
-    
-    # Find the index of the edges to select.
-    # We get the index rather than the edge itself because of references issues.
-    aEdgeIndex_inset = findEdgeIndex(objectToSubdivide.data, aEdgeKey_inset)
-    bEdgeIndex_inset = findEdgeIndex(objectToSubdivide.data, bEdgeKey_inset)
-    
-    # Select the chosen edges. Be careful, edges can only be selected properly when in object mode.
-    bpy.ops.object.mode_set(mode = 'OBJECT')
-    objectToSubdivide.data.edges[aEdgeIndex_inset].select = True
-    objectToSubdivide.data.edges[bEdgeIndex_inset].select = True
-
-    bpy.ops.object.mode_set(mode = 'EDIT')
     # Randomly choose how many cuts are going to be applied.
-    numberOfCuts = random.randint(minCuts, maxCuts)
-    # Apply the subdivision.
-    subdivisionResult = bpy.ops.mesh.subdivide(number_cuts=numberOfCuts, quadcorner='INNERVERT')
+    numberOfCuts = randomStream.randint(minCuts, maxCuts)
     
-    # Refresh data.
-    objectToSubdivide.data.validate(verbose=True)
-    objectToSubdivide.update_from_editmode()
+    return (faceToSubdivideIndex, verticalSubdivision, numberOfCuts)
+
+
+# Return the vertex at ratio along a chain of vertices, the side of a face, splitting the edge it falls on if there is no vertex there yet.
+# The new vertex is inserted in the chain, and in every face using the edge.
+def splitChainAt(chain, ratio):
+    start = chain[0].co.copy()
+    direction = chain[-1].co - start
+    sideLength = direction.length
+    direction.normalize()
+    targetDistance = ratio * sideLength
+    
+    for currentPosition in range(0, len(chain) - 1):
+        aVertex = chain[currentPosition]
+        bVertex = chain[currentPosition + 1]
+        aDistance = (aVertex.co - start).dot(direction)
+        bDistance = (bVertex.co - start).dot(direction)
+        
+        # A neighbour already inserted a vertex there.
+        if abs(bDistance - targetDistance) <= splitTolerance:
+            return bVertex
+        
+        if aDistance < targetDistance < bDistance:
+            edgeToSplit = [currentEdge for currentEdge in aVertex.link_edges if currentEdge.other_vert(aVertex) == bVertex][0]
+            newEdge, newVertex = bmesh.utils.edge_split(edgeToSplit, aVertex, (targetDistance - aDistance) / (bDistance - aDistance))
+            chain.insert(currentPosition + 1, newVertex)
+            return newVertex
+
+
+# Split quads directly in a bmesh, all the given subdivisions in a single pass.
+# Vertices are inserted on 2 opposite sides of each face, then linked across the face only: the face stays connected to its
+# neighbours, which get the inserted vertices in their own outline.
+# Faces are quads by their corners, their sides may hold vertices inserted by their neighbours.
+# subdivisions is a list of tuples returned by planSubdivision.
+# Returns, for every subdivision, the face tuples of the resulting faces, which are left selected.
+@profiler_2_8.profiled("subdivideBatch", 0)
+def subdivideBatch(objectToSubdivide, subdivisions):
+    
+    if len(subdivisions) == 0:
+        return []
+    
+    # We always want to work on up to date object data.
+    setObjectMode('OBJECT')
+    
+    meshToSubdivide = objectToSubdivide.data
+    bm = bmesh.new()
+    bm.from_mesh(meshToSubdivide)
+    bm.faces.ensure_lookup_table()
+    
+    # Gather the faces before any modification, the indices are only valid on the original mesh.
+    facesToSubdivide = [bm.faces[currentSubdivision[0]] for currentSubdivision in subdivisions]
+    
+    # Deselect everything, only the resulting faces end up selected.
+    for currentElements in (bm.verts, bm.edges, bm.faces):
+        for currentElement in currentElements:
+            currentElement.select = False
+    
+    resultingFacesLists = []
+    for currentFace, currentSubdivision in zip(facesToSubdivide, subdivisions):
+        verticalSubdivision = currentSubdivision[1]
+        numberOfCuts = currentSubdivision[2]
+        
+        faceVertices = [currentLoop.vert for currentLoop in currentFace.loops]
+        cornerPositions = faceCornerPositions([currentVertex.co for currentVertex in faceVertices])
+        if len(cornerPositions) != 4:
+            print("Face does not have 4 corners.")
+            resultingFacesLists.append([])
+            continue
+        
+        # Sides as chains of vertices, vertical subdivisions cut the first and third sides, the others the second and fourth ones.
+        # The opposite side is reversed, so that both run the same way.
+        firstSide = 0 if verticalSubdivision else 1
+        sides = []
+        for currentSide in (firstSide, firstSide + 2):
+            startPosition = cornerPositions[currentSide]
+            endPosition = cornerPositions[(currentSide + 1) % 4]
+            sideLength = (endPosition - startPosition) % len(faceVertices)
+            sides.append([faceVertices[(startPosition + currentStep) % len(faceVertices)] for currentStep in range(0, sideLength + 1)])
+        sides[1].reverse()
+        
+        # Link the vertices at the same ratio on both sides, each link splits the face once more.
+        linkingEdges = []
+        for currentCut in range(1, numberOfCuts + 1):
+            ratio = currentCut / (numberOfCuts + 1)
+            aVertex = splitChainAt(sides[0], ratio)
+            bVertex = splitChainAt(sides[1], ratio)
+            linkingEdges.extend(bmesh.ops.connect_verts(bm, verts=[aVertex, bVertex])["edges"])
+        
+        # Every resulting face is on one of the linking edges.
+        resultingFaces = []
+        for currentEdge in linkingEdges:
+            for currentLinkedFace in currentEdge.link_faces:
+                if currentLinkedFace not in resultingFaces:
+                    resultingFaces.append(currentLinkedFace)
+        
+        for currentResultingFace in resultingFaces:
+            currentResultingFace.select_set(True)
+        
+        resultingFacesLists.append(resultingFaces)
+    
+    # Indices of the bmesh faces are the ones of the mesh polygons once written.
+    bm.faces.index_update()
+    resultingIndicesLists = [sorted([currentFace.index for currentFace in currentFaces]) for currentFaces in resultingFacesLists]
+    
+    bm.to_mesh(meshToSubdivide)
+    bm.free()
+    meshToSubdivide.update()
+    
+    # The resulting faces get new identities.
+    return [buildNewFaceTuples(objectToSubdivide, currentIndices) for currentIndices in resultingIndicesLists]
+
+
+@profiler_2_8.profiled("subdivideGeneric", 1)
+def subdivideGeneric(seed, objectToSubdivide, faceTuple):
     
-    # We always want to exit functions in object mode.
-    bpy.ops.object.mode_set(mode = 'OBJECT')
+    subdivision = planSubdivision(seed, objectToSubdivide, faceTuple)
+    if subdivision == None:
+        return None
     
-    # Return an array of face tuples for the selected faces.
-    # The selected faces are the ones resulting of the subdivision.
-    faceTuplesResult = [buildFaceTuple(objectToSubdivide, currentPolygon.index) for currentPolygon in objectToSubdivide.data.polygons if currentPolygon.select]
-
-    return faceTuplesResult
+    # Return an array of face tuples for the faces resulting of the subdivision.
+    return subdivideBatch(objectToSubdivide, [subdivision])[0]
 
 
 # Test function
@@ -140,9 +212,9 @@ if __name__ == "__main__":
     # Keep track of the selected object.
     originalySelectedObject = bpy.context.active_object
     
-    originalySelectedObject.data.validate(verbose=True)
+    validateMesh(originalySelectedObject.data)
     originalySelectedObject.update_from_editmode()
     
     for currentPolygon in originalySelectedObject.data.polygons:
         if currentPolygon.select:
-            subdivideGeneric(datetime.now(), originalySelectedObject, buildFaceTuple(originalySelectedObject, currentPolygon.index))
\ No newline at end of file
+            subdivideGeneric(int(datetime.now().timestamp()), originalySelectedObject, buildFaceTuple(originalySelectedObject, currentPolygon.index))
\ No newline at end of file
@@ -0,0 +1,80 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+import arrayMesh_2_8
+import cutGeometry_2_8
+
+# Tests of the array meshes, which run without Blender.
+
+
+# Edges of the faces of the arrays of an array mesh, by sorted pair of vertex indices, with the number of faces using them.
+def edgesUse(faceSizes, faceIndices):
+    edges = Counter()
+    faceOffset = 0
+    for currentSize in faceSizes.tolist():
+        faceVertices = faceIndices[faceOffset:faceOffset + currentSize].tolist()
+        faceOffset = faceOffset + currentSize
+        for currentIndex, nextIndex in zip(faceVertices, faceVertices[1:] + faceVertices[:1]):
+            edges[(min(currentIndex, nextIndex), max(currentIndex, nextIndex))] += 1
+    return edges
+
+
+def test_quadSplitSplitsNeighbours():
+    arrayMesh = arrayMesh_2_8.ArrayMesh()
+    vertices = arrayMesh.addVertices([(0, 0, 0), (1, 0, 0), (2, 0, 0), (2, 1, 0), (1, 1, 0), (0, 1, 0)]).tolist()
+    leftFace = arrayMesh.addFace([vertices[0], vertices[1], vertices[4], vertices[5]])
+    rightFace = arrayMesh.addFace([vertices[1], vertices[2], vertices[3], vertices[4]])
+
+    # Cut the shared side in 2.
+    pieces = arrayMesh_2_8.quadSplit(arrayMesh, leftFace, False, 1)
+    assert len(pieces) == 2
+    assert arrayMesh.faceSizes.data[rightFace] == 5
+
+    # The neighbour is still a quad by its corners, and can be split in turn.
+    assert len(arrayMesh_2_8.quadSplit(arrayMesh, rightFace, False, 3)) == 4
+
+    # The middle of the shared side is split once, by the left face, and reused by the right one.
+    vertices, faceSizes, faceIndices = arrayMesh.arrays()[:3]
+    assert len(vertices) == 6 + 2 + 5
+
+    # Inner edges: the cut of the left face, the 4 pieces of the shared side and the 3 cuts of the right face.
+    edges = edgesUse(faceSizes, faceIndices)
+    assert max(edges.values()) <= 2
+    assert len([currentEdge for currentEdge, currentUse in edges.items() if currentUse == 2]) == 1 + 4 + 3
+
+
+@pytest.mark.parametrize("seed", range(0, 6))
+def test_generateArrayMesh(seed):
+    arrayMesh = arrayMesh_2_8.generateArrayMesh(seed, (2.0, 1.0), 4)
+    vertices, faceSizes, faceIndices, sharpEdges, faceMaterials = arrayMesh.arrays()
+
+    assert faceSizes.sum() == len(faceIndices)
+    assert faceIndices.min() >= 0 and faceIndices.max() < len(vertices)
+    assert len(faceMaterials) == len(faceSizes)
+    assert sharpEdges.shape[1] == 2 and (len(sharpEdges) == 0 or sharpEdges.max() < len(vertices))
+
+    # No T-junction: every edge inside the rectangle is shared by 2 faces, the open edges are on its border.
+    edges = edgesUse(faceSizes, faceIndices)
+    assert max(edges.values()) <= 2
+    for currentEdge, currentUse in edges.items():
+        if currentUse == 1:
+            edgePositions = vertices[list(currentEdge)]
+            onVerticalBorder = np.allclose(np.abs(edgePositions[:, 0]), 1.0)
+            onHorizontalBorder = np.allclose(np.abs(edgePositions[:, 1]), 0.5)
+            assert onVerticalBorder or onHorizontalBorder
+
+    # No face crosses itself, seen in its own plane.
+    faceOffset = 0
+    for currentSize in faceSizes.tolist():
+        facePositions = vertices[faceIndices[faceOffset:faceOffset + currentSize]]
+        faceOffset = faceOffset + currentSize
+        normal = arrayMesh_2_8.faceNormal(facePositions)
+        tangent = arrayMesh_2_8.normalized(np.cross(normal, (1.0, 0.0, 0.0) if abs(normal[0]) < 0.9 else (0.0, 1.0, 0.0)))
+        bitangent = np.cross(normal, tangent)
+        assert not cutGeometry_2_8.selfIntersects([(float(np.dot(currentPosition, tangent)), float(np.dot(currentPosition, bitangent))) for currentPosition in facePositions])
+
+    # The same seed details the same.
+    sameVertices, sameFaceSizes, sameFaceIndices = arrayMesh_2_8.generateArrayMesh(seed, (2.0, 1.0), 4).arrays()[:3]
+    assert np.array_equal(vertices, sameVertices) and np.array_equal(faceSizes, sameFaceSizes) and np.array_equal(faceIndices, sameFaceIndices)
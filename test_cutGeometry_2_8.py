@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+import cutGeometry_2_8
+import recursionPlan_2_8
+
+# Tests of the geometry of the cuts, which runs without Blender.
+
+
+# Shapes as planCut asks for them, half the size of the face and without recursion.
+@pytest.mark.parametrize("shapeSeed", range(0, 6))
+def test_plateLayoutFitsInTheFace(shapeSeed):
+    outline, edgesDepth = recursionPlan_2_8.polylineShapeProvider(shapeSeed, (1.0, 0.5), 0)
+    placedOutline, cleanFaceOutline = cutGeometry_2_8.plateLayout(2.0, 1.0, outline, edgesDepth, 0.9, 0.8)
+
+    placedPoints = np.array(placedOutline)
+    assert np.all(np.abs(placedPoints[:, 0]) <= 1.0)
+    assert np.all(np.abs(placedPoints[:, 1]) <= 0.5)
+
+    # The clean face is a rectangle inside the plate.
+    assert len(cleanFaceOutline) == 4
+    for currentPoint in cleanFaceOutline:
+        assert cutGeometry_2_8.pointInPolygon(currentPoint, placedOutline)
+
+
+# The clean face is cut, as genericCutPlate does, in the inner face of the plate, which is concave where the shape has notches.
+@pytest.mark.parametrize("shapeSeed", range(0, 12))
+def test_cleanFaceIsCutWhole(shapeSeed):
+    facePoints = [(-1.0, -0.5), (1.0, -0.5), (1.0, 0.5), (-1.0, 0.5)]
+    outline, edgesDepth = recursionPlan_2_8.polylineShapeProvider(shapeSeed, (1.0, 0.5), 0)
+    placedOutline, cleanFaceOutline = cutGeometry_2_8.plateLayout(2.0, 1.0, outline, edgesDepth, 0.9, 0.7)
+
+    plateInnerPoints = cutGeometry_2_8.cutFace(facePoints, placedOutline)[0]
+    cleanFacePoints, plateLoops, innerLoop = cutGeometry_2_8.cutFace(plateInnerPoints, cleanFaceOutline, False)
+
+    assert sorted(cleanFacePoints) == sorted(cleanFaceOutline)
+    assert [len(plateInnerPoints) + currentIndex for currentIndex in range(0, 4)] == innerLoop
+
+    # An outline crossing the face is not cut without clipping.
+    assert cutGeometry_2_8.cutFace(plateInnerPoints, [(-2.0, -0.1), (2.0, -0.1), (2.0, 0.1), (-2.0, 0.1)], False) == None
+
+
+@pytest.mark.parametrize("shapeSeed", range(0, 40))
+def test_cutFacesDontCrossThemselves(shapeSeed):
+    facePoints = [(-1.0, -0.5), (1.0, -0.5), (1.0, 0.5), (-1.0, 0.5)]
+    outline, edgesDepth = recursionPlan_2_8.polylineShapeProvider(shapeSeed, (1.0, 0.5), 0)
+    placedOutline, cleanFaceOutline = cutGeometry_2_8.plateLayout(2.0, 1.0, outline, edgesDepth, 0.9, 0.7)
+
+    plateInnerPoints, plateLoops, innerLoop = cutGeometry_2_8.cutFace(facePoints, placedOutline)
+    allPoints = facePoints + plateInnerPoints
+    for currentLoop in plateLoops + [innerLoop]:
+        assert not cutGeometry_2_8.selfIntersects([allPoints[currentIndex] for currentIndex in currentLoop])
+
+    # The inner face of the plate is concave where the shape has notches, the bridges to the clean face must not cross them.
+    cleanFacePoints, plateLoops, innerLoop = cutGeometry_2_8.cutFace(plateInnerPoints, cleanFaceOutline, False)
+    allPoints = plateInnerPoints + cleanFacePoints
+    for currentLoop in plateLoops + [innerLoop]:
+        assert not cutGeometry_2_8.selfIntersects([allPoints[currentIndex] for currentIndex in currentLoop])
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+import recursionPlan_2_8
+
+# Tests of the planning of the recursion, which runs without Blender.
+
+
+def rectangleRoots(seed, count=1):
+    return [{"seed": seed + currentPosition, "rect": [-1.0, 1.0, -0.5, 0.5], "tangent": [1.0, 0.0, 0.0]} for currentPosition in range(0, count)]
+
+
+def test_planRecursionIsDeterministic():
+    firstPlan = recursionPlan_2_8.planRecursion(rectangleRoots(7, 3), 4)
+    secondPlan = recursionPlan_2_8.planRecursion(rectangleRoots(7, 3), 4)
+    assert json.dumps(firstPlan, sort_keys=True) == json.dumps(secondPlan, sort_keys=True)
+
+    otherPlans = [recursionPlan_2_8.planRecursion(rectangleRoots(currentSeed, 3), 4) for currentSeed in range(8, 12)]
+    assert any([json.dumps(currentPlan, sort_keys=True) != json.dumps(firstPlan, sort_keys=True) for currentPlan in otherPlans])
+
+
+@pytest.mark.parametrize("budgetMode", ['OBJECT', 'FACE', 'AREA'])
+def test_planWithinBudgetKeepsUnderBudget(budgetMode):
+    roots = rectangleRoots(11, 2)
+    budget = 60
+    plan = recursionPlan_2_8.planRecursion(roots, 6, budget=budget, budgetMode=budgetMode)
+
+    if budgetMode == 'OBJECT':
+        assert recursionPlan_2_8.estimatedPolygons(plan) <= budget
+    else:
+        rootsBudget = budget if budgetMode == 'FACE' else budget * recursionPlan_2_8.rectArea(roots[0]["rect"])
+        for currentRoot in plan["roots"]:
+            assert recursionPlan_2_8.estimatedPolygons({"settings": plan["settings"], "roots": [currentRoot]}) <= rootsBudget
+
+    # A budget only stops the refinement, it never adds polygons.
+    assert recursionPlan_2_8.estimatedPolygons(plan) <= recursionPlan_2_8.estimatedPolygons(recursionPlan_2_8.planRecursion(roots, 6))
+
+
+def test_planWithinBudgetRejectsUnknownModes():
+    with pytest.raises(ValueError):
+        recursionPlan_2_8.planRecursion(rectangleRoots(0), 3, budget=10, budgetMode='VOLUME')
+
+
+def test_planJsonRoundTrip(tmp_path):
+    plan = recursionPlan_2_8.planRecursion(rectangleRoots(5, 2), 4)
+    planPath = str(tmp_path / "plan.json")
+    recursionPlan_2_8.savePlan(plan, planPath)
+
+    loadedPlan = recursionPlan_2_8.loadPlan(planPath)
+    assert loadedPlan == json.loads(json.dumps(plan))
+    assert recursionPlan_2_8.estimatedPolygons(loadedPlan) == recursionPlan_2_8.estimatedPolygons(plan)
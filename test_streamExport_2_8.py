@@ -0,0 +1,99 @@
+import json
+import struct
+
+import numpy as np
+import pytest
+
+import streamExport_2_8
+
+# Tests of the streaming export, which runs without Blender.
+
+
+def test_plyFacesBytes():
+    facesBytes = streamExport_2_8.plyFacesBytes([3, 4], [0, 1, 2, 2, 3, 4, 5])
+    assert facesBytes.tobytes() == bytes([3]) + np.array([0, 1, 2], dtype="<i4").tobytes() + bytes([4]) + np.array([2, 3, 4, 5], dtype="<i4").tobytes()
+
+    with pytest.raises(ValueError):
+        streamExport_2_8.plyFacesBytes([256], list(range(0, 256)))
+
+
+def test_splitLargeFaces():
+    faceCounts, faceIndices = streamExport_2_8.splitLargeFaces([4, 300], list(range(0, 304)), streamExport_2_8.plyMaximumFaceCount)
+    assert faceCounts.tolist() == [4] + [3] * 298
+    assert faceIndices[:4].tolist() == [0, 1, 2, 3]
+    assert len(faceIndices) == 4 + 3 * 298
+
+
+def test_plyStream(tmp_path):
+    filePath = str(tmp_path / "tiles.ply")
+    writer = streamExport_2_8.openStream(filePath)
+    vertices = np.array([(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)], dtype=np.float64)
+    writer.addMesh("first", vertices, [4], [0, 1, 2, 3])
+    writer.addMesh("second", vertices, [3, 3], [0, 1, 2, 0, 2, 3])
+    writer.close()
+
+    with open(filePath, "rb") as plyFile:
+        content = plyFile.read()
+    header, body = content.split(b"end_header\n")
+    headerWords = header.decode("ascii").split()
+    assert headerWords[headerWords.index("vertex") + 1] == "8"
+    assert headerWords[headerWords.index("face") + 1] == "3"
+
+    assert np.array_equal(np.frombuffer(body[:8 * 12], dtype="<f4").reshape(-1, 3), np.concatenate((vertices, vertices)))
+    # The faces of the second mesh index its own vertices.
+    assert body[8 * 12:] == streamExport_2_8.plyFacesBytes([4, 3, 3], [0, 1, 2, 3, 4, 5, 6, 4, 6, 7]).tobytes()
+
+
+def test_objStream(tmp_path):
+    filePath = str(tmp_path / "tiles.obj")
+    writer = streamExport_2_8.openStream(filePath)
+    vertices = np.array([(0, 0, 0), (1, 0, 0), (1, 1, 0)], dtype=np.float64)
+    writer.addMesh("first", vertices, [3], [0, 1, 2])
+    writer.addMesh("second", vertices, [3], [0, 1, 2])
+    writer.close()
+
+    with open(filePath, "r") as objFile:
+        lines = objFile.read().splitlines()
+    assert lines.count("o first") == 1 and lines.count("o second") == 1
+    assert [currentLine for currentLine in lines if currentLine.startswith("f ")] == ["f 1 2 3", "f 4 5 6"]
+
+
+def readGlb(filePath):
+    with open(filePath, "rb") as glbFile:
+        content = glbFile.read()
+    magic, version, length = struct.unpack("<III", content[:12])
+    assert magic == 0x46546C67 and version == 2 and length == len(content)
+
+    chunks = []
+    offset = 12
+    while offset < len(content):
+        chunkLength, chunkType = struct.unpack("<II", content[offset:offset + 8])
+        chunks.append((chunkType, content[offset + 8:offset + 8 + chunkLength]))
+        offset = offset + 8 + chunkLength
+    return chunks
+
+
+def test_glbStream(tmp_path):
+    filePath = str(tmp_path / "tiles.glb")
+    writer = streamExport_2_8.openStream(filePath)
+    writer.addMesh("quad", np.array([(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)], dtype=np.float64), [4], [0, 1, 2, 3])
+    writer.close()
+
+    (jsonType, jsonBytes), (binaryType, binaryBytes) = readGlb(filePath)
+    document = json.loads(jsonBytes)
+    assert jsonType == 0x4E4F534A and binaryType == 0x004E4942
+    assert document["buffers"] == [{"byteLength": len(binaryBytes)}]
+    assert [currentAccessor["count"] for currentAccessor in document["accessors"]] == [4, 6]
+
+
+def test_emptyGlbStream(tmp_path):
+    filePath = str(tmp_path / "empty.glb")
+    writer = streamExport_2_8.openStream(filePath)
+    writer.close()
+
+    # No buffer, no binary chunk and no empty array.
+    chunks = readGlb(filePath)
+    assert len(chunks) == 1 and chunks[0][0] == 0x4E4F534A
+    document = json.loads(chunks[0][1])
+    assert "buffers" not in document
+    assert all([currentValue != [] for currentValue in document.values()])
@@ -7,15 +7,36 @@ import random
 import time
 from datetime import datetime
 from mathutils import Euler
+import math
 from math import sqrt
+import numpy as np
+
+import hardsurface_2_8
+
+# Seeds derivation.
+import seeds_2_8
+hardsurface_2_8.reloadModule(seeds_2_8)
+from seeds_2_8 import *
+
+# Instrumentation.
+import profiler_2_8
+hardsurface_2_8.reloadModule(profiler_2_8)
 
 
 
 
 ### 3D Context creation. ###
 
+# Returns True when a 3D view is available, which is never the case when Blender runs in background mode.
+def hasViewport():
+    if bpy.app.background or bpy.context.window == None:
+        return False
+    return view3d_find()[0] != None
+
 def view3d_find( return_area = False ):
     # returns first 3d view, normally we get from context
+    if bpy.context.window == None:
+        return None, None
     for area in bpy.context.window.screen.areas:
         if area.type == 'VIEW_3D':
             v3d = area.spaces[0]
@@ -124,6 +145,16 @@ def setRegion3D(override, originalConfiguration):
 
 ### Quick math. ###
 
+# Switch the mode of the active object, measured by the profiler.
+@profiler_2_8.profiled("mode_set")
+def setObjectMode(mode):
+    bpy.ops.object.mode_set(mode = mode)
+
+# Check and fix a mesh, measured by the profiler.
+@profiler_2_8.profiled("validate", 0)
+def validateMesh(mesh, verbose=True):
+    return mesh.validate(verbose=verbose)
+
 def distance(aVert, bVert):
     return sqrt((aVert.x - bVert.x)**2 + (aVert.y - bVert.y)**2 + (aVert.z - bVert.z)**2)
 
@@ -135,33 +166,121 @@ def edgeLength(bmeshEdge):
 
 ### Handling meshes. ###
 
-def findEdge(mesh, edgeKey):
-    for currentEdge in mesh.edges:
-        currentEdgeKey = currentEdge.key
-        if (currentEdgeKey[0] == edgeKey[0] and currentEdgeKey[1] == edgeKey[1]):
-            return currentEdge
-        
-def findEdgeIndex(mesh, edgeKey):
-    foundEdge = findEdge(mesh, edgeKey)
-    if not foundEdge==None:
-        return foundEdge.index
-    
 # Return the tangent of a face.
 # The face has to be a flat quad.
 def faceTangent(object, faceIndex):
-    face = object.data.polygons[faceIndex]
+    mesh = object.data
+    face = mesh.polygons[faceIndex]
     
     # Take the first edge as the tangent.
-    edgeKeys = face.edge_keys[0]
+    # The first loop of the face gives its first edge directly, without building every edge key of the face.
+    edgeKeys = mesh.edges[mesh.loops[face.loop_start].edge_index].key
     
-    vertA = object.data.vertices[edgeKeys[0]]
-    vertB = object.data.vertices[edgeKeys[1]]
+    vertA = mesh.vertices[edgeKeys[0]]
+    vertB = mesh.vertices[edgeKeys[1]]
     
     tangent = (vertA.co - vertB.co).normalized()
     
     return tangent
+
+
+# Sine of the angle under which the outline of a face is considered straight at a vertex.
+cornerTolerance = 0.0001
+
+# Positions, in the vertices of a face, of its corners: the vertices its outline turns at.
+# Quads stay quads for the operations once their neighbours have inserted vertices on their sides.
+# The first corner starts the side the first edge of the face lies on.
+def faceCornerPositions(verticesCoordinates):
+    verticesCount = len(verticesCoordinates)
+    cornerPositions = []
+    for currentPosition in range(0, verticesCount):
+        previousDirection = (verticesCoordinates[currentPosition] - verticesCoordinates[currentPosition - 1]).normalized()
+        nextDirection = (verticesCoordinates[(currentPosition + 1) % verticesCount] - verticesCoordinates[currentPosition]).normalized()
+        if previousDirection.cross(nextDirection).length > cornerTolerance:
+            cornerPositions.append(currentPosition)
+    
+    if len(cornerPositions) > 0 and cornerPositions[0] != 0:
+        cornerPositions = cornerPositions[-1:] + cornerPositions[:-1]
+    
+    return cornerPositions
         
 
+### Face identities. ###
+
+# Faces are tracked through an integer face layer holding a unique identity per face.
+# Unlike indices, identities survive the topology changes of other faces.
+# Operations give new identities to the faces they produce, 0 means no identity was given yet.
+faceIdLayerName = "hardsurface_faceId"
+# Object property holding the next identity to give.
+nextFaceIdPropertyName = "hardsurface_nextFaceId"
+
+# Identity to face index maps, one per mesh.
+faceIdMaps = {}
+
+# Returns the data of the identity layer of a mesh, creating the layer if needed.
+# Should be called in object mode.
+def faceIdData(mesh):
+    # Generic attributes only exist from Blender 2.91 on, older versions have integer polygon layers.
+    if hasattr(mesh, "attributes"):
+        faceIdAttribute = mesh.attributes.get(faceIdLayerName)
+        if faceIdAttribute == None:
+            faceIdAttribute = mesh.attributes.new(faceIdLayerName, 'INT', 'FACE')
+        return faceIdAttribute.data
+    
+    faceIdLayer = mesh.polygon_layers_int.get(faceIdLayerName)
+    if faceIdLayer == None:
+        faceIdLayer = mesh.polygon_layers_int.new(name=faceIdLayerName)
+    return faceIdLayer.data
+
+# Give new identities to faces, typically the faces resulting from an operation.
+def assignNewFaceIds(objectToBrowse, faceIndices):
+    firstFaceId = objectToBrowse.get(nextFaceIdPropertyName, 1)
+    objectToBrowse[nextFaceIdPropertyName] = firstFaceId + len(faceIndices)
+    
+    faceIds = list(range(firstFaceId, firstFaceId + len(faceIndices)))
+    
+    identityData = faceIdData(objectToBrowse.data)
+    for currentFaceIndex, currentFaceId in zip(faceIndices, faceIds):
+        identityData[currentFaceIndex].value = currentFaceId
+    
+    return faceIds
+
+def getFaceId(objectToBrowse, faceIndex):
+    faceId = faceIdData(objectToBrowse.data)[faceIndex].value
+    if faceId == 0:
+        faceId = assignNewFaceIds(objectToBrowse, [faceIndex])[0]
+    return faceId
+
+def buildFaceIdMap(mesh):
+    faceIds = [0] * len(mesh.polygons)
+    faceIdData(mesh).foreach_get("value", faceIds)
+    
+    faceIdMap = {}
+    for currentFaceIndex, currentFaceId in enumerate(faceIds):
+        faceIdMap[currentFaceId] = currentFaceIndex
+    
+    faceIdMaps[mesh.as_pointer()] = faceIdMap
+    return faceIdMap
+
+# Returns the current index of the face with the given identity, None if there is no such face anymore.
+def findFaceById(objectToBrowse, faceId):
+    mesh = objectToBrowse.data
+    identityData = faceIdData(mesh)
+    
+    faceIdMap = faceIdMaps.get(mesh.as_pointer())
+    if faceIdMap != None:
+        foundIndex = faceIdMap.get(faceId)
+        # Check the index is still right, faces get reindexed by most operations.
+        if foundIndex != None and foundIndex < len(mesh.polygons) and identityData[foundIndex].value == faceId:
+            return foundIndex
+    
+    return buildFaceIdMap(mesh).get(faceId)
+
+
+### Face tuples. ###
+
+# A face tuple contains first the identity of the face, then an array of its vertices coordinates.
+
 def buildFaceTuple(objectToBrowse, faceIndex):
     polygon = objectToBrowse.data.polygons[faceIndex]
     
@@ -171,47 +290,336 @@ def buildFaceTuple(objectToBrowse, faceIndex):
         currentCoordinates = objectToBrowse.data.vertices[currentVertexIndex].co
         verticesArray.append((currentCoordinates.x, currentCoordinates.y, currentCoordinates.z))
     
-    return (faceIndex, verticesArray)
+    return (getFaceId(objectToBrowse, faceIndex), verticesArray)
 
+# Same as buildFaceTuple for several faces at once, reading the mesh in bulk with foreach_get.
+# Should be called in object mode.
+def buildFaceTuples(objectToBrowse, faceIndices):
+    mesh = objectToBrowse.data
+    faceIndices = np.asarray(faceIndices, dtype=np.int64)
+    if len(faceIndices) == 0:
+        return []
+    
+    coordinates = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", coordinates)
+    coordinates = coordinates.reshape(-1, 3)
+    
+    facesVertices, offsets, totals = readFacesVertices(mesh, faceIndices)
+    facesCoordinates = coordinates[facesVertices].tolist()
+    
+    # Faces without identity get one.
+    faceIds = np.empty(len(mesh.polygons), dtype=np.int32)
+    faceIdData(mesh).foreach_get("value", faceIds)
+    faceIds = faceIds[faceIndices]
+    missingIds = np.flatnonzero(faceIds == 0)
+    if len(missingIds) > 0:
+        faceIds[missingIds] = assignNewFaceIds(objectToBrowse, faceIndices[missingIds].tolist())
+    
+    return [(currentFaceId, [tuple(currentCoordinates) for currentCoordinates in facesCoordinates[currentOffset:currentOffset + currentTotal]])
+            for currentFaceId, currentOffset, currentTotal in zip(faceIds.tolist(), offsets.tolist(), totals.tolist())]
 
-# The face tuple should contain first the index of the face, then an array of vertices.
-def checkIsSameFace(objectToBrowse, faceTuple):
-    faceIndex = faceTuple[0]
-    verticesArray = faceTuple[1]
-    
+# Build the face tuples of faces resulting from an operation, giving them new identities.
+def buildNewFaceTuples(objectToBrowse, faceIndices):
+    assignNewFaceIds(objectToBrowse, faceIndices)
+    return buildFaceTuples(objectToBrowse, faceIndices)
+
+# Build the face tuples of the selected faces, without going through the polygons one by one.
+# verticesCount optionally keeps only the faces with that many vertices, newIdentities gives them new identities.
+# Should be called in object mode, to have up to date select values.
+def harvestSelectedFaceTuples(objectToBrowse, verticesCount=None, newIdentities=False):
+    mesh = objectToBrowse.data
+    
+    selection = np.empty(len(mesh.polygons), dtype=bool)
+    mesh.polygons.foreach_get("select", selection)
+    if verticesCount != None:
+        loopTotals = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("loop_total", loopTotals)
+        selection &= loopTotals == verticesCount
+    
+    selectedIndices = np.flatnonzero(selection).tolist()
+    if newIdentities:
+        return buildNewFaceTuples(objectToBrowse, selectedIndices)
+    return buildFaceTuples(objectToBrowse, selectedIndices)
+
+# Returns the current index of the face a tuple refers to.
+# Falls back on the vertices positions when the identity can't be found, for example on faces created by another tool.
+def resolveFaceIndex(objectToBrowse, faceTuple):
+    faceIndex = findFaceById(objectToBrowse, faceTuple[0])
+    if faceIndex == None:
+        faceIndex = findFaceByVertices(objectToBrowse, faceTuple[1])
+    return faceIndex
+
+
+### Vertex positions hash. ###
+
+# Positions are quantized on a grid of this step, positions closer than it are considered the same.
+vertexHashTolerance = 0.00001
+
+# Vertex positions hashes, one per mesh.
+vertexHashes = {}
+
+def quantizePosition(position):
+    return (int(math.floor(position[0] / vertexHashTolerance)), int(math.floor(position[1] / vertexHashTolerance)), int(math.floor(position[2] / vertexHashTolerance)))
+
+# Hash the vertices of a mesh by quantized position, and list the faces using each vertex.
+def buildVertexHash(mesh):
+    verticesCount = len(mesh.vertices)
+    coordinates = [0.0] * (verticesCount * 3)
+    mesh.vertices.foreach_get("co", coordinates)
+    
+    positionCells = {}
+    for currentVertexIndex in range(0, verticesCount):
+        currentKey = quantizePosition(coordinates[currentVertexIndex * 3 : currentVertexIndex * 3 + 3])
+        if currentKey in positionCells:
+            positionCells[currentKey].append(currentVertexIndex)
+        else:
+            positionCells[currentKey] = [currentVertexIndex]
+    
+    polygonsCount = len(mesh.polygons)
+    loopStarts = [0] * polygonsCount
+    loopTotals = [0] * polygonsCount
+    mesh.polygons.foreach_get("loop_start", loopStarts)
+    mesh.polygons.foreach_get("loop_total", loopTotals)
+    loopVertices = [0] * len(mesh.loops)
+    mesh.loops.foreach_get("vertex_index", loopVertices)
+    
+    facesVertices = [loopVertices[loopStarts[currentFaceIndex] : loopStarts[currentFaceIndex] + loopTotals[currentFaceIndex]] for currentFaceIndex in range(0, polygonsCount)]
+    vertexFaces = [[] for currentVertexIndex in range(0, verticesCount)]
+    for currentFaceIndex, currentFaceVertices in enumerate(facesVertices):
+        for currentVertexIndex in currentFaceVertices:
+            vertexFaces[currentVertexIndex].append(currentFaceIndex)
+    
+    vertexHash = {
+        'sizes'             : (verticesCount, polygonsCount, len(mesh.loops)),
+        'coordinates'       : coordinates,
+        'positionCells'     : positionCells,
+        'facesVertices'     : facesVertices,
+        'vertexFaces'       : vertexFaces}
+    
+    vertexHashes[mesh.as_pointer()] = vertexHash
+    return vertexHash
+
+def getVertexHash(mesh):
+    vertexHash = vertexHashes.get(mesh.as_pointer())
+    if vertexHash == None or vertexHash['sizes'] != (len(mesh.vertices), len(mesh.polygons), len(mesh.loops)):
+        return buildVertexHash(mesh)
+    return vertexHash
+
+def isSamePosition(aPosition, bPosition):
+    return abs(aPosition[0] - bPosition[0]) <= vertexHashTolerance and abs(aPosition[1] - bPosition[1]) <= vertexHashTolerance and abs(aPosition[2] - bPosition[2]) <= vertexHashTolerance
+
+# Returns the vertices at a position, probing the cell of the position and its neighbours.
+def findVerticesAtPosition(vertexHash, position):
+    centerKey = quantizePosition(position)
+    coordinates = vertexHash['coordinates']
+    
+    foundVertices = []
+    for xOffset in (-1, 0, 1):
+        for yOffset in (-1, 0, 1):
+            for zOffset in (-1, 0, 1):
+                currentCell = vertexHash['positionCells'].get((centerKey[0] + xOffset, centerKey[1] + yOffset, centerKey[2] + zOffset))
+                if currentCell == None:
+                    continue
+                for currentVertexIndex in currentCell:
+                    if isSamePosition(coordinates[currentVertexIndex * 3 : currentVertexIndex * 3 + 3], position):
+                        foundVertices.append(currentVertexIndex)
+    
+    return foundVertices
+
+def checkHashedFaceVertices(vertexHash, faceIndex, verticesArray):
+    faceVertices = vertexHash['facesVertices'][faceIndex]
+    if len(faceVertices) != len(verticesArray):
+        return False
+    
+    coordinates = vertexHash['coordinates']
+    for currentVertexIndex in faceVertices:
+        currentPosition = coordinates[currentVertexIndex * 3 : currentVertexIndex * 3 + 3]
+        if not any([isSamePosition(currentPosition, currentVertexFromArray) for currentVertexFromArray in verticesArray]):
+            return False
+    
+    return True
+
+def findFaceInVertexHash(vertexHash, verticesArray):
+    # Only the faces using a vertex at the position of the first vertex can match.
+    for currentVertexIndex in findVerticesAtPosition(vertexHash, verticesArray[0]):
+        for currentFaceIndex in vertexHash['vertexFaces'][currentVertexIndex]:
+            if checkHashedFaceVertices(vertexHash, currentFaceIndex, verticesArray):
+                return currentFaceIndex
+
+
+# Check if a face has the given vertices, with the tolerance of the vertex positions hash.
+def checkFaceVertices(objectToBrowse, faceIndex, verticesArray):
     faceToCheck = objectToBrowse.data.polygons[faceIndex]
     
-    polygonMatches = True
+    if len(faceToCheck.vertices) != len(verticesArray):
+        return False
     
     for currentVertexIndexFromPolygon in faceToCheck.vertices:
         currentVertexFromPolygon = objectToBrowse.data.vertices[currentVertexIndexFromPolygon]
-        foundSameVertice = False
-        for currentVertexFromArray in verticesArray:
-            if  currentVertexFromArray[0] == currentVertexFromPolygon.co.x and currentVertexFromArray[1] == currentVertexFromPolygon.co.y and currentVertexFromArray[2] == currentVertexFromPolygon.co.z:
-                foundSameVertice = True
         # If one of the vertices doesn't match, then the polygon doesn't match.
-        if foundSameVertice == False:
-            polygonMatches = False
+        if not any([isSamePosition(currentVertexFromPolygon.co, currentVertexFromArray) for currentVertexFromArray in verticesArray]):
+            return False
+    
+    return True
+
+
+def checkIsSameFace(objectToBrowse, faceTuple):
+    faceIndex = findFaceById(objectToBrowse, faceTuple[0])
+    if faceIndex == None:
+        return False
     
-    # If all the vertices in the polygon matched, then polygonMatches is still True.
-    return polygonMatches
+    return checkFaceVertices(objectToBrowse, faceIndex, faceTuple[1])
 
 
 # Function to find a face in an object according to the position of the vertices it contains.
 # This function is necessary because faces tend to change index when others are created.
+# The faces are looked up through a hash of the vertices positions, rebuilt once if it turns out to be out of date.
 def findFaceByVertices(objectToBrowse, verticesArray):
-    foundFace = None
+    if len(verticesArray) == 0:
+        return None
     
     dataToBrowse = objectToBrowse.data
     
-    for currentPolygon in dataToBrowse.polygons:
-        if checkIsSameFace(objectToBrowse, (currentPolygon.index, verticesArray)):
-            foundFace = currentPolygon.index
+    cachedVertexHash = vertexHashes.get(dataToBrowse.as_pointer())
+    vertexHash = getVertexHash(dataToBrowse)
+    
+    foundFace = findFaceInVertexHash(vertexHash, verticesArray)
+    if foundFace == None and vertexHash is cachedVertexHash:
+        foundFace = findFaceInVertexHash(buildVertexHash(dataToBrowse), verticesArray)
     
     return foundFace
 
 
 
+### Face frames. ###
+
+# The frame of a face is what cuts and subdivisions need to know about it:
+# "tbn" the TBN matrix built from its local normal and first edge, "borders" its (minX, maxX, minY, maxY) world space borders in the TBN space,
+# "center" its world space center, "edgeLengths" the local length of each of its edges in loop order.
+# "vertices" and "matrixWorld" are what the frame was computed from, to check it is still up to date.
+
+# Frames by face identity, one dictionary per mesh.
+faceFrames = {}
+
+# Returns the vertices of several faces, one face after the other, along with the offset and vertices count of each face in it.
+def readFacesVertices(mesh, faceIndices):
+    loopStarts = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_start", loopStarts)
+    loopTotals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", loopTotals)
+    loopVertices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loopVertices)
+    
+    starts = loopStarts[faceIndices].astype(np.int64)
+    totals = loopTotals[faceIndices].astype(np.int64)
+    offsets = np.concatenate(([0], np.cumsum(totals)[:-1])).astype(np.int64)
+    loopIndices = np.repeat(starts, totals) + np.arange(totals.sum()) - np.repeat(offsets, totals)
+    
+    return loopVertices[loopIndices], offsets, totals
+
+# Compute the frames of several faces at once, reading the mesh in bulk with foreach_get.
+# Returns a dictionary from face index to frame.
+# Should be called in object mode.
+def computeFaceFrames(objectToBrowse, faceIndices):
+    mesh = objectToBrowse.data
+    faceIndices = np.asarray(faceIndices, dtype=np.int64)
+    if len(faceIndices) == 0:
+        return {}
+    
+    # Read the whole mesh in flat arrays.
+    coordinates = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", coordinates)
+    coordinates = coordinates.reshape(-1, 3).astype(np.float64)
+    
+    normals = np.empty(len(mesh.polygons) * 3, dtype=np.float32)
+    mesh.polygons.foreach_get("normal", normals)
+    normals = normals.reshape(-1, 3).astype(np.float64)[faceIndices]
+    
+    facesVertices, offsets, totals = readFacesVertices(mesh, faceIndices)
+    facesOfLoops = np.repeat(np.arange(len(faceIndices)), totals)
+    
+    # Vertex following each vertex in its face.
+    nextPositions = np.arange(len(facesVertices)) + 1
+    facesEnds = offsets + totals
+    nextPositions[facesEnds - 1] = offsets
+    nextVertices = facesVertices[nextPositions]
+    
+    # The tangent is the first edge of the face, oriented from its highest to its lowest vertex index like faceTangent does.
+    firstVertices = np.minimum(facesVertices[offsets], facesVertices[offsets + 1])
+    secondVertices = np.maximum(facesVertices[offsets], facesVertices[offsets + 1])
+    tangents = coordinates[firstVertices] - coordinates[secondVertices]
+    tangents = tangents / np.linalg.norm(tangents, axis=1)[:, np.newaxis]
+    biTangents = np.cross(normals, tangents)
+    tbnMatrices = np.stack((tangents, biTangents, normals), axis=1)
+    
+    # Vertices in world space, then in the TBN space of their face.
+    matrixWorld = np.array(objectToBrowse.matrix_world, dtype=np.float64)
+    worldCoordinates = coordinates[facesVertices] @ matrixWorld[:3, :3].T + matrixWorld[:3, 3]
+    tangentCoordinates = np.einsum("lij,lj->li", tbnMatrices[facesOfLoops], worldCoordinates)
+    
+    minimums = np.minimum.reduceat(tangentCoordinates, offsets).tolist()
+    maximums = np.maximum.reduceat(tangentCoordinates, offsets).tolist()
+    centers = np.add.reduceat(worldCoordinates, offsets) / totals[:, np.newaxis]
+    edgeLengths = np.linalg.norm(coordinates[nextVertices] - coordinates[facesVertices], axis=1)
+    
+    frames = {}
+    for currentPosition, currentFaceIndex in enumerate(faceIndices.tolist()):
+        currentLoops = slice(offsets[currentPosition], offsets[currentPosition] + totals[currentPosition])
+        frames[currentFaceIndex] = {
+            "tbn"           : mathutils.Matrix(tbnMatrices[currentPosition].tolist()),
+            "borders"       : (minimums[currentPosition][0], maximums[currentPosition][0], minimums[currentPosition][1], maximums[currentPosition][1]),
+            "center"        : mathutils.Vector(centers[currentPosition].tolist()),
+            "edgeLengths"   : edgeLengths[currentLoops].tolist(),
+            "vertices"      : [tuple(currentCoordinates) for currentCoordinates in coordinates[facesVertices[currentLoops]].tolist()],
+            "matrixWorld"   : objectToBrowse.matrix_world.copy()}
+    
+    return frames
+
+# Compute and keep the frames of several faces, typically every face of a recursion level before processing them.
+def precomputeFaceFrames(objectToBrowse, faceIndices):
+    faceIndices = [currentFaceIndex for currentFaceIndex in faceIndices if currentFaceIndex != None]
+    frames = computeFaceFrames(objectToBrowse, faceIndices)
+    
+    meshFrames = faceFrames.setdefault(objectToBrowse.data.as_pointer(), {})
+    for currentFaceIndex, currentFrame in frames.items():
+        meshFrames[getFaceId(objectToBrowse, currentFaceIndex)] = currentFrame
+    
+    return frames
+
+# Returns the frame of a face, precomputed if it is still up to date, computed otherwise.
+def getFaceFrame(objectToBrowse, faceIndex):
+    meshFrames = faceFrames.get(objectToBrowse.data.as_pointer())
+    if meshFrames != None:
+        frame = meshFrames.get(getFaceId(objectToBrowse, faceIndex))
+        # Faces created from another one copy its identity, so check the frame is really the one of this face.
+        if frame != None and frame["matrixWorld"] == objectToBrowse.matrix_world and checkFaceVertices(objectToBrowse, faceIndex, frame["vertices"]):
+            return frame
+    
+    return precomputeFaceFrames(objectToBrowse, [faceIndex])[faceIndex]
+
+# Returns a copy of a frame whose TBN matrix has the given tangent, projected on the face, instead of the face's first edge.
+def orientFaceFrame(frame, tangent):
+    normal = frame["tbn"][2].copy()
+    tangent = mathutils.Vector(tangent)
+    tangent = (tangent - normal * tangent.dot(normal)).normalized()
+    biTangent = normal.cross(tangent)
+    
+    tbnMatrix = mathutils.Matrix([tangent, biTangent, normal])
+    
+    tangentCoordinates = [tbnMatrix @ (frame["matrixWorld"] @ mathutils.Vector(currentVertex)) for currentVertex in frame["vertices"]]
+    
+    orientedFrame = dict(frame)
+    orientedFrame["tbn"] = tbnMatrix
+    orientedFrame["borders"] = (min([currentCoordinates.x for currentCoordinates in tangentCoordinates]),
+                                max([currentCoordinates.x for currentCoordinates in tangentCoordinates]),
+                                min([currentCoordinates.y for currentCoordinates in tangentCoordinates]),
+                                max([currentCoordinates.y for currentCoordinates in tangentCoordinates]))
+    return orientedFrame
+
+def clearFaceFrames(mesh):
+    faceFrames.pop(mesh.as_pointer(), None)
+
+
 # Material related functions.
 
 # Switch the selected material slot of the current object taking a string in.
@@ -230,7 +638,7 @@ def assignMaterialSlotByName(slotName):
     switchMaterialSlotByName(slotName)
     
     # Make sure we are in edit mode.
-    bpy.ops.object.mode_set(mode = 'EDIT')
+    setObjectMode('EDIT')
     
     # Assign the slot.
     bpy.ops.object.material_slot_assign()
\ No newline at end of file